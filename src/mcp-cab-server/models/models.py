@@ -53,7 +53,11 @@ class IndividualCabResponse(BaseModel):
 
 class SearchResponse(BaseModel):
     cabs: list[IndividualCabResponse] = Field(description="list of available cabs")
+    error: Optional[str] = Field(default=None, description="why the route could not be searched, if it failed")
      
+class BatchSearchRequest(BaseModel):
+    routes: list[SearchRequest] = Field(..., min_length=1, max_length=100, description="Routes to price in one call")
+
 class LocationOption(BaseModel):
     place_id: str = Field(description="unique identifer for the place")
     formatted_address: str = Field(description="full formatted address")
@@ -118,6 +122,21 @@ class HoldCabResponse(BaseModel):
     departure_date: str = Field(description="Journey date (ISO 8601 format)")
     created_at: str = Field(description="Hold creation time (ISO 8601 format)")
 
+class BulkHoldRequest(BaseModel):
+    holds: list[HoldCabRequest] = Field(..., min_length=1, max_length=100, description="Holds to create together")
+
+class BulkHoldItemResult(BaseModel):
+    index: int = Field(description="Position of the item in the request")
+    cab_id: str = Field(description="Cab identifier")
+    success: bool = Field(description="Whether the hold was created")
+    hold: Optional[HoldCabResponse] = Field(default=None, description="Created hold, when successful")
+    error: Optional[str] = Field(default=None, description="Why the hold could not be created")
+
+class BulkHoldResponse(BaseModel):
+    results: list[BulkHoldItemResult] = Field(description="One result per requested hold, in request order")
+    created: int = Field(description="Number of holds created")
+    failed: int = Field(description="Number of holds that could not be created")
+
 class PassengerDetailsRequest(BaseModel):
     hold_id: str = Field(..., description="Hold ID from hold_cab_booking")
     passenger_name: str = Field(..., min_length=2, max_length=100, description="Full name of passenger")
@@ -24,7 +24,8 @@ from services.mock_db import (
     create_payment_session,
     get_payment_session,
     update_payment_status,
-    is_hold_expired
+    is_hold_expired,
+    ConcurrentUpdateError
 )
 from services.card_validator import validate_card
 from services.logging_config import get_logger, setup_logging
@@ -227,6 +228,12 @@ def process_payment(request: PaymentProcessRequest):
         
     except HTTPException:
         raise
+    except ConcurrentUpdateError as e:
+        logger.warning(
+            "Payment processing conflict",
+            extra={"session_id": request.session_id, "error": str(e)}
+        )
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         logger.error(
             "Payment processing validation error",
@@ -1,13 +1,19 @@
 from dotenv import load_dotenv
 load_dotenv()
 from fastmcp import FastMCP , Context
-from models.models import  SearchRequest, SearchResponse , HoldCabRequest , HoldCabResponse , PassengerDetailsRequest , PassengerDetailsResponse
+from models.models import  SearchRequest, SearchResponse , BatchSearchRequest , HoldCabRequest , HoldCabResponse , BulkHoldRequest , BulkHoldResponse , PassengerDetailsRequest , PassengerDetailsResponse
 from services.logging_config import get_logger, setup_logging
 from services.helper import get_available_cabs
-from services.geocoding import geocode_location , resolve_location_by_place_id
-from services.helper import hold_cab , add_passenger_details_to_hold
+from services.gazetteer import find_place, is_gazetteer_place_id, match_places, to_location_option, to_resolved_location
+from services.geocoding import (
+    geocode_location, resolve_location_by_place_id, normalize_query,
+    get_http_client, close_http_client, save_geocoding_cache, get_geocoding_metrics
+)
+from services.helper import hold_cab , hold_cabs_bulk , add_passenger_details_to_hold
 from datetime import datetime , date
-from services.mock_db import cleanup_expired_holds
+from services.expiry import start_expiry_scheduler, stop_expiry_scheduler
+from services.storage import run_storage_io, shutdown_storage_io
+from contextlib import asynccontextmanager
 import asyncio
 import os
 
@@ -18,20 +24,96 @@ log_level = os.getenv("LOG_LEVEL", "INFO")
 setup_logging(level=log_level, use_stderr=True)
 logger = get_logger(__name__, service="mcp-cab-server")
 
-mcp = FastMCP("cab-server")
 
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    # Open the pooled geocoding client up front so the first search doesn't pay for it
+    get_http_client()
+    start_expiry_scheduler()
+    try:
+        yield
+    finally:
+        await stop_expiry_scheduler()
+        await close_http_client()
+        save_geocoding_cache()
+        shutdown_storage_io()
+
+
+mcp = FastMCP("cab-server", lifespan=lifespan)
+
+# Speculative place-details lookups while the user picks from several matches
+PLACE_PREFETCH_LIMIT = int(os.getenv("PLACE_PREFETCH_LIMIT", "5"))
+_prefetch_semaphore = asyncio.Semaphore(int(os.getenv("PLACE_PREFETCH_CONCURRENCY", "3")))
+
+
+
+async def prefetch_location(location_query: str) -> tuple:
+    """Network phase of location resolution, safe to run concurrently.
+
+    Returns the autocomplete results and, when there is exactly one, its
+    resolved details so no further round-trip is needed. Places the offline
+    gazetteer knows by exactly this name resolve without calling Google at
+    all; partial gazetteer matches are only offered, unresolved, when Google
+    has nothing.
+    """
+    place = find_place(location_query)
+    if place is not None:
+        logger.debug(
+            "Location resolved from gazetteer",
+            extra={"query": location_query, "place_id": place["place_id"]}
+        )
+        return [to_location_option(place)], to_resolved_location(place, location_query)
+    try:
+        results = await geocode_location(location_query)
+    except ValueError:
+        # Location service not configured; fall back to partial gazetteer matches
+        local_matches = match_places(location_query)
+        if not local_matches:
+            raise
+        return [to_location_option(place) for place in local_matches], None
+    if not results:
+        return [to_location_option(place) for place in match_places(location_query)], None
+    if len(results) == 1:
+        return results, await resolve_location_by_place_id(results[0].place_id)
+    return results, None
+
+
+async def _prefetch_place_details(place_id: str):
+    async with _prefetch_semaphore:
+        return await resolve_location_by_place_id(place_id)
+
+
+def _start_details_prefetch(results: list) -> dict:
+    return {
+        loc.place_id: asyncio.create_task(_prefetch_place_details(loc.place_id))
+        for loc in results[:PLACE_PREFETCH_LIMIT]
+    }
+
+
+def _cancel_tasks(tasks):
+    for task in tasks:
+        task.cancel()
+
+
+def _unwrap(result):
+    if isinstance(result, BaseException):
+        raise result
+    return result
 
 
 async def get_location_with_disambiguation(
     ctx: Context, 
     location_query: str, 
-    location_type: str
+    location_type: str,
+    prefetched: tuple = None
 ) -> tuple:
     logger.info(
         f"Starting location geocoding",
         extra={"query": location_query, "type": location_type}
     )
-    results = await geocode_location(location_query)
+    if prefetched is None:
+        prefetched = await prefetch_location(location_query)
+    results, single_location = prefetched
     
     if not results:
         logger.warning(
@@ -41,13 +123,15 @@ async def get_location_with_disambiguation(
         return None, f"No locations found for {location_type}: {location_query}"
     
    
-    if len(results) == 1:
+    # A lone partial gazetteer match is a guess at what was meant, so it is confirmed below
+    guessed = single_location is None and is_gazetteer_place_id(results[0].place_id)
+    if len(results) == 1 and not guessed:
         loc = results[0]
         logger.debug(
             f"Single location match, resolving details",
             extra={"place_id": loc.place_id, "location_name": loc.name}  # Changed from 'name'
         )
-        location = await resolve_location_by_place_id(loc.place_id)
+        location = single_location
         if not location:
             logger.error(
                 f"Failed to resolve location details",
@@ -76,12 +160,21 @@ async def get_location_with_disambiguation(
         "title": f"🔄 None of these - let me specify a different location"
     }
     
-    response = await ctx.elicit(
-        message=f"🚕 Found {len(results)} locations for '{location_query}'. Please select the {location_type} location:",
-        response_type=options_dict
-    )
+    # Resolve the presented options while the user is choosing, so the
+    # selected one is usually ready by the time the answer arrives
+    prefetch_tasks = _start_details_prefetch(results)
+    try:
+        response = await ctx.elicit(
+            message=f"🚕 Found {len(results)} locations for '{location_query}'. Please select the {location_type} location:",
+            response_type=options_dict
+        )
+    except BaseException:
+        _cancel_tasks(prefetch_tasks.values())
+        raise
     
     place_id = response.data
+    selected_task = prefetch_tasks.pop(place_id, None) if place_id else None
+    _cancel_tasks(prefetch_tasks.values())
     
     if not place_id:
         logger.warning(f"User did not select any location", extra={"type": location_type})
@@ -109,7 +202,10 @@ async def get_location_with_disambiguation(
             location_type
         )
     
-    location = await resolve_location_by_place_id(place_id)
+    if selected_task:
+        location = await selected_task
+    else:
+        location = await resolve_location_by_place_id(place_id)
     if not location:
         logger.error(
             f"Failed to resolve selected location",
@@ -124,14 +220,31 @@ async def get_location_with_disambiguation(
 
 
 
+@mcp.resource(
+    "metrics://geocoding",
+    name="geocoding_metrics",
+    description="Google Places quota usage, latency, circuit state and cache statistics"
+)
+def geocoding_metrics() -> dict:
+    return get_geocoding_metrics()
+
+
 @mcp.tool(name="Search_cabs" , description="Cabs to search")
 async def search_cabs(ctx:Context , input: SearchRequest)->SearchResponse:
     logger.info(
         "Cab search request received",
         extra={"pickup": input.pickup, "drop": input.drop}
     )
+    # Look up both ends concurrently; any elicitation below still happens pickup first
+    pickup_prefetch, drop_prefetch = await asyncio.gather(
+        prefetch_location(input.pickup),
+        prefetch_location(input.drop),
+        return_exceptions=True
+    )
     try:
-        pickup_location , pickup_error = await get_location_with_disambiguation(ctx , input.pickup , "pickup")
+        pickup_location , pickup_error = await get_location_with_disambiguation(
+            ctx , input.pickup , "pickup" , _unwrap(pickup_prefetch)
+        )
         if pickup_error:
             logger.error(
                 "Pickup location resolution failed",
@@ -147,7 +260,9 @@ async def search_cabs(ctx:Context , input: SearchRequest)->SearchResponse:
         await ctx.info(f"❌ System error: {str(e)}")
         return SearchResponse(cabs=[])
     try:
-        drop_location , drop_error = await get_location_with_disambiguation(ctx , input.drop , "drop")
+        drop_location , drop_error = await get_location_with_disambiguation(
+            ctx , input.drop , "drop" , _unwrap(drop_prefetch)
+        )
         if drop_error:
             logger.error(
                 "Drop location resolution failed",
@@ -173,7 +288,12 @@ async def search_cabs(ctx:Context , input: SearchRequest)->SearchResponse:
         }
     )
     
-    available_cabs = get_available_cabs(pickup_location.name.lower(), drop_location.name.lower())
+    available_cabs = get_available_cabs(
+        pickup_location.name.lower(),
+        drop_location.name.lower(),
+        pickup_coords=(pickup_location.lat, pickup_location.lng),
+        drop_coords=(drop_location.lat, drop_location.lng)
+    )
     
     if not available_cabs.cabs:
         logger.warning(
@@ -202,6 +322,79 @@ async def search_cabs(ctx:Context , input: SearchRequest)->SearchResponse:
     return available_cabs
 
 
+@mcp.tool(name="Search_cabs_batch", description="Price many pickup/drop routes in one call")
+async def search_cabs_batch(ctx:Context , input: BatchSearchRequest)->list[SearchResponse]:
+    # Each distinct place is looked up once, however many routes mention it
+    locations = {}
+    for route in input.routes:
+        locations.setdefault(normalize_query(route.pickup), (route.pickup, "pickup"))
+        locations.setdefault(normalize_query(route.drop), (route.drop, "drop"))
+    logger.info(
+        "Batch cab search request received",
+        extra={"route_count": len(input.routes), "unique_locations": len(locations)}
+    )
+    prefetched = await asyncio.gather(
+        *(prefetch_location(query) for query, _ in locations.values()),
+        return_exceptions=True
+    )
+
+    # Resolve one at a time so that any elicitation for an ambiguous place is asked in order.
+    # A failure only fails the routes that mention that place, and is reported on them
+    resolved = {}
+    for (key, (query, location_type)), prefetch in zip(locations.items(), prefetched):
+        try:
+            location, error = await get_location_with_disambiguation(
+                ctx, query, location_type, _unwrap(prefetch)
+            )
+        except Exception as e:
+            location, error = None, f"System error: {str(e)}"
+        if error:
+            logger.error(
+                "Batch location resolution failed",
+                extra={"query": query, "error": error}
+            )
+            await ctx.info(f"❌ {error}")
+        resolved[key] = (location, error)
+
+    results = {}
+    responses = []
+    for route in input.routes:
+        pickup_location, pickup_error = resolved[normalize_query(route.pickup)]
+        drop_location, drop_error = resolved[normalize_query(route.drop)]
+        if pickup_location is None or drop_location is None:
+            error = pickup_error or drop_error or "Location could not be resolved"
+            responses.append(SearchResponse(cabs=[], error=error))
+            continue
+        route_key = (pickup_location.place_id, drop_location.place_id)
+        if route_key not in results:
+            try:
+                results[route_key] = get_available_cabs(
+                    pickup_location.name.lower(),
+                    drop_location.name.lower(),
+                    pickup_coords=(pickup_location.lat, pickup_location.lng),
+                    drop_coords=(drop_location.lat, drop_location.lng)
+                )
+            except Exception as e:
+                logger.error(
+                    "Batch route search failed",
+                    extra={"pickup": pickup_location.name, "drop": drop_location.name, "error": str(e)},
+                    exc_info=True
+                )
+                results[route_key] = SearchResponse(cabs=[], error=f"System error: {str(e)}")
+        responses.append(results[route_key])
+
+    logger.info(
+        "Batch cab search completed",
+        extra={
+            "route_count": len(responses),
+            "priced_routes": len(results),
+            "unresolved_routes": sum(1 for response in responses if not response.cabs),
+            "failed_routes": sum(1 for response in responses if response.error)
+        }
+    )
+    return responses
+
+
 @mcp.tool(name="hold_cab_booking" ,description="Create temporary cab reservation with 15-minute hold")
 async def hold_cab_booking(ctx:Context , input: HoldCabRequest )->HoldCabResponse:
     logger.info(
@@ -215,7 +408,8 @@ async def hold_cab_booking(ctx:Context , input: HoldCabRequest )->HoldCabRespons
     )
     try:
         # Create the hold
-        hold_response = hold_cab(
+        hold_response = await run_storage_io(
+            hold_cab,
             cab_id=input.cab_id,
             pickup=input.pickup,
             drop=input.drop,
@@ -254,6 +448,36 @@ async def hold_cab_booking(ctx:Context , input: HoldCabRequest )->HoldCabRespons
         )
         raise ValueError(f"Failed to create hold: {str(e)}")
 
+@mcp.tool(name="hold_cab_booking_bulk" ,description="Create 15-minute holds on many cabs at once, e.g. for group bookings")
+async def hold_cab_booking_bulk(ctx:Context , input: BulkHoldRequest)->BulkHoldResponse:
+    logger.info(
+        "Bulk hold request received",
+        extra={"count": len(input.holds)}
+    )
+    try:
+        results = await run_storage_io(hold_cabs_bulk, input.holds)
+    except Exception as e:
+        logger.error(
+            "Bulk hold creation failed - unexpected error",
+            extra={"count": len(input.holds), "error": str(e), "error_type": type(e).__name__},
+            exc_info=True
+        )
+        raise ValueError(f"Failed to create holds: {str(e)}")
+
+    created = sum(1 for result in results if result.success)
+    failed = len(results) - created
+    logger.info(
+        "Bulk holds processed",
+        extra={"created_count": created, "failed_count": failed}
+    )
+    await ctx.info(
+        f"🎉 {created} of {len(results)} cabs reserved.\n"
+        + (f"⚠️ {failed} could not be held - see the per-item errors.\n" if failed else "")
+        + f"⏰ Please complete passenger details and payment within 15 minutes."
+    )
+    return BulkHoldResponse(results=results, created=created, failed=failed)
+
+
 @mcp.tool(
     name="add_passenger_details", 
     description="Add passenger information to cab booking hold"
@@ -275,7 +499,8 @@ async def add_passenger_details(
     
     try:
         # Add passenger details
-        response = add_passenger_details_to_hold(
+        response = await run_storage_io(
+            add_passenger_details_to_hold,
             hold_id=input.hold_id,
             passenger_name=input.passenger_name,
             passenger_phone=input.passenger_phone,
@@ -349,7 +574,7 @@ async def create_payment_order(
     try:
         from services.payment import create_payment_order_internal
         
-        payment_order = create_payment_order_internal(hold_id)
+        payment_order = await run_storage_io(create_payment_order_internal, hold_id)
         
         logger.info(
             "Payment order created, prompting user",
@@ -454,7 +679,7 @@ async def verify_mock_payment(
     try:
         from services.payment import get_payment_status_internal
         
-        payment_status = get_payment_status_internal(session_id)
+        payment_status = await run_storage_io(get_payment_status_internal, session_id)
         
         status_str = payment_status.status.value
         
@@ -556,7 +781,7 @@ async def confirm_booking(
     try:
         from services.payment import confirm_booking_internal
         
-        confirmation = confirm_booking_internal(hold_id)
+        confirmation = await run_storage_io(confirm_booking_internal, hold_id)
         
         driver = confirmation.driver
         summary = confirmation.booking_summary
@@ -630,13 +855,4 @@ async def confirm_booking(
 
 
 if __name__ == "__main__":
-    import threading
-    
-    def cleanup_thread():
-        import time
-        while True:
-            time.sleep(300)
-            cleanup_expired_holds()
-    
-    threading.Thread(target=cleanup_thread, daemon=True).start()
     mcp.run()
\ No newline at end of file
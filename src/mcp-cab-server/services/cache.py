@@ -0,0 +1,149 @@
+"""In-process TTL + LRU cache and request coalescing used to avoid repeated Google Places lookups"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+MISSING = object()
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire after a TTL and are evicted LRU-first.
+
+    Empty results ([] / None) are cached too, with their own (shorter) TTL, so
+    repeated lookups for unknown places don't go upstream every time.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, negative_ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Any:
+        """Return the cached value, or MISSING if absent or expired.
+
+        Expired entries stay around until evicted so that callers can fall
+        back to them with allow_stale=True when upstream is unavailable.
+        """
+        entry = self._entries.get(key)
+        if entry is None or (entry[0] <= time.time() and not allow_stale):
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if ttl is None:
+            ttl = self.ttl if value else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def dump(self, encode: Callable[[Any], Any]) -> list:
+        """Live entries as [key, expires_at, encoded value] rows, oldest first."""
+        now = time.time()
+        return [
+            [key, expires_at, encode(value)]
+            for key, (expires_at, value) in self._entries.items()
+            if expires_at > now
+        ]
+
+    def restore(self, rows: list, decode: Callable[[Any], Any]) -> int:
+        now = time.time()
+        restored = 0
+        for key, expires_at, encoded in rows:
+            if expires_at > now:
+                self._entries[key] = (expires_at, decode(encoded))
+                self._entries.move_to_end(key)
+                restored += 1
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return restored
+
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one in-flight task.
+
+    Callers that arrive while a call for their key is running await its
+    result instead of starting their own, so a burst costs one upstream call.
+    The call is cancelled once every caller waiting on it has given up.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.calls += 1
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            # Shield so one caller giving up doesn't cancel the call for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants the result any more; stop the upstream call so
+                # it doesn't hold a connection and a rate-limit slot
+                self.abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
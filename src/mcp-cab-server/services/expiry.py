@@ -0,0 +1,158 @@
+"""Timer-driven expiry of booking holds and payment sessions"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from services import mock_db
+from services.logging_config import get_logger
+from services.storage import run_storage_io
+
+logger = get_logger(__name__, service="expiry")
+
+# How often to look for payment sessions created by the other process (payment_backend)
+EXPIRY_RESYNC_SECONDS = float(os.getenv("EXPIRY_RESYNC_SECONDS", "30"))
+
+
+class ExpiryScheduler:
+    """Min-heap of (due, kind, key) timers served by one asyncio task.
+
+    Each wakeup only pops the timers that are due, so the cost follows the
+    number of expiring records rather than the size of the store. Scheduling
+    a key again replaces its timer; superseded heap entries are skipped when
+    popped. schedule() is thread-safe, since records are created from the
+    storage I/O thread.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Callable[[str, datetime], None]],
+        resync: Optional[Callable[[], None]] = None,
+        resync_interval: float = EXPIRY_RESYNC_SECONDS,
+    ):
+        self.handlers = handlers
+        self.resync = resync
+        self.resync_interval = resync_interval
+        self._heap: list = []
+        self._due: dict = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.fired = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, kind: str, key: str, due: datetime):
+        with self._lock:
+            if self._due.get((kind, key)) == due:
+                return
+            self._due[(kind, key)] = due
+            heapq.heappush(self._heap, (due, next(self._sequence), kind, key))
+            earliest = self._heap[0][2:] == (kind, key)
+        if earliest and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _next_delay(self) -> Optional[float]:
+        with self._lock:
+            if not self._heap:
+                return None
+            return (self._heap[0][0] - datetime.now()).total_seconds()
+
+    def _pop_due(self, now: datetime) -> list:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, kind, key = heapq.heappop(self._heap)
+                if self._due.get((kind, key)) == when:
+                    del self._due[(kind, key)]
+                    due.append((kind, key))
+        return due
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        next_resync = self._loop.time() + self.resync_interval
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay()
+            if self.resync is not None:
+                until_resync = max(0.0, next_resync - self._loop.time())
+                delay = until_resync if delay is None else min(delay, until_resync)
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+            if self.resync is not None and self._loop.time() >= next_resync:
+                next_resync = self._loop.time() + self.resync_interval
+                try:
+                    await run_storage_io(self.resync)
+                except Exception as e:
+                    logger.error("Expiry resync failed", extra={"error": str(e)}, exc_info=True)
+
+            now = datetime.now()
+            for kind, key in self._pop_due(now):
+                self.fired += 1
+                try:
+                    await run_storage_io(self.handlers[kind], key, now)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(
+                        "Expiry handler failed",
+                        extra={"kind": kind, "key": key, "error": str(e)},
+                        exc_info=True
+                    )
+
+    def stats(self) -> dict:
+        delay = self._next_delay()
+        return {
+            "scheduled": len(self._due),
+            "fired": self.fired,
+            "failed": self.failed,
+            "next_due_in_s": round(max(0.0, delay), 3) if delay is not None else None,
+        }
+
+
+_scheduler: Optional[ExpiryScheduler] = None
+_task: Optional[asyncio.Task] = None
+
+
+def start_expiry_scheduler() -> ExpiryScheduler:
+    """Schedule every pending expiry from the store and start the timer task; call from the app lifespan."""
+    global _scheduler, _task
+    _scheduler = ExpiryScheduler(
+        handlers={
+            'hold': mock_db.expire_hold,
+            'purge': mock_db.purge_hold,
+            'payment': mock_db.expire_payment_session,
+        },
+        resync=mock_db.refresh_payment_index,
+    )
+    mock_db.EXPIRY_LISTENERS.append(_scheduler.schedule)
+    mock_db.schedule_pending_expiries()
+    _task = asyncio.get_running_loop().create_task(_scheduler.run())
+    logger.info("Expiry scheduler started", extra={"scheduled": len(_scheduler)})
+    return _scheduler
+
+
+async def stop_expiry_scheduler():
+    global _scheduler, _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    if _scheduler is not None:
+        if _scheduler.schedule in mock_db.EXPIRY_LISTENERS:
+            mock_db.EXPIRY_LISTENERS.remove(_scheduler.schedule)
+        logger.info("Expiry scheduler stopped", extra=_scheduler.stats())
+    _scheduler = _task = None
@@ -0,0 +1,104 @@
+"""Distance-based fare engine for trips outside the mock route catalog"""
+
+import os
+import secrets
+
+from services.logging_config import get_logger
+from services.spatial import geohash_encode, haversine_km
+
+logger = get_logger(__name__, service="fares")
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Straight-line distance undercounts real roads; scale it to an estimated road distance
+FARE_ROAD_FACTOR = float(os.getenv("FARE_ROAD_FACTOR", "1.3"))
+FARE_AVERAGE_SPEED_KMPH = float(os.getenv("FARE_AVERAGE_SPEED_KMPH", "30"))
+FARE_ROUNDING = int(os.getenv("FARE_ROUNDING", "10"))
+FARE_CAB_ID_PRECISION = 6
+FARE_CAB_ID_PREFIX = "FARE_"
+
+FARE_TABLE = [
+    {"cab_type": "mini", "base_fare": 60, "per_km": 12, "per_minute": 1.0, "min_fare": 150},
+    {"cab_type": "sedan", "base_fare": 80, "per_km": 14, "per_minute": 1.5, "min_fare": 200},
+    {"cab_type": "suv", "base_fare": 100, "per_km": 18, "per_minute": 2.0, "min_fare": 300},
+    {"cab_type": "prime sedan", "base_fare": 120, "per_km": 16, "per_minute": 2.0, "min_fare": 300},
+]
+
+# Column-wise copies of FARE_TABLE, built by rebuild_fare_arrays()
+CAB_TYPES = []
+_RATES = {}
+
+
+def rebuild_fare_arrays():
+    """Rebuild the rate columns; call after FARE_TABLE changes."""
+    CAB_TYPES[:] = [row["cab_type"] for row in FARE_TABLE]
+    for column in ("base_fare", "per_km", "per_minute", "min_fare"):
+        values = [float(row[column]) for row in FARE_TABLE]
+        _RATES[column] = np.array(values) if NUMPY_AVAILABLE else values
+    logger.debug(
+        "Fare table loaded",
+        extra={"cab_types": len(CAB_TYPES), "numpy": NUMPY_AVAILABLE}
+    )
+
+
+def estimate_trip(pickup_coords: tuple, drop_coords: tuple) -> tuple:
+    """(road distance km, duration minutes) estimated from the great-circle distance."""
+    distance_km = haversine_km(pickup_coords[0], pickup_coords[1], drop_coords[0], drop_coords[1]) * FARE_ROAD_FACTOR
+    return distance_km, distance_km / FARE_AVERAGE_SPEED_KMPH * 60
+
+
+def _price_all_types(distance_km: float, minutes: float) -> list:
+    """Fare for every cab type in one pass: max(min_fare, base + per_km*d + per_minute*t)."""
+    if NUMPY_AVAILABLE:
+        fares = _RATES["base_fare"] + _RATES["per_km"] * distance_km + _RATES["per_minute"] * minutes
+        fares = np.maximum(fares, _RATES["min_fare"])
+        return (np.round(fares / FARE_ROUNDING) * FARE_ROUNDING).astype(int).tolist()
+    return [
+        int(round(max(minimum, base + per_km * distance_km + per_minute * minutes) / FARE_ROUNDING) * FARE_ROUNDING)
+        for base, per_km, per_minute, minimum in zip(
+            _RATES["base_fare"], _RATES["per_km"], _RATES["per_minute"], _RATES["min_fare"]
+        )
+    ]
+
+
+def quote_cab_id(cab_type: str, pickup_coords: tuple, drop_coords: tuple, nonce: str) -> str:
+    """Id for a quoted cab. The nonce is per quote, so two searches for the same
+    trip (or a search before and after a restart) never share an id."""
+    return "{}{}_{}_{}_{}".format(
+        FARE_CAB_ID_PREFIX,
+        cab_type.upper().replace(" ", "_"),
+        geohash_encode(pickup_coords[0], pickup_coords[1], FARE_CAB_ID_PRECISION),
+        geohash_encode(drop_coords[0], drop_coords[1], FARE_CAB_ID_PRECISION),
+        nonce
+    )
+
+
+def is_quote_cab_id(cab_id: str) -> bool:
+    return cab_id.startswith(FARE_CAB_ID_PREFIX)
+
+
+def quote_fares(pickup_coords: tuple, drop_coords: tuple) -> list[dict]:
+    """Priced cab options ({cab_id, cab_type, price}) for a trip between two points."""
+    distance_km, minutes = estimate_trip(pickup_coords, drop_coords)
+    prices = _price_all_types(distance_km, minutes)
+    nonce = secrets.token_hex(4)
+    logger.debug(
+        "Fares quoted",
+        extra={"distance_km": round(distance_km, 2), "minutes": round(minutes, 1)}
+    )
+    return [
+        {
+            "cab_id": quote_cab_id(cab_type, pickup_coords, drop_coords, nonce),
+            "cab_type": cab_type,
+            "price": price
+        }
+        for cab_type, price in zip(CAB_TYPES, prices)
+    ]
+
+
+rebuild_fare_arrays()
@@ -0,0 +1,259 @@
+"""Offline gazetteer of well-known pickup/drop places.
+
+Entries mirror the place names used as MOCK_CAB_DB route keys, so a query
+that hits the gazetteer resolves to a name the route catalog understands
+without calling Google Places.
+"""
+
+import bisect
+import json
+import os
+import re
+from typing import Optional
+
+from models.models import LocationOption, ResolvedLocation
+from services.logging_config import get_logger
+
+logger = get_logger(__name__, service="gazetteer")
+
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "true").lower() in ("1", "true", "yes")
+GAZETTEER_FILE = os.getenv("GAZETTEER_FILE")
+GAZETTEER_MIN_PREFIX = 4
+PLACE_ID_PREFIX = "local:"
+
+GAZETTEER_PLACES = [
+    # Delhi NCR
+    {"name": "IGI Airport", "lat": 28.5562, "lng": 77.1000,
+     "formatted_address": "Indira Gandhi International Airport, New Delhi, Delhi, India",
+     "aliases": ["indira gandhi international airport", "igi", "igi terminal 3", "igi airport terminal 3"]},
+    {"name": "Delhi Airport", "lat": 28.5562, "lng": 77.1000,
+     "formatted_address": "Delhi Airport, New Delhi, Delhi, India",
+     "aliases": ["delhi international airport", "new delhi airport"]},
+    {"name": "Connaught Place", "lat": 28.6315, "lng": 77.2167,
+     "formatted_address": "Connaught Place, New Delhi, Delhi, India",
+     "aliases": ["cp delhi", "rajiv chowk"]},
+    {"name": "New Delhi Railway Station", "lat": 28.6430, "lng": 77.2194,
+     "formatted_address": "New Delhi Railway Station, Paharganj, New Delhi, Delhi, India",
+     "aliases": ["ndls", "new delhi station"]},
+    {"name": "Gurgaon", "lat": 28.4595, "lng": 77.0266,
+     "formatted_address": "Gurugram, Haryana, India",
+     "aliases": ["gurugram"]},
+    {"name": "Cyber City", "lat": 28.4950, "lng": 77.0895,
+     "formatted_address": "DLF Cyber City, Gurugram, Haryana, India",
+     "aliases": ["dlf cyber city", "cyber hub"]},
+    {"name": "Noida", "lat": 28.5355, "lng": 77.3910,
+     "formatted_address": "Noida, Uttar Pradesh, India",
+     "aliases": []},
+    {"name": "Noida Sector 62", "lat": 28.6270, "lng": 77.3650,
+     "formatted_address": "Sector 62, Noida, Uttar Pradesh, India",
+     "aliases": ["sector 62 noida"]},
+    {"name": "Delhi", "lat": 28.6139, "lng": 77.2090,
+     "formatted_address": "Delhi, India",
+     "aliases": ["new delhi"]},
+    # Bangalore
+    {"name": "Kempegowda Airport", "lat": 13.1986, "lng": 77.7066,
+     "formatted_address": "Kempegowda International Airport, Bengaluru, Karnataka, India",
+     "aliases": ["kempegowda international airport"]},
+    {"name": "Bangalore Airport", "lat": 13.1986, "lng": 77.7066,
+     "formatted_address": "Bengaluru Airport, Devanahalli, Karnataka, India",
+     "aliases": ["bengaluru airport", "blr airport"]},
+    {"name": "Electronic City", "lat": 12.8452, "lng": 77.6602,
+     "formatted_address": "Electronic City, Bengaluru, Karnataka, India",
+     "aliases": ["electronics city"]},
+    {"name": "Whitefield", "lat": 12.9698, "lng": 77.7500,
+     "formatted_address": "Whitefield, Bengaluru, Karnataka, India",
+     "aliases": []},
+    {"name": "ITPL", "lat": 12.9863, "lng": 77.7375,
+     "formatted_address": "International Tech Park, Whitefield, Bengaluru, Karnataka, India",
+     "aliases": ["international tech park bangalore", "whitefield itpl"]},
+    {"name": "Koramangala", "lat": 12.9352, "lng": 77.6245,
+     "formatted_address": "Koramangala, Bengaluru, Karnataka, India",
+     "aliases": []},
+    {"name": "MG Road", "lat": 12.9756, "lng": 77.6050,
+     "formatted_address": "Mahatma Gandhi Road, Bengaluru, Karnataka, India",
+     "aliases": ["mahatma gandhi road bangalore", "mg road bangalore"]},
+    {"name": "Indiranagar", "lat": 12.9784, "lng": 77.6408,
+     "formatted_address": "Indiranagar, Bengaluru, Karnataka, India",
+     "aliases": ["indira nagar bangalore"]},
+    {"name": "Bangalore City Railway Station", "lat": 12.9779, "lng": 77.5693,
+     "formatted_address": "KSR Bengaluru City Railway Station, Bengaluru, Karnataka, India",
+     "aliases": ["ksr bengaluru", "bangalore city station", "majestic railway station"]},
+    {"name": "Bangalore", "lat": 12.9716, "lng": 77.5946,
+     "formatted_address": "Bengaluru, Karnataka, India",
+     "aliases": ["bengaluru"]},
+    # Kolkata
+    {"name": "Netaji Subhas Airport", "lat": 22.6547, "lng": 88.4467,
+     "formatted_address": "Netaji Subhas Chandra Bose International Airport, Kolkata, West Bengal, India",
+     "aliases": ["netaji subhas chandra bose international airport"]},
+    {"name": "Kolkata Airport", "lat": 22.6547, "lng": 88.4467,
+     "formatted_address": "Kolkata Airport, Dum Dum, Kolkata, West Bengal, India",
+     "aliases": ["ccu airport", "calcutta airport"]},
+    {"name": "Salt Lake Sector V", "lat": 22.5697, "lng": 88.4337,
+     "formatted_address": "Sector V, Bidhannagar, Kolkata, West Bengal, India",
+     "aliases": ["sector v kolkata", "salt lake sector 5"]},
+    {"name": "Salt Lake", "lat": 22.5867, "lng": 88.4171,
+     "formatted_address": "Salt Lake City, Bidhannagar, Kolkata, West Bengal, India",
+     "aliases": ["bidhannagar", "salt lake city kolkata"]},
+    {"name": "Park Street", "lat": 22.5530, "lng": 88.3520,
+     "formatted_address": "Park Street, Kolkata, West Bengal, India",
+     "aliases": []},
+    {"name": "Howrah Station", "lat": 22.5839, "lng": 88.3425,
+     "formatted_address": "Howrah Railway Station, Howrah, West Bengal, India",
+     "aliases": ["howrah railway station", "howrah junction"]},
+    {"name": "Sealdah Station", "lat": 22.5678, "lng": 88.3707,
+     "formatted_address": "Sealdah Railway Station, Kolkata, West Bengal, India",
+     "aliases": ["sealdah railway station"]},
+    {"name": "Kolkata", "lat": 22.5726, "lng": 88.3639,
+     "formatted_address": "Kolkata, West Bengal, India",
+     "aliases": ["calcutta"]},
+    # Hyderabad
+    {"name": "Rajiv Gandhi Airport", "lat": 17.2403, "lng": 78.4294,
+     "formatted_address": "Rajiv Gandhi International Airport, Shamshabad, Hyderabad, Telangana, India",
+     "aliases": ["rajiv gandhi international airport", "shamshabad airport"]},
+    {"name": "Hyderabad Airport", "lat": 17.2403, "lng": 78.4294,
+     "formatted_address": "Hyderabad Airport, Shamshabad, Telangana, India",
+     "aliases": ["hyd airport"]},
+    {"name": "HITEC City", "lat": 17.4435, "lng": 78.3772,
+     "formatted_address": "HITEC City, Hyderabad, Telangana, India",
+     "aliases": ["hitech city"]},
+    {"name": "Gachibowli", "lat": 17.4401, "lng": 78.3489,
+     "formatted_address": "Gachibowli, Hyderabad, Telangana, India",
+     "aliases": []},
+    {"name": "Banjara Hills", "lat": 17.4126, "lng": 78.4482,
+     "formatted_address": "Banjara Hills, Hyderabad, Telangana, India",
+     "aliases": []},
+    {"name": "Secunderabad Station", "lat": 17.4344, "lng": 78.5013,
+     "formatted_address": "Secunderabad Railway Station, Secunderabad, Telangana, India",
+     "aliases": ["secunderabad railway station", "secunderabad junction"]},
+    {"name": "Secunderabad", "lat": 17.4399, "lng": 78.4983,
+     "formatted_address": "Secunderabad, Telangana, India",
+     "aliases": []},
+    {"name": "Madhapur", "lat": 17.4483, "lng": 78.3915,
+     "formatted_address": "Madhapur, Hyderabad, Telangana, India",
+     "aliases": []},
+    {"name": "Kukatpally", "lat": 17.4948, "lng": 78.3996,
+     "formatted_address": "Kukatpally, Hyderabad, Telangana, India",
+     "aliases": []},
+    {"name": "Hyderabad", "lat": 17.3850, "lng": 78.4867,
+     "formatted_address": "Hyderabad, Telangana, India",
+     "aliases": []},
+    # Intercity destinations
+    {"name": "Jaipur", "lat": 26.9124, "lng": 75.7873,
+     "formatted_address": "Jaipur, Rajasthan, India",
+     "aliases": []},
+    {"name": "Agra", "lat": 27.1767, "lng": 78.0081,
+     "formatted_address": "Agra, Uttar Pradesh, India",
+     "aliases": []},
+    {"name": "Mysore", "lat": 12.2958, "lng": 76.6394,
+     "formatted_address": "Mysuru, Karnataka, India",
+     "aliases": ["mysuru"]},
+    {"name": "Vijayawada", "lat": 16.5062, "lng": 80.6480,
+     "formatted_address": "Vijayawada, Andhra Pradesh, India",
+     "aliases": []},
+]
+
+# normalized alias -> place, plus the sorted aliases for prefix lookups
+ALIAS_INDEX = {}
+PLACES_BY_ID = {}
+_SORTED_ALIASES = []
+
+
+def normalize_place_name(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _place_id(name: str) -> str:
+    return PLACE_ID_PREFIX + normalize_place_name(name).replace(" ", "_")
+
+
+def load_gazetteer(path: Optional[str] = GAZETTEER_FILE):
+    """(Re)build the alias index from GAZETTEER_PLACES plus an optional JSON file of extra places."""
+    places = list(GAZETTEER_PLACES)
+    if path:
+        try:
+            with open(path, 'r') as f:
+                places.extend(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load gazetteer file", extra={"path": path, "error": str(e)})
+
+    ALIAS_INDEX.clear()
+    PLACES_BY_ID.clear()
+    for place in places:
+        place = dict(place, place_id=place.get("place_id") or _place_id(place["name"]))
+        PLACES_BY_ID[place["place_id"]] = place
+        for alias in [place["name"], *place.get("aliases", [])]:
+            ALIAS_INDEX.setdefault(normalize_place_name(alias), place)
+    _SORTED_ALIASES[:] = sorted(ALIAS_INDEX)
+    logger.debug(
+        "Gazetteer loaded",
+        extra={"place_count": len(PLACES_BY_ID), "alias_count": len(ALIAS_INDEX)}
+    )
+
+
+def find_place(query: str) -> Optional[dict]:
+    """The place the query names exactly (as its name or an alias), if any."""
+    if not GAZETTEER_ENABLED:
+        return None
+    return ALIAS_INDEX.get(normalize_place_name(query))
+
+
+def match_places(query: str, limit: int = 5) -> list[dict]:
+    """Exact alias match, or else places with an alias starting with the query.
+
+    Prefix matches are only guesses at what was meant ("park" for Park
+    Street), so callers should let the user confirm them.
+    """
+    if not GAZETTEER_ENABLED:
+        return []
+    key = normalize_place_name(query)
+    if key in ALIAS_INDEX:
+        return [ALIAS_INDEX[key]]
+    if len(key) < GAZETTEER_MIN_PREFIX:
+        return []
+    matches = []
+    position = bisect.bisect_left(_SORTED_ALIASES, key)
+    while position < len(_SORTED_ALIASES) and _SORTED_ALIASES[position].startswith(key):
+        place = ALIAS_INDEX[_SORTED_ALIASES[position]]
+        if place not in matches:
+            matches.append(place)
+            if len(matches) == limit:
+                break
+        position += 1
+    return matches
+
+
+def lookup_place(name: str) -> Optional[dict]:
+    """Exact alias lookup, regardless of GAZETTEER_ENABLED."""
+    return ALIAS_INDEX.get(normalize_place_name(name))
+
+
+def get_place(place_id: str) -> Optional[dict]:
+    return PLACES_BY_ID.get(place_id)
+
+
+def is_gazetteer_place_id(place_id: str) -> bool:
+    return place_id.startswith(PLACE_ID_PREFIX)
+
+
+def to_location_option(place: dict) -> LocationOption:
+    return LocationOption(
+        place_id=place["place_id"],
+        formatted_address=place["formatted_address"],
+        name=place["name"],
+        lat=place["lat"],
+        lng=place["lng"]
+    )
+
+
+def to_resolved_location(place: dict, original_query: str = "") -> ResolvedLocation:
+    return ResolvedLocation(
+        original_query=original_query,
+        place_id=place["place_id"],
+        formatted_address=place["formatted_address"],
+        name=place["name"],
+        lat=place["lat"],
+        lng=place["lng"]
+    )
+
+
+load_gazetteer()
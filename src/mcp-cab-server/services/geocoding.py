@@ -1,3 +1,4 @@
+import json
 import os
 from typing import Optional
 import httpx
@@ -7,6 +8,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from models.models import LocationOption, ResolvedLocation
+from services.cache import TTLCache, SingleFlight, MISSING
+from services.gazetteer import get_place, is_gazetteer_place_id, to_resolved_location
+from services.resilience import ResilientEndpoint, CircuitBreaker, CircuitOpenError, RetryableError
+from services.rate_limit import RateLimiter, QuotaExceededError
 from services.logging_config import get_logger
 
 logger = get_logger(__name__, service="geocoding")
@@ -22,16 +27,230 @@ if not GOOGLE_PLACES_API_KEY:
 PLACES_AUTOCOMPLETE_URL = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
 PLACES_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
 
+GEOCODING_TIMEOUT = float(os.getenv("GEOCODING_TIMEOUT", "10.0"))
+GEOCODING_MAX_CONNECTIONS = int(os.getenv("GEOCODING_MAX_CONNECTIONS", "20"))
+GEOCODING_MAX_KEEPALIVE = int(os.getenv("GEOCODING_MAX_KEEPALIVE", "10"))
+GEOCODING_KEEPALIVE_EXPIRY = float(os.getenv("GEOCODING_KEEPALIVE_EXPIRY", "30.0"))
+GEOCODING_HTTP2 = os.getenv("GEOCODING_HTTP2", "false").lower() in ("1", "true", "yes")
+GEOCODING_MIN_TIMEOUT = float(os.getenv("GEOCODING_MIN_TIMEOUT", "1.0"))
+# Per-attempt timeout until enough latency samples exist for the adaptive one
+GEOCODING_COLD_TIMEOUT = float(os.getenv("GEOCODING_COLD_TIMEOUT", "3.0"))
+GEOCODING_RETRIES = int(os.getenv("GEOCODING_RETRIES", "2"))
+GEOCODING_HEDGE = os.getenv("GEOCODING_HEDGE", "false").lower() in ("1", "true", "yes")
+GEOCODING_BREAKER_THRESHOLD = int(os.getenv("GEOCODING_BREAKER_THRESHOLD", "5"))
+GEOCODING_BREAKER_RESET = float(os.getenv("GEOCODING_BREAKER_RESET", "30.0"))
+
+PLACES_QPS = float(os.getenv("PLACES_QPS", "10"))
+PLACES_AUTOCOMPLETE_QPS = float(os.getenv("PLACES_AUTOCOMPLETE_QPS", "10"))
+PLACES_DETAILS_QPS = float(os.getenv("PLACES_DETAILS_QPS", "10"))
+PLACES_AUTOCOMPLETE_DAILY_BUDGET = int(os.getenv("PLACES_AUTOCOMPLETE_DAILY_BUDGET", "0"))
+PLACES_DETAILS_DAILY_BUDGET = int(os.getenv("PLACES_DETAILS_DAILY_BUDGET", "0"))
+OVER_QUERY_LIMIT_PAUSE = float(os.getenv("OVER_QUERY_LIMIT_PAUSE", "2.0"))
+
+try:
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+if GEOCODING_HTTP2 and not HTTP2_AVAILABLE:
+    logger.warning("GEOCODING_HTTP2 is enabled but the 'h2' package is not installed, using HTTP/1.1")
+
+GEOCODING_CACHE_SIZE = int(os.getenv("GEOCODING_CACHE_SIZE", "2048"))
+AUTOCOMPLETE_CACHE_TTL = float(os.getenv("AUTOCOMPLETE_CACHE_TTL", "21600"))
+DETAILS_CACHE_TTL = float(os.getenv("DETAILS_CACHE_TTL", "86400"))
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+GEOCODING_CACHE_FILE = os.getenv("GEOCODING_CACHE_FILE")
+
+# Keyed on normalized query text and place_id respectively
+AUTOCOMPLETE_CACHE = TTLCache("autocomplete", GEOCODING_CACHE_SIZE, AUTOCOMPLETE_CACHE_TTL, NEGATIVE_CACHE_TTL)
+DETAILS_CACHE = TTLCache("details", GEOCODING_CACHE_SIZE, DETAILS_CACHE_TTL, NEGATIVE_CACHE_TTL)
+
+# Identical lookups that are already in flight share one upstream request
+AUTOCOMPLETE_FLIGHTS = SingleFlight("autocomplete")
+DETAILS_FLIGHTS = SingleFlight("details")
+
+
+def _places_endpoint(name: str) -> ResilientEndpoint:
+    return ResilientEndpoint(
+        name,
+        max_timeout=GEOCODING_TIMEOUT,
+        min_timeout=GEOCODING_MIN_TIMEOUT,
+        cold_timeout=GEOCODING_COLD_TIMEOUT,
+        retries=GEOCODING_RETRIES,
+        hedge=GEOCODING_HEDGE,
+        breaker=CircuitBreaker(GEOCODING_BREAKER_THRESHOLD, GEOCODING_BREAKER_RESET),
+    )
+
+
+AUTOCOMPLETE_ENDPOINT = _places_endpoint("autocomplete")
+DETAILS_ENDPOINT = _places_endpoint("details")
+
+# One limiter for the shared API key. Details lookups finish a search the user
+# is already waiting on, so they jump ahead of queued autocomplete calls.
+PLACES_RATE_LIMITER = RateLimiter(
+    "places",
+    qps=PLACES_QPS,
+    endpoint_qps={"autocomplete": PLACES_AUTOCOMPLETE_QPS, "details": PLACES_DETAILS_QPS},
+    daily_budgets={"autocomplete": PLACES_AUTOCOMPLETE_DAILY_BUDGET, "details": PLACES_DETAILS_DAILY_BUDGET},
+    priorities={"details": 0, "autocomplete": 1},
+)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared pooled client for Google Places; keeps connections alive between calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=GEOCODING_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=GEOCODING_MAX_CONNECTIONS,
+                max_keepalive_connections=GEOCODING_MAX_KEEPALIVE,
+                keepalive_expiry=GEOCODING_KEEPALIVE_EXPIRY,
+            ),
+            http2=GEOCODING_HTTP2 and HTTP2_AVAILABLE,
+        )
+        logger.debug(
+            "Geocoding HTTP client created",
+            extra={
+                "max_connections": GEOCODING_MAX_CONNECTIONS,
+                "http2": GEOCODING_HTTP2 and HTTP2_AVAILABLE
+            }
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.debug("Geocoding HTTP client closed")
+
+
+async def _places_get(endpoint: ResilientEndpoint, url: str, params: dict) -> dict:
+    async def attempt(timeout: float) -> dict:
+        await PLACES_RATE_LIMITER.acquire(endpoint.name)
+        response = await get_http_client().get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "OVER_QUERY_LIMIT":
+            # Retried once the pause is over, which the limiter enforces
+            PLACES_RATE_LIMITER.pause(OVER_QUERY_LIMIT_PAUSE)
+            raise RetryableError(f"Places {endpoint.name} returned OVER_QUERY_LIMIT")
+        return data
+    return await endpoint.call(attempt)
+
+
+def get_quota_usage() -> dict:
+    return PLACES_RATE_LIMITER.usage()
+
+
+def get_geocoding_metrics() -> dict:
+    return {
+        "quota": get_quota_usage(),
+        "endpoints": get_resilience_stats(),
+        "cache": get_cache_stats(),
+    }
+
+
+def get_resilience_stats() -> dict:
+    return {
+        "autocomplete": AUTOCOMPLETE_ENDPOINT.stats(),
+        "details": DETAILS_ENDPOINT.stats(),
+    }
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def get_cache_stats() -> dict:
+    return {
+        "autocomplete": {**AUTOCOMPLETE_CACHE.stats(), "single_flight": AUTOCOMPLETE_FLIGHTS.stats()},
+        "details": {**DETAILS_CACHE.stats(), "single_flight": DETAILS_FLIGHTS.stats()},
+    }
+
+
+def load_geocoding_cache(path: Optional[str] = GEOCODING_CACHE_FILE):
+    """Warm the caches from a file written by save_geocoding_cache()."""
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        autocomplete_count = AUTOCOMPLETE_CACHE.restore(
+            data.get("autocomplete", []),
+            lambda options: [LocationOption(**option) for option in options]
+        )
+        details_count = DETAILS_CACHE.restore(
+            data.get("details", []),
+            lambda location: ResolvedLocation(**location) if location else None
+        )
+        logger.info(
+            "Geocoding cache loaded",
+            extra={"autocomplete_entries": autocomplete_count, "details_entries": details_count}
+        )
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning("Could not load geocoding cache", extra={"path": path, "error": str(e)})
+
+
+def save_geocoding_cache(path: Optional[str] = GEOCODING_CACHE_FILE):
+    if not path:
+        return
+    data = {
+        "autocomplete": AUTOCOMPLETE_CACHE.dump(lambda options: [option.model_dump() for option in options]),
+        "details": DETAILS_CACHE.dump(lambda location: location.model_dump() if location else None),
+    }
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        logger.info(
+            "Geocoding cache saved",
+            extra={"autocomplete_entries": len(data["autocomplete"]), "details_entries": len(data["details"])}
+        )
+    except OSError as e:
+        logger.warning("Could not save geocoding cache", extra={"path": path, "error": str(e)})
+
+
+load_geocoding_cache()
+
 
 async def geocode_location(query: str) -> list[LocationOption]:
     if not query or not query.strip():
         logger.warning("Received empty geocoding query")
         return []
     
+    cache_key = normalize_query(query)
+    cached = AUTOCOMPLETE_CACHE.get(cache_key)
+    if cached is not MISSING:
+        logger.debug("Geocoding cache hit", extra={"query": query, "results_count": len(cached)})
+        return list(cached)
+    
     if not GOOGLE_PLACES_API_KEY:
         logger.error("GOOGLE_PLACES_API_KEY not configured")
         raise ValueError("Location service is not configured. Please contact administrator.")
     
+    results = await AUTOCOMPLETE_FLIGHTS.do(cache_key, lambda: _fetch_autocomplete(query, cache_key))
+    return list(results)
+
+
+def _stale_autocomplete(cache_key: str) -> list[LocationOption]:
+    stale = AUTOCOMPLETE_CACHE.get(cache_key, allow_stale=True)
+    return [] if stale is MISSING else stale
+
+
+def _stale_details(place_id: str) -> Optional[ResolvedLocation]:
+    stale = DETAILS_CACHE.get(place_id, allow_stale=True)
+    return None if stale is MISSING else stale
+
+
+async def _fetch_autocomplete(query: str, cache_key: str) -> list[LocationOption]:
     try:
         logger.debug(
             "Sending geocoding request to Google Places API",
@@ -44,16 +263,15 @@ async def geocode_location(query: str) -> list[LocationOption]:
             "types": "geocode|establishment",
         }
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(PLACES_AUTOCOMPLETE_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+        data = await _places_get(AUTOCOMPLETE_ENDPOINT, PLACES_AUTOCOMPLETE_URL, params)
         
         if data.get("status") != "OK":
             logger.warning(
                 "Google Places API returned non-OK status",
                 extra={"status": data.get("status"), "query": query}
             )
+            if data.get("status") == "ZERO_RESULTS":
+                AUTOCOMPLETE_CACHE.set(cache_key, [])
             return []
         
         predictions = data.get("predictions", [])
@@ -74,21 +292,40 @@ async def geocode_location(query: str) -> list[LocationOption]:
             )
             location_options.append(location_option)
         
+        AUTOCOMPLETE_CACHE.set(cache_key, location_options)
         return location_options
     
+    except CircuitOpenError:
+        logger.warning(
+            "Places autocomplete circuit open, serving from cache",
+            extra={"query": query}
+        )
+        return _stale_autocomplete(cache_key)
+    except QuotaExceededError as e:
+        logger.error(
+            "Places autocomplete quota exhausted, serving from cache",
+            extra={"query": query, "error": str(e)}
+        )
+        return _stale_autocomplete(cache_key)
+    except RetryableError as e:
+        logger.error(
+            "Places autocomplete rate limited, serving from cache",
+            extra={"query": query, "error": str(e)}
+        )
+        return _stale_autocomplete(cache_key)
     except httpx.TimeoutException:
         logger.error(
             "Geocoding request timed out",
-            extra={"query": query, "timeout": "10s"}
+            extra={"query": query, "timeout": f"{AUTOCOMPLETE_ENDPOINT.timeout()}s"}
         )
-        return []
+        return _stale_autocomplete(cache_key)
     except httpx.HTTPError as e:
         logger.error(
             "HTTP error during geocoding",
             extra={"query": query, "error": str(e)},
             exc_info=True
         )
-        return []
+        return _stale_autocomplete(cache_key)
     except Exception as e:
         logger.error(
             "Unexpected error during geocoding",
@@ -102,9 +339,20 @@ async def resolve_location_by_place_id(place_id: str) -> Optional[ResolvedLocati
     if not place_id:
         logger.warning("Received empty place_id for resolution")
         return None
+    if is_gazetteer_place_id(place_id):
+        place = get_place(place_id)
+        return to_resolved_location(place) if place else None
+    cached = DETAILS_CACHE.get(place_id)
+    if cached is not MISSING:
+        logger.debug("Place details cache hit", extra={"place_id": place_id})
+        return cached
     if not GOOGLE_PLACES_API_KEY:
         logger.error("GOOGLE_PLACES_API_KEY not configured for location resolution")
         return None
+    return await DETAILS_FLIGHTS.do(place_id, lambda: _fetch_place_details(place_id))
+
+
+async def _fetch_place_details(place_id: str) -> Optional[ResolvedLocation]:
     try:
         logger.debug(
             "Resolving location details by place_id",
@@ -117,16 +365,15 @@ async def resolve_location_by_place_id(place_id: str) -> Optional[ResolvedLocati
             "fields": "place_id,formatted_address,name,geometry",
         }
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(PLACES_DETAILS_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+        data = await _places_get(DETAILS_ENDPOINT, PLACES_DETAILS_URL, params)
         
         if data.get("status") != "OK":
             logger.warning(
                 "Google Places Details API returned non-OK status",
                 extra={"status": data.get("status"), "place_id": place_id}
             )
+            if data.get("status") in ("NOT_FOUND", "ZERO_RESULTS"):
+                DETAILS_CACHE.set(place_id, None)
             return None
         
         result = data.get("result", {})
@@ -150,21 +397,40 @@ async def resolve_location_by_place_id(place_id: str) -> Optional[ResolvedLocati
                 "coordinates": f"({resolved_location.lat}, {resolved_location.lng})"
             }
         )
+        DETAILS_CACHE.set(place_id, resolved_location)
         return resolved_location
     
+    except CircuitOpenError:
+        logger.warning(
+            "Places details circuit open, serving from cache",
+            extra={"place_id": place_id}
+        )
+        return _stale_details(place_id)
+    except QuotaExceededError as e:
+        logger.error(
+            "Places details quota exhausted, serving from cache",
+            extra={"place_id": place_id, "error": str(e)}
+        )
+        return _stale_details(place_id)
+    except RetryableError as e:
+        logger.error(
+            "Places details rate limited, serving from cache",
+            extra={"place_id": place_id, "error": str(e)}
+        )
+        return _stale_details(place_id)
     except httpx.TimeoutException:
         logger.error(
             "Location resolution timed out",
-            extra={"place_id": place_id, "timeout": "10s"}
+            extra={"place_id": place_id, "timeout": f"{DETAILS_ENDPOINT.timeout()}s"}
         )
-        return None
+        return _stale_details(place_id)
     except httpx.HTTPError as e:
         logger.error(
             "HTTP error during location resolution",
             extra={"place_id": place_id, "error": str(e)},
             exc_info=True
         )
-        return None
+        return _stale_details(place_id)
     except Exception as e:
         logger.error(
             "Unexpected error during location resolution",
@@ -1,8 +1,14 @@
-from .mock_db import MOCK_CAB_DB , create_booking_hold ,  get_cab_by_id ,add_passenger_to_hold , get_passenger_details , is_hold_expired
-from models.models import  SearchResponse , IndividualCabResponse , HoldCabResponse , BookingStatus  ,  PassengerDetailsResponse
-from typing import List , Union
+from .mock_db import MOCK_CAB_DB , DEFAULT_CABS , register_quoted_cabs , create_booking_hold , create_booking_holds_bulk ,  get_cab_by_id ,add_passenger_to_hold , get_passenger_details , is_hold_expired
+from models.models import  SearchResponse , IndividualCabResponse , HoldCabResponse , BookingStatus  ,  PassengerDetailsResponse , HoldCabRequest , BulkHoldItemResult
+from typing import List , Union , Optional
 from services.logging_config import get_logger
+from services.gazetteer import lookup_place
+from services.spatial import GeohashIndex , haversine_km
+from services.fares import quote_fares , is_quote_cab_id
 from datetime import datetime , timedelta , date
+from collections import Counter
+import os
+import re
 logger = get_logger(__name__, service="helper")
 
 
@@ -13,16 +19,122 @@ def ensure_isoformat(value: Union[datetime, date, str]) -> str:
         return value.isoformat()
     return str(value)
 
-DEFAULT_CABS = [
-    {"cab_id": "DEF_CAB_MINI", "cab_type": "mini", "price": 300},
-    {"cab_id": "DEF_CAB_SEDAN", "cab_type": "sedan", "price": 500},
-    {"cab_id": "DEF_CAB_SUV", "cab_type": "suv", "price": 700},
-    {"cab_id": "DEF_CAB_PRIME_SEDAN", "cab_type": "prime sedan", "price": 900},
-]
+INTRA_CITY_CITIES = ["mumbai", "pune", "delhi", "bangalore", "hyderabad"]
 
-def get_available_cabs(pickup: str, drop: str) -> SearchResponse:
+ROUTE_MATCH_RADIUS_KM = float(os.getenv("ROUTE_MATCH_RADIUS_KM", "5.0"))
+
+# Inverted indexes over the MOCK_CAB_DB route keys, built by rebuild_route_index()
+PICKUP_KEYWORD_INDEX = {}  # keyword -> set of route keys
+DROP_KEYWORD_INDEX = {}    # keyword -> set of route keys
+CITY_ROUTES = {}           # city -> route keys within that city, in catalog order
+ROUTE_POSITION = {}        # route key -> position in MOCK_CAB_DB
+ROUTE_COORDINATES = {}     # route key -> ((pickup lat, lng), (drop lat, lng)) from the gazetteer
+PICKUP_SPATIAL_INDEX = GeohashIndex()  # route pickup points
+
+def _tokenize(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+def _route_keywords(name: str) -> set:
+    return {word for word in _tokenize(name) if len(word) > 3}
+
+def rebuild_route_index():
+    """Rebuild the fuzzy-match indexes; call after MOCK_CAB_DB changes."""
+    PICKUP_KEYWORD_INDEX.clear()
+    DROP_KEYWORD_INDEX.clear()
+    CITY_ROUTES.clear()
+    ROUTE_POSITION.clear()
+    ROUTE_COORDINATES.clear()
+    for position, (pickup_key, drop_key) in enumerate(MOCK_CAB_DB):
+        route = (pickup_key, drop_key)
+        ROUTE_POSITION[route] = position
+        pickup_place = lookup_place(pickup_key)
+        drop_place = lookup_place(drop_key)
+        if pickup_place and drop_place:
+            ROUTE_COORDINATES[route] = (
+                (pickup_place["lat"], pickup_place["lng"]),
+                (drop_place["lat"], drop_place["lng"])
+            )
+        for keyword in _route_keywords(pickup_key):
+            PICKUP_KEYWORD_INDEX.setdefault(keyword, set()).add(route)
+        for keyword in _route_keywords(drop_key):
+            DROP_KEYWORD_INDEX.setdefault(keyword, set()).add(route)
+        for city in INTRA_CITY_CITIES:
+            if city in pickup_key and city in drop_key:
+                CITY_ROUTES.setdefault(city, []).append(route)
+    PICKUP_SPATIAL_INDEX.build(
+        (pickup[0], pickup[1], route) for route, (pickup, _) in ROUTE_COORDINATES.items()
+    )
+    logger.debug(
+        "Route index rebuilt",
+        extra={
+            "route_count": len(ROUTE_POSITION),
+            "keyword_count": len(PICKUP_KEYWORD_INDEX) + len(DROP_KEYWORD_INDEX),
+            "located_route_count": len(ROUTE_COORDINATES)
+        }
+    )
+
+def find_fuzzy_route(pickup_lower: str, drop_lower: str) -> Optional[tuple]:
+    """Best catalog route sharing keywords with both ends of the request.
+
+    Routes are ranked by the number of matched keywords, then by catalog order.
+    """
+    pickup_hits = Counter()
+    for token in _tokenize(pickup_lower):
+        pickup_hits.update(PICKUP_KEYWORD_INDEX.get(token, ()))
+    drop_hits = Counter()
+    for token in _tokenize(drop_lower):
+        drop_hits.update(DROP_KEYWORD_INDEX.get(token, ()))
+    candidates = pickup_hits.keys() & drop_hits.keys()
+    if not candidates:
+        return None
+    return max(
+        candidates,
+        key=lambda route: (pickup_hits[route] + drop_hits[route], -ROUTE_POSITION[route])
+    )
+
+def find_nearest_route(
+    pickup_coords: tuple,
+    drop_coords: tuple,
+    radius_km: float = ROUTE_MATCH_RADIUS_KM
+) -> Optional[tuple]:
+    """Catalog route whose pickup and drop both lie within radius_km of the request.
+
+    Routes are ranked by combined pickup + drop distance, then by catalog order.
+    Returns (route, pickup_km, drop_km) or None.
+    """
+    best = None
+    for pickup_km, route in PICKUP_SPATIAL_INDEX.within(pickup_coords[0], pickup_coords[1], radius_km):
+        route_drop = ROUTE_COORDINATES[route][1]
+        drop_km = haversine_km(drop_coords[0], drop_coords[1], route_drop[0], route_drop[1])
+        if drop_km > radius_km:
+            continue
+        rank = (pickup_km + drop_km, ROUTE_POSITION[route])
+        if best is None or rank < best[0]:
+            best = (rank, route, pickup_km, drop_km)
+    if best is None:
+        return None
+    return best[1:]
+
+rebuild_route_index()
+
+def _usable_coords(coords: Optional[tuple]) -> Optional[tuple]:
+    # Details responses default lat/lng to 0.0 when the place has no geometry
+    if not coords or coords[0] is None or coords[1] is None:
+        return None
+    if coords[0] == 0 and coords[1] == 0:
+        return None
+    return coords
+
+def get_available_cabs(
+    pickup: str,
+    drop: str,
+    pickup_coords: Optional[tuple] = None,
+    drop_coords: Optional[tuple] = None
+) -> SearchResponse:
     pickup_lower = pickup.lower()
     drop_lower = drop.lower()
+    pickup_coords = _usable_coords(pickup_coords)
+    drop_coords = _usable_coords(drop_coords)
     
     logger.info(
         "Searching for available cabs",
@@ -43,21 +155,18 @@ def get_available_cabs(pickup: str, drop: str) -> SearchResponse:
             for cab in exact_match
         ])
     
-    logger.debug("No exact match, attempting fuzzy matching")
-    
-    for (pickup_key, drop_key), cabs in MOCK_CAB_DB.items():
-        pickup_keywords = [w for w in pickup_key.split() if len(w) > 3]
-        drop_keywords = [w for w in drop_key.split() if len(w) > 3]
-        
-        pickup_match = any(keyword in pickup_lower for keyword in pickup_keywords)
-        drop_match = any(keyword in drop_lower for keyword in drop_keywords)
-        
-        if pickup_match and drop_match:
+    if pickup_coords and drop_coords:
+        nearest = find_nearest_route(pickup_coords, drop_coords)
+        if nearest:
+            (pickup_key, drop_key), pickup_km, drop_km = nearest
+            cabs = MOCK_CAB_DB[(pickup_key, drop_key)]
             logger.info(
-                "Fuzzy match found",
+                "Nearby route match found",
                 extra={
                     "requested": f"{pickup_lower} → {drop_lower}",
                     "matched": f"{pickup_key} → {drop_key}",
+                    "pickup_km": round(pickup_km, 2),
+                    "drop_km": round(drop_km, 2),
                     "cab_count": len(cabs)
                 }
             )
@@ -65,26 +174,56 @@ def get_available_cabs(pickup: str, drop: str) -> SearchResponse:
                 IndividualCabResponse(cab_id=cab["cab_id"], cab_type=cab["cab_type"], price=cab["price"]) 
                 for cab in cabs
             ])
+
+    
+    logger.debug("No exact match, attempting fuzzy matching")
+    
+    fuzzy_route = find_fuzzy_route(pickup_lower, drop_lower)
+    if fuzzy_route:
+        pickup_key, drop_key = fuzzy_route
+        cabs = MOCK_CAB_DB[fuzzy_route]
+        logger.info(
+            "Fuzzy match found",
+            extra={
+                "requested": f"{pickup_lower} → {drop_lower}",
+                "matched": f"{pickup_key} → {drop_key}",
+                "cab_count": len(cabs)
+            }
+        )
+        return SearchResponse(cabs=[
+            IndividualCabResponse(cab_id=cab["cab_id"], cab_type=cab["cab_type"], price=cab["price"]) 
+            for cab in cabs
+        ])
     
     logger.debug("Checking for intra-city routes")
     
-    cities = ["mumbai", "pune", "delhi", "bangalore", "hyderabad"]
-    for city in cities:
-        if city in pickup_lower and city in drop_lower:
+    for city in INTRA_CITY_CITIES:
+        if city in pickup_lower and city in drop_lower and CITY_ROUTES.get(city):
             logger.info(
                 "Intra-city route detected",
                 extra={"city": city, "route": f"{pickup_lower} → {drop_lower}"}
             )
-            for (pickup_key, drop_key), cabs in MOCK_CAB_DB.items():
-                if city in pickup_key and city in drop_key:
-                    logger.debug(
-                        "Found intra-city cab options",
-                        extra={"matched_route": f"{pickup_key} → {drop_key}"}
-                    )
-                    return SearchResponse(cabs=[
-                        IndividualCabResponse(cab_id=cab["cab_id"], cab_type=cab["cab_type"], price=cab["price"]) 
-                        for cab in cabs
-                    ])
+            pickup_key, drop_key = CITY_ROUTES[city][0]
+            logger.debug(
+                "Found intra-city cab options",
+                extra={"matched_route": f"{pickup_key} → {drop_key}"}
+            )
+            return SearchResponse(cabs=[
+                IndividualCabResponse(cab_id=cab["cab_id"], cab_type=cab["cab_type"], price=cab["price"]) 
+                for cab in MOCK_CAB_DB[(pickup_key, drop_key)]
+            ])
+    
+    if pickup_coords and drop_coords:
+        quoted = quote_fares(pickup_coords, drop_coords)
+        register_quoted_cabs(quoted, pickup_lower, drop_lower)
+        logger.info(
+            "No catalog route matched, pricing trip by distance",
+            extra={"route": f"{pickup_lower} → {drop_lower}", "cab_count": len(quoted)}
+        )
+        return SearchResponse(cabs=[
+            IndividualCabResponse(cab_id=cab["cab_id"], cab_type=cab["cab_type"], price=cab["price"]) 
+            for cab in quoted
+        ])
     
     logger.warning(
         "No specific route found, returning default cabs",
@@ -96,6 +235,12 @@ def get_available_cabs(pickup: str, drop: str) -> SearchResponse:
         for cab in DEFAULT_CABS
     ])
 
+def unknown_cab_error(cab_id: str)->str:
+    if is_quote_cab_id(cab_id):
+        # Quotes only live in this process's memory
+        return f"Fare quote {cab_id} has expired or is unknown. Please search again for a fresh quote."
+    return f"Invalid cab_id: {cab_id}. Cab not found in search results."
+
 def hold_cab(cab_id: str , pickup: str , drop: str , departure_date)->HoldCabResponse:
     logger.info(
         "Creating cab hold",
@@ -108,7 +253,7 @@ def hold_cab(cab_id: str , pickup: str , drop: str , departure_date)->HoldCabRes
             "Cab not found in database",
             extra={"cab_id": cab_id}
         )
-        raise ValueError(f"Invalid cab_id: {cab_id}. Cab not found in search results.")
+        raise ValueError(unknown_cab_error(cab_id))
     
     hold_data = create_booking_hold(cab_id, pickup, drop, departure_date)
     
@@ -129,6 +274,9 @@ def hold_cab(cab_id: str , pickup: str , drop: str , departure_date)->HoldCabRes
         }
     )
     
+    return _hold_response(hold_data)
+
+def _hold_response(hold_data: dict)->HoldCabResponse:
     return HoldCabResponse(
         hold_id=hold_data['hold_id'],
         cab_id=hold_data['cab_id'],
@@ -142,6 +290,35 @@ def hold_cab(cab_id: str , pickup: str , drop: str , departure_date)->HoldCabRes
         created_at=ensure_isoformat(hold_data['created_at'])
     )
 
+def hold_cabs_bulk(requests: List[HoldCabRequest])->List[BulkHoldItemResult]:
+    logger.info("Creating cab holds in bulk", extra={"count": len(requests)})
+    holds = create_booking_holds_bulk([
+        {
+            'cab_id': request.cab_id,
+            'pickup': request.pickup,
+            'drop': request.drop,
+            'departure_date': ensure_isoformat(request.departure_date)
+        }
+        for request in requests
+    ])
+    results = []
+    for index, (request, hold_data) in enumerate(zip(requests, holds)):
+        if hold_data is None:
+            results.append(BulkHoldItemResult(
+                index=index,
+                cab_id=request.cab_id,
+                success=False,
+                error=unknown_cab_error(request.cab_id)
+            ))
+        else:
+            results.append(BulkHoldItemResult(
+                index=index,
+                cab_id=request.cab_id,
+                success=True,
+                hold=_hold_response(hold_data)
+            ))
+    return results
+
 def add_passenger_details_to_hold(hold_id: str , passenger_name: str , passenger_phone: str , passenger_email: str = None , special_requests:str= None)->PassengerDetailsResponse:
     logger.info(
         "Adding passenger details to hold",
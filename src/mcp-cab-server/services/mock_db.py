@@ -356,38 +356,159 @@ MOCK_CAB_DB = {
     ],
 }
 
+DEFAULT_CABS = [
+    {"cab_id": "DEF_CAB_MINI", "cab_type": "mini", "price": 300},
+    {"cab_id": "DEF_CAB_SEDAN", "cab_type": "sedan", "price": 500},
+    {"cab_id": "DEF_CAB_SUV", "cab_type": "suv", "price": 700},
+    {"cab_id": "DEF_CAB_PRIME_SEDAN", "cab_type": "prime sedan", "price": 900},
+]
+
+DEFAULT_ROUTE = ("any", "any")
+
+# cab_id -> cab details with its route, covering MOCK_CAB_DB and DEFAULT_CABS
+CAB_INDEX = {}
 
 from datetime import datetime , timedelta , date
+from collections import OrderedDict
+import itertools
+import os
 import random
 from models.models import HoldCabRequest , HoldCabResponse
 from services.storage import (
-    load_holds, save_holds,
-    load_payments, save_payments,
-    load_passengers, save_passengers
+    load_holds, save_holds, load_hold,
+    load_payments, save_payments, load_payment,
+    load_passengers, save_passengers,
+    locked, HOLD_SHARDS, HOLD_COLLECTIONS, hold_collection, load_hold_shard,
+    migrate_serialization, migrate_hold_shards
 )
 from services.logging_config import get_logger
 
 logger = get_logger(__name__, service="mock_db")
 
-BOOKING_HOLDS = load_holds()
-HOLD_COUNTER = max([int(h.split('_')[1]) for h in BOOKING_HOLDS.keys()] + [1000])
+QUOTED_CABS_MAX = int(os.getenv("QUOTED_CABS_MAX", "5000"))
+# cab_id -> cab priced by the fare engine, oldest first; see register_quoted_cabs()
+QUOTED_CABS = OrderedDict()
 
-def generate_hold_id()->str:
-    global HOLD_COUNTER
-    HOLD_COUNTER += 1
-    return f"HOLD_{HOLD_COUNTER}"
+migrate_serialization()
+migrate_hold_shards()
 
-def get_cab_by_id(cab_id: str)->dict:
-    for route, cabs in MOCK_CAB_DB.items():
+# Holds still waiting on the customer; past expires_at these become 'expired'
+EXPIRABLE_HOLD_STATUSES = ('held', 'passenger_added')
+# Expired holds (with their passenger data and payment sessions) are deleted this long after expiry
+HOLD_PURGE_GRACE = timedelta(minutes=int(os.getenv("HOLD_PURGE_GRACE_MINUTES", "60")))
+
+# Callables (kind, key, due) told about every new expiry deadline; see services/expiry.py
+EXPIRY_LISTENERS = []
+
+def _schedule_expiry(kind: str, key: str, due: datetime):
+    for listener in EXPIRY_LISTENERS:
+        listener(kind, key, due)
+
+# shard -> (shard dict the counter was computed from, highest hold number in it)
+HOLD_COUNTERS = {}
+# Each process starts at a different shard so concurrent workers rarely share one
+_NEXT_HOLD_SHARD = itertools.count(os.getpid())
+
+def pick_hold_shard()->int:
+    return next(_NEXT_HOLD_SHARD) % HOLD_SHARDS
+
+def generate_hold_id(shard: int)->str:
+    """Next hold id belonging to shard (its number is congruent to shard mod HOLD_SHARDS).
+
+    Call with the shard's lock held; the counter is re-read whenever another
+    process has written the shard.
+    """
+    holds = load_hold_shard(shard)
+    source, counter = HOLD_COUNTERS.get(shard, (None, 1000))
+    if holds is not source:
+        counter = max([counter] + [int(h.split('_')[1]) for h in holds.keys()])
+    counter += (shard - counter - 1) % HOLD_SHARDS + 1
+    HOLD_COUNTERS[shard] = (holds, counter)
+    return f"HOLD_{counter}"
+
+class ConcurrentUpdateError(ValueError):
+    """A record changed between being read and being updated; re-read and retry."""
+
+def compare_and_set_hold(hold_id: str, expected_version: int, changes: dict)->dict:
+    """Apply changes to a hold only if it is still at expected_version, bumping its version.
+
+    Only the version check and the write run under the storage lock, so callers
+    validate outside it and conflicting updates to the same hold fail fast with
+    ConcurrentUpdateError instead of silently overwriting each other.
+    """
+    with locked(hold_collection(hold_id)):
+        hold = load_hold(hold_id)
+        if not hold:
+            raise ValueError(f"Hold not found: {hold_id}")
+        current_version = hold.get('version', 0)
+        if current_version != expected_version:
+            logger.warning(
+                "Concurrent hold update rejected",
+                extra={"hold_id": hold_id, "expected_version": expected_version, "current_version": current_version}
+            )
+            raise ConcurrentUpdateError(
+                f"Hold {hold_id} was modified by another request (version {current_version}, expected {expected_version}). Please retry."
+            )
+        # Changed on a copy, so the cached record stays as saved if the write fails
+        hold = dict(hold)
+        hold.update(changes)
+        hold['version'] = current_version + 1
+        if 'updated_at' not in changes:
+            hold['updated_at'] = datetime.now()
+        save_holds({hold_id: hold}, changed=[hold_id])
+        return hold
+
+def reload_cab_index():
+    """Rebuild the cab_id lookup after MOCK_CAB_DB or DEFAULT_CABS change."""
+    index = {}
+    catalog = list(MOCK_CAB_DB.items())
+    catalog.append((DEFAULT_ROUTE, DEFAULT_CABS))
+    for route, cabs in catalog:
         for cab in cabs:
-            if cab["cab_id"] == cab_id:
-                return {
-                    'cab_id': cab['cab_id'],
-                    'cab_type': cab['cab_type'],
-                    'price': cab['price'],
-                    'route': f"{route[0]} → {route[1]}"
-                }
-    return None
+            index.setdefault(cab['cab_id'], {
+                'cab_id': cab['cab_id'],
+                'cab_type': cab['cab_type'],
+                'price': cab['price'],
+                'route': f"{route[0]} → {route[1]}"
+            })
+    CAB_INDEX.clear()
+    CAB_INDEX.update(index)
+    logger.debug("Cab index rebuilt", extra={"cab_count": len(CAB_INDEX)})
+
+def register_quoted_cabs(cabs: list[dict], pickup: str, drop: str):
+    """Make fare-engine quotes holdable by cab_id, keeping the newest QUOTED_CABS_MAX."""
+    for cab in cabs:
+        QUOTED_CABS[cab['cab_id']] = {
+            'cab_id': cab['cab_id'],
+            'cab_type': cab['cab_type'],
+            'price': cab['price'],
+            'route': f"{pickup} → {drop}"
+        }
+        QUOTED_CABS.move_to_end(cab['cab_id'])
+    while len(QUOTED_CABS) > QUOTED_CABS_MAX:
+        QUOTED_CABS.popitem(last=False)
+
+def get_cab_by_id(cab_id: str)->dict:
+    cab = CAB_INDEX.get(cab_id) or QUOTED_CABS.get(cab_id)
+    return dict(cab) if cab else None
+
+reload_cab_index()
+
+def _new_hold(hold_id: str, cab_id: str, cab_details: dict, pickup: str, drop: str, departure_date, current_time: datetime)->dict:
+    return {
+        'hold_id': hold_id,
+        'cab_id': cab_id,
+        'status': 'held',
+        'cab_details': cab_details,
+        'price': cab_details['price'],
+        'pickup_location': pickup,
+        'drop_location': drop,
+        'departure_date': departure_date,
+        'created_at': current_time,
+        'expires_at': current_time + timedelta(minutes=15),
+        'updated_at': current_time,
+        'version': 1
+    }
 
 def create_booking_hold(cab_id:str , pickup:str , drop:str , departure_date:date)->dict:
     logger.debug(
@@ -403,88 +524,78 @@ def create_booking_hold(cab_id:str , pickup:str , drop:str , departure_date:date
         )
         return None
     
-    hold_id = generate_hold_id()
-    current_time = datetime.now()
-    expiry_time = current_time + timedelta(minutes=15)
-    hold_data = {
-        'hold_id': hold_id,
-        'cab_id': cab_id,
-        'status': 'held',
-        'cab_details': cab_details,
-        'price': cab_details['price'],
-        'pickup_location': pickup,
-        'drop_location': drop,
-        'departure_date': departure_date,
-        'created_at': current_time,
-        'expires_at': expiry_time,
-        'updated_at': current_time
-    }
-    BOOKING_HOLDS[hold_id] = hold_data
-    save_holds(BOOKING_HOLDS)
+    shard = pick_hold_shard()
+    with locked(HOLD_COLLECTIONS[shard]):
+        hold_id = generate_hold_id(shard)
+        hold_data = _new_hold(hold_id, cab_id, cab_details, pickup, drop, departure_date, datetime.now())
+        save_holds({hold_id: hold_data}, changed=[hold_id])
+    _schedule_expiry('hold', hold_id, hold_data['expires_at'])
     
     logger.info(
         "Booking hold created",
         extra={
             "hold_id": hold_id,
             "cab_type": cab_details['cab_type'],
-            "expires_at": str(expiry_time)
+            "expires_at": str(hold_data['expires_at'])
         }
     )
     
     return hold_data
 
+def create_booking_holds_bulk(requests: list[dict])->list:
+    """Create holds for many {cab_id, pickup, drop, departure_date} requests with one storage write.
+
+    The whole batch goes to one shard. Returns one entry per request: the hold
+    record, or None if its cab_id is unknown.
+    """
+    shard = pick_hold_shard()
+    current_time = datetime.now()
+    results = []
+    created = {}
+    with locked(HOLD_COLLECTIONS[shard]):
+        for request in requests:
+            cab_details = get_cab_by_id(request['cab_id'])
+            if not cab_details:
+                results.append(None)
+                continue
+            hold_id = generate_hold_id(shard)
+            hold_data = _new_hold(
+                hold_id, request['cab_id'], cab_details,
+                request['pickup'], request['drop'], request['departure_date'], current_time
+            )
+            created[hold_id] = hold_data
+            results.append(hold_data)
+
+        if created:
+            save_holds(created, changed=list(created))
+    for hold_id, hold_data in created.items():
+        _schedule_expiry('hold', hold_id, hold_data['expires_at'])
+
+    logger.info(
+        "Bulk booking holds created",
+        extra={"requested": len(requests), "created_count": len(created), "rejected_count": len(requests) - len(created)}
+    )
+    return results
+
 def get_booking_hold(hold_id: str)->dict:
-    global BOOKING_HOLDS
-    BOOKING_HOLDS = load_holds()
-    return BOOKING_HOLDS.get(hold_id) or None
+    return load_hold(hold_id)
 
 def is_hold_expired(hold_id: str)->bool:
-    hold = get_booking_hold(hold_id)
+    """True if the hold is gone or past expires_at; an unpaid hold is marked expired on the spot."""
+    hold = load_hold(hold_id)
     if not hold:
         return True
     if hold['expires_at'] < datetime.now():
-        BOOKING_HOLDS[hold_id]['status'] = 'expired'
+        if hold['status'] in EXPIRABLE_HOLD_STATUSES:
+            expire_hold(hold_id)
         return True  
     return False  
 
-def cleanup_expired_holds():
-    logger.debug("Running cleanup for expired holds")
-    
-    current_time = datetime.now()
-    expired_count = 0
-    grace_period = timedelta(hours=1)
-    
-    holds_to_delete = []
-    for hold_id, hold in BOOKING_HOLDS.items():
-        if hold['expires_at'] < current_time and hold['status'] == 'held':
-            BOOKING_HOLDS[hold_id]['status'] = 'expired'
-            expired_count += 1
-        elif hold['status'] == 'expired' and hold['expires_at'] < (current_time - grace_period):
-            holds_to_delete.append(hold_id)
-    
-    for hold_id in holds_to_delete:
-        del BOOKING_HOLDS[hold_id]
-        if hold_id in PASSENGER_DATA:
-            del PASSENGER_DATA[hold_id]
-    
-    if expired_count > 0 or len(holds_to_delete) > 0:
-        logger.info(
-            "Cleanup completed",
-            extra={
-                "expired_count": expired_count,
-                "deleted_count": len(holds_to_delete)
-            }
-        )
-    
-    return expired_count
-
 
 PASSENGER_DATA = load_passengers()
 
 def add_passenger_to_hold(hold_id: str , passenger_details: dict)->dict:
-    global BOOKING_HOLDS, PASSENGER_DATA
-    BOOKING_HOLDS = load_holds()
-    PASSENGER_DATA = load_passengers()
+    global PASSENGER_DATA
     
     logger.debug(
         "Adding passenger to hold",
@@ -498,10 +609,13 @@ def add_passenger_to_hold(hold_id: str , passenger_details: dict)->dict:
             extra={"hold_id": hold_id}
         )
         raise ValueError(f"Hold not found: {hold_id}")
+    version = hold.get('version', 0)
     current_time = datetime.now()
     if hold['expires_at'] < current_time:
-        BOOKING_HOLDS[hold_id]['status'] = 'expired'
-        save_holds(BOOKING_HOLDS)
+        try:
+            compare_and_set_hold(hold_id, version, {'status': 'expired'})
+        except ConcurrentUpdateError:
+            pass
         logger.error(
             "Hold expired when adding passenger",
             extra={"hold_id": hold_id, "expires_at": str(hold['expires_at'])}
@@ -516,7 +630,7 @@ def add_passenger_to_hold(hold_id: str , passenger_details: dict)->dict:
         )
         raise ValueError(f"Hold is in invalid state: {hold['status']}")
     
-    PASSENGER_DATA[hold_id] = {
+    passenger = {
         'passenger_name': passenger_details['passenger_name'],
         'passenger_phone': passenger_details['passenger_phone'],
         'passenger_email': passenger_details.get('passenger_email'),
@@ -524,12 +638,14 @@ def add_passenger_to_hold(hold_id: str , passenger_details: dict)->dict:
         'added_at': datetime.now()
     }
     
-    BOOKING_HOLDS[hold_id]['status'] = 'passenger_added'
-    BOOKING_HOLDS[hold_id]['updated_at'] = datetime.now()
-    BOOKING_HOLDS[hold_id]['passenger_details'] = PASSENGER_DATA[hold_id]
-    
-    save_holds(BOOKING_HOLDS)
-    save_passengers(PASSENGER_DATA)
+    with locked(hold_collection(hold_id), 'passengers'):
+        updated_hold = compare_and_set_hold(hold_id, version, {
+            'status': 'passenger_added',
+            'passenger_details': passenger
+        })
+        PASSENGER_DATA = load_passengers()
+        PASSENGER_DATA[hold_id] = passenger
+        save_passengers(PASSENGER_DATA, changed=[hold_id])
     
     logger.info(
         "Passenger added to hold successfully",
@@ -539,42 +655,123 @@ def add_passenger_to_hold(hold_id: str , passenger_details: dict)->dict:
         }
     )
     
-    return BOOKING_HOLDS[hold_id]
+    return updated_hold
 
 def get_passenger_details(hold_id: str) -> dict:
-    return PASSENGER_DATA.get(hold_id)
+    return load_passengers().get(hold_id)
 
 def has_passenger_details(hold_id: str) -> bool:
-    return hold_id in PASSENGER_DATA
+    return hold_id in load_passengers()
 
 
 PAYMENT_SESSIONS = load_payments()
 PAYMENT_COUNTER = max([int(p.split('_')[1]) for p in PAYMENT_SESSIONS.keys()] + [5000])
 
+# Secondary indexes over PAYMENT_SESSIONS. They are rebuilt whenever
+# load_payments() hands back a different dict, i.e. the store changed on disk.
+PAYMENTS_BY_HOLD = {}    # hold_id -> {status -> set of session_ids}
+PAYMENTS_BY_STATUS = {}  # status -> set of session_ids
+_PAYMENT_INDEX_SOURCE = None
+
 def generate_payment_session_id() -> str:
     global PAYMENT_COUNTER
     PAYMENT_COUNTER += 1
     return f"PAY_{PAYMENT_COUNTER}"
 
 
-def create_payment_session(hold_id: str, amount: float) -> dict:
-    global BOOKING_HOLDS, PAYMENT_SESSIONS
-    BOOKING_HOLDS = load_holds()
+def _index_payment(session: dict):
+    session_id = session['session_id']
+    by_status = PAYMENTS_BY_HOLD.setdefault(session['hold_id'], {})
+    for session_ids in by_status.values():
+        session_ids.discard(session_id)
+    for session_ids in PAYMENTS_BY_STATUS.values():
+        session_ids.discard(session_id)
+    by_status.setdefault(session['status'], set()).add(session_id)
+    PAYMENTS_BY_STATUS.setdefault(session['status'], set()).add(session_id)
+
+
+def refresh_payment_index():
+    global PAYMENT_SESSIONS, PAYMENT_COUNTER, _PAYMENT_INDEX_SOURCE
     PAYMENT_SESSIONS = load_payments()
+    if PAYMENT_SESSIONS is _PAYMENT_INDEX_SOURCE:
+        return
+    # Sessions may have been created by the other process
+    PAYMENT_COUNTER = max([PAYMENT_COUNTER] + [int(p.split('_')[1]) for p in PAYMENT_SESSIONS.keys()])
+    PAYMENTS_BY_HOLD.clear()
+    PAYMENTS_BY_STATUS.clear()
+    for session in PAYMENT_SESSIONS.values():
+        _index_payment(session)
+    _PAYMENT_INDEX_SOURCE = PAYMENT_SESSIONS
+    # Sessions opened by the other process need expiry timers here too
+    _schedule_pending_payments()
+    logger.debug(
+        "Payment index rebuilt",
+        extra={"session_count": len(PAYMENT_SESSIONS), "hold_count": len(PAYMENTS_BY_HOLD)}
+    )
+
+
+def _schedule_pending_payments():
+    for session_id in PAYMENTS_BY_STATUS.get('pending', ()):
+        _schedule_expiry('payment', session_id, PAYMENT_SESSIONS[session_id]['expires_at'])
+
+
+def find_payments_for_hold(hold_id: str, status: str) -> list:
+    refresh_payment_index()
+    session_ids = PAYMENTS_BY_HOLD.get(hold_id, {}).get(status, ())
+    sessions = [PAYMENT_SESSIONS[session_id] for session_id in session_ids]
+    return sorted(sessions, key=lambda session: session['created_at'], reverse=True)
+
+
+def compare_and_set_payment(session_id: str, expected_version: int, changes: dict) -> dict:
+    """Apply changes to a payment session only if it is still at expected_version, bumping its version."""
+    with locked('payments'):
+        refresh_payment_index()
+        session = PAYMENT_SESSIONS.get(session_id)
+        if not session:
+            raise ValueError(f"Payment session not found: {session_id}")
+        current_version = session.get('version', 0)
+        if current_version != expected_version:
+            logger.warning(
+                "Concurrent payment update rejected",
+                extra={"session_id": session_id, "expected_version": expected_version, "current_version": current_version}
+            )
+            raise ConcurrentUpdateError(
+                f"Payment session {session_id} was modified by another request (version {current_version}, expected {expected_version}). Please retry."
+            )
+        session = dict(session)
+        session.update(changes)
+        session['version'] = current_version + 1
+        PAYMENT_SESSIONS[session_id] = session
+        _index_payment(session)
+        save_payments(PAYMENT_SESSIONS, changed=[session_id])
+        return session
+
+
+def _set_hold_status(hold_id: str, status: str, current_time: datetime):
+    """Move a hold along after its payment changed; the payment CAS already ordered the update."""
+    with locked(hold_collection(hold_id)):
+        hold = load_hold(hold_id)
+        if hold:
+            compare_and_set_hold(hold_id, hold.get('version', 0), {'status': status, 'updated_at': current_time})
+
+
+refresh_payment_index()
+
+
+def create_payment_session(hold_id: str, amount: float) -> dict:
+    global PAYMENT_SESSIONS
     
     logger.debug(
         "Creating payment session",
         extra={"hold_id": hold_id, "amount": amount}
     )
     
-    for session_id, session in PAYMENT_SESSIONS.items():
-        if (session['hold_id'] == hold_id and 
-            session['status'] == 'pending' and 
-            session['expires_at'] > datetime.now()):
+    for session in find_payments_for_hold(hold_id, 'pending'):
+        if session['expires_at'] > datetime.now():
             # Return existing valid session instead of creating new one
             logger.info(
                 "Reusing existing payment session",
-                extra={"session_id": session_id, "hold_id": hold_id}
+                extra={"session_id": session['session_id'], "hold_id": hold_id}
             )
             return session
 
@@ -585,6 +782,7 @@ def create_payment_session(hold_id: str, amount: float) -> dict:
             extra={"hold_id": hold_id}
         )
         raise ValueError(f"Hold not found: {hold_id}")
+    version = hold.get('version', 0)
     
     if is_hold_expired(hold_id):
         logger.error(
@@ -600,28 +798,30 @@ def create_payment_session(hold_id: str, amount: float) -> dict:
         )
         raise ValueError(f"Hold must have passenger details before payment. Current status: {hold['status']}")
     
-    session_id = generate_payment_session_id()
     current_time = datetime.now()
     expiry_time = current_time + timedelta(minutes=30)
     
-    payment_data = {
-        'session_id': session_id,
-        'hold_id': hold_id,
-        'amount': amount,
-        'status': 'pending',
-        'created_at': current_time,
-        'expires_at': expiry_time,
-        'completed_at': None,
-        'card_last4': None
-    }
-    
-    PAYMENT_SESSIONS[session_id] = payment_data
-    
-    BOOKING_HOLDS[hold_id]['status'] = 'payment_pending'
-    BOOKING_HOLDS[hold_id]['updated_at'] = current_time
-    
-    save_payments(PAYMENT_SESSIONS)
-    save_holds(BOOKING_HOLDS)
+    with locked(hold_collection(hold_id), 'payments'):
+        # Claim the hold first: a concurrent request for it fails here
+        # instead of opening a second session
+        compare_and_set_hold(hold_id, version, {'status': 'payment_pending', 'updated_at': current_time})
+        refresh_payment_index()
+        session_id = generate_payment_session_id()
+        payment_data = {
+            'session_id': session_id,
+            'hold_id': hold_id,
+            'amount': amount,
+            'status': 'pending',
+            'created_at': current_time,
+            'expires_at': expiry_time,
+            'completed_at': None,
+            'card_last4': None,
+            'version': 1
+        }
+        PAYMENT_SESSIONS[session_id] = payment_data
+        _index_payment(payment_data)
+        save_payments(PAYMENT_SESSIONS, changed=[session_id])
+    _schedule_expiry('payment', session_id, expiry_time)
     
     logger.info(
         "Payment session created",
@@ -637,16 +837,15 @@ def create_payment_session(hold_id: str, amount: float) -> dict:
 
 
 def get_payment_session(session_id: str) -> dict:
-    global PAYMENT_SESSIONS
-    PAYMENT_SESSIONS = load_payments()
-    return PAYMENT_SESSIONS.get(session_id)
+    session = load_payment(session_id)
+    if session:
+        PAYMENT_SESSIONS[session_id] = session
+    else:
+        PAYMENT_SESSIONS.pop(session_id, None)
+    return session
 
 
 def update_payment_status(session_id: str, status: str, card_last4: str = None) -> dict:
-    global BOOKING_HOLDS, PAYMENT_SESSIONS
-    BOOKING_HOLDS = load_holds()
-    PAYMENT_SESSIONS = load_payments()
-    
     logger.debug(
         "Updating payment status",
         extra={"session_id": session_id, "new_status": status}
@@ -659,6 +858,7 @@ def update_payment_status(session_id: str, status: str, card_last4: str = None)
             extra={"session_id": session_id}
         )
         raise ValueError(f"Payment session not found: {session_id}")
+    version = session.get('version', 0)
     
     if session['status'] == 'completed':
         logger.warning(
@@ -667,66 +867,150 @@ def update_payment_status(session_id: str, status: str, card_last4: str = None)
         )
         raise ValueError("Payment already completed")
     
+    hold_id = session['hold_id']
+    
     # ✅ IMPROVED: Handle expired session properly
     if session['expires_at'] < datetime.now():
-        session['status'] = 'failed'
-        hold_id = session['hold_id']
-        
         logger.error(
             "Payment session expired",
             extra={"session_id": session_id, "hold_id": hold_id}
         )
         
         # ✅ ALLOW USER TO TRY PAYMENT AGAIN by reverting to passenger_added
-        if hold_id in BOOKING_HOLDS:
-            BOOKING_HOLDS[hold_id]['status'] = 'passenger_added'
-            BOOKING_HOLDS[hold_id]['updated_at'] = datetime.now()
-        
-        save_payments(PAYMENT_SESSIONS)
-        save_holds(BOOKING_HOLDS)
+        with locked(hold_collection(hold_id), 'payments'):
+            compare_and_set_payment(session_id, version, {'status': 'failed'})
+            _set_hold_status(hold_id, 'passenger_added', datetime.now())
         raise ValueError("Payment session has expired")
     
     current_time = datetime.now()
-    session['status'] = status
-    session['completed_at'] = current_time if status == 'completed' else None
-    session['card_last4'] = card_last4
-    
-    hold_id = session['hold_id']
-    if hold_id in BOOKING_HOLDS:
+    with locked(hold_collection(hold_id), 'payments'):
+        # A second attempt to settle the same session is rejected here
+        session = compare_and_set_payment(session_id, version, {
+            'status': status,
+            'completed_at': current_time if status == 'completed' else None,
+            'card_last4': card_last4
+        })
         if status == 'completed':
-            BOOKING_HOLDS[hold_id]['status'] = 'payment_success'
-            logger.info(
-                "Payment completed successfully",
-                extra={
-                    "session_id": session_id,
-                    "hold_id": hold_id,
-                    "amount": session['amount']
-                }
-            )
+            _set_hold_status(hold_id, 'payment_success', current_time)
         elif status == 'failed':
             # ✅ IMPROVED: Revert to passenger_added instead of payment_pending
             # This allows users to create a new payment session and try again
-            BOOKING_HOLDS[hold_id]['status'] = 'passenger_added'
-            logger.warning(
-                "Payment failed",
-                extra={"session_id": session_id, "hold_id": hold_id}
-            )
-        BOOKING_HOLDS[hold_id]['updated_at'] = current_time
+            _set_hold_status(hold_id, 'passenger_added', current_time)
     
-    save_payments(PAYMENT_SESSIONS)
-    save_holds(BOOKING_HOLDS)
+    if status == 'completed':
+        logger.info(
+            "Payment completed successfully",
+            extra={
+                "session_id": session_id,
+                "hold_id": hold_id,
+                "amount": session['amount']
+            }
+        )
+    elif status == 'failed':
+        logger.warning(
+            "Payment failed",
+            extra={"session_id": session_id, "hold_id": hold_id}
+        )
     
     return session
 
 
 def get_payment_by_hold(hold_id: str) -> dict:
-    global PAYMENT_SESSIONS
-    PAYMENT_SESSIONS = load_payments()  # ✅ RELOAD DATA
-    
-    for session in PAYMENT_SESSIONS.values():
-        if session['hold_id'] == hold_id and session['status'] == 'completed':
-            return session
-    return None
+    completed = find_payments_for_hold(hold_id, 'completed')
+    return completed[0] if completed else None
+
+
+def expire_hold(hold_id: str, now: datetime = None) -> bool:
+    """Mark an unpaid hold expired once it is past expires_at, and schedule its purge."""
+    now = now or datetime.now()
+    with locked(hold_collection(hold_id)):
+        hold = load_hold(hold_id)
+        if not hold or hold['expires_at'] > now:
+            return False
+        if hold['status'] == 'expired':
+            _schedule_expiry('purge', hold_id, hold['expires_at'] + HOLD_PURGE_GRACE)
+            return False
+        if hold['status'] == 'payment_pending':
+            # Only expires if the payment fails; look again when the session runs out
+            sessions = [s for s in find_payments_for_hold(hold_id, 'pending') if s['expires_at'] > now]
+            if sessions:
+                _schedule_expiry('hold', hold_id, max(s['expires_at'] for s in sessions))
+            return False
+        if hold['status'] not in EXPIRABLE_HOLD_STATUSES:
+            return False
+        compare_and_set_hold(hold_id, hold.get('version', 0), {'status': 'expired', 'updated_at': now})
+
+    _schedule_expiry('purge', hold_id, hold['expires_at'] + HOLD_PURGE_GRACE)
+    logger.info(
+        "Hold expired",
+        extra={"hold_id": hold_id, "expires_at": str(hold['expires_at'])}
+    )
+    return True
+
+
+def expire_payment_session(session_id: str, now: datetime = None) -> bool:
+    """Fail a pending payment session past its expiry and hand the hold back to the customer."""
+    now = now or datetime.now()
+    session = get_payment_session(session_id)
+    if not session:
+        return False
+    hold_id = session['hold_id']
+    with locked(hold_collection(hold_id), 'payments'):
+        session = get_payment_session(session_id)
+        if not session or session['status'] != 'pending' or session['expires_at'] > now:
+            return False
+        compare_and_set_payment(session_id, session.get('version', 0), {'status': 'failed'})
+        hold = load_hold(hold_id)
+        if hold and hold['status'] == 'payment_pending':
+            compare_and_set_hold(hold_id, hold.get('version', 0), {'status': 'passenger_added', 'updated_at': now})
+    if hold:
+        _schedule_expiry('hold', hold_id, hold['expires_at'])
+    logger.info(
+        "Payment session expired",
+        extra={"session_id": session_id, "hold_id": hold_id}
+    )
+    return True
+
+
+def purge_hold(hold_id: str, now: datetime = None) -> bool:
+    """Delete an expired hold with its passenger data and payment sessions once the grace period is over."""
+    global PASSENGER_DATA
+    now = now or datetime.now()
+    with locked(hold_collection(hold_id), 'passengers', 'payments'):
+        hold = load_hold(hold_id)
+        if not hold or hold['status'] != 'expired' or hold['expires_at'] + HOLD_PURGE_GRACE > now:
+            return False
+        save_holds({}, changed=[hold_id])
+
+        PASSENGER_DATA = load_passengers()
+        if hold_id in PASSENGER_DATA:
+            del PASSENGER_DATA[hold_id]
+            save_passengers(PASSENGER_DATA, changed=[hold_id])
+
+        refresh_payment_index()
+        session_ids = set().union(*PAYMENTS_BY_HOLD.pop(hold_id, {}).values())
+        for session_id in session_ids:
+            session = PAYMENT_SESSIONS.pop(session_id)
+            PAYMENTS_BY_STATUS[session['status']].discard(session_id)
+        if session_ids:
+            save_payments(PAYMENT_SESSIONS, changed=list(session_ids))
+
+    logger.info(
+        "Expired hold purged",
+        extra={"hold_id": hold_id, "payment_sessions": len(session_ids)}
+    )
+    return True
+
+
+def schedule_pending_expiries():
+    """Announce the deadlines of every unfinished hold and payment session, e.g. after a restart."""
+    for hold_id, hold in load_holds().items():
+        if hold['status'] == 'expired':
+            _schedule_expiry('purge', hold_id, hold['expires_at'] + HOLD_PURGE_GRACE)
+        elif hold['status'] in EXPIRABLE_HOLD_STATUSES or hold['status'] == 'payment_pending':
+            _schedule_expiry('hold', hold_id, hold['expires_at'])
+    refresh_payment_index()
+    _schedule_pending_payments()
 
 
 MOCK_DRIVERS = [
@@ -847,9 +1131,6 @@ def assign_driver_to_booking(hold_id: str) -> dict:
 
 
 def confirm_booking_final(hold_id: str, driver: dict) -> dict:
-    global BOOKING_HOLDS
-    BOOKING_HOLDS = load_holds()
-    
     logger.debug(
         "Finalizing booking confirmation",
         extra={"hold_id": hold_id, "driver": driver['name']}
@@ -873,13 +1154,13 @@ def confirm_booking_final(hold_id: str, driver: dict) -> dict:
     booking_id = generate_booking_id()
     current_time = datetime.now()
     
-    BOOKING_HOLDS[hold_id]['status'] = 'confirmed'
-    BOOKING_HOLDS[hold_id]['booking_id'] = booking_id
-    BOOKING_HOLDS[hold_id]['driver'] = driver
-    BOOKING_HOLDS[hold_id]['confirmed_at'] = current_time
-    BOOKING_HOLDS[hold_id]['updated_at'] = current_time
-    
-    save_holds(BOOKING_HOLDS)
+    hold = compare_and_set_hold(hold_id, hold.get('version', 0), {
+        'status': 'confirmed',
+        'booking_id': booking_id,
+        'driver': driver,
+        'confirmed_at': current_time,
+        'updated_at': current_time
+    })
     
     logger.info(
         "Booking confirmed successfully",
@@ -890,4 +1171,4 @@ def confirm_booking_final(hold_id: str, driver: dict) -> dict:
         }
     )
     
-    return BOOKING_HOLDS[hold_id]
\ No newline at end of file
+    return hold
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""Client-side rate limiting and daily quota budgets for upstream APIs"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import date
+from typing import Dict, Optional
+
+from services.logging_config import get_logger
+
+logger = get_logger(__name__, service="rate_limit")
+
+
+class QuotaExceededError(Exception):
+    """Raised when an endpoint has used up its daily request budget."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate > 0:
+            self.tokens -= 1
+
+
+class RateLimiter:
+    """Priority-queued token buckets with per-endpoint daily budgets.
+
+    Every request needs a token from the shared bucket (the API key's QPS) and
+    from its endpoint's bucket. Waiters are served lowest priority value first,
+    FIFO within a priority, so cheap-to-lose work can be made to yield to
+    requests that unblock a user. A budget of 0 means unlimited.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        qps: float,
+        endpoint_qps: Dict[str, float],
+        daily_budgets: Dict[str, int],
+        priorities: Dict[str, int],
+    ):
+        self.name = name
+        self.shared = TokenBucket(qps)
+        self.buckets = {endpoint: TokenBucket(rate) for endpoint, rate in endpoint_qps.items()}
+        self.daily_budgets = daily_budgets
+        self.priorities = priorities
+        self.used_today = {endpoint: 0 for endpoint in endpoint_qps}
+        self.throttled = {endpoint: 0 for endpoint in endpoint_qps}
+        self.rejected = {endpoint: 0 for endpoint in endpoint_qps}
+        self._day = date.today()
+        self._paused_until = 0.0
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            for endpoint in self.used_today:
+                self.used_today[endpoint] = 0
+
+    def _delay(self, endpoint: str) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self.shared.delay(),
+            self.buckets[endpoint].delay(),
+        )
+
+    def pause(self, seconds: float):
+        """Stop issuing requests for a while, e.g. after OVER_QUERY_LIMIT."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning("Rate limiter paused", extra={"limiter": self.name, "seconds": seconds})
+
+    def _check_budget(self, endpoint: str):
+        self._roll_day()
+        budget = self.daily_budgets.get(endpoint, 0)
+        if budget and self.used_today[endpoint] >= budget:
+            self.rejected[endpoint] += 1
+            raise QuotaExceededError(f"Daily {self.name} {endpoint} budget of {budget} requests used up")
+
+    async def acquire(self, endpoint: str):
+        self._check_budget(endpoint)
+
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        entry = [self.priorities.get(endpoint, 0), next(self._sequence), endpoint]
+        heapq.heappush(self._waiters, entry)
+        throttled = False
+        try:
+            async with self._condition:
+                while True:
+                    if self._waiters[0] is entry:
+                        # Requests queued ahead of this one may have used up the budget
+                        self._check_budget(endpoint)
+                        delay = self._delay(endpoint)
+                        if delay <= 0:
+                            break
+                    else:
+                        delay = None
+                    throttled = True
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                heapq.heappop(self._waiters)
+                self.shared.take()
+                self.buckets[endpoint].take()
+                self.used_today[endpoint] += 1
+                if throttled:
+                    self.throttled[endpoint] += 1
+                self._condition.notify_all()
+        except BaseException:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                async with self._condition:
+                    self._condition.notify_all()
+            raise
+
+    def usage(self) -> dict:
+        self._roll_day()
+        endpoints = {}
+        for endpoint, used in self.used_today.items():
+            budget = self.daily_budgets.get(endpoint, 0)
+            endpoints[endpoint] = {
+                "used_today": used,
+                "daily_budget": budget or None,
+                "remaining_today": max(0, budget - used) if budget else None,
+                "qps": self.buckets[endpoint].rate,
+                "priority": self.priorities.get(endpoint, 0),
+                "throttled": self.throttled[endpoint],
+                "rejected": self.rejected[endpoint],
+            }
+        return {
+            "limiter": self.name,
+            "qps": self.shared.rate,
+            "queued": len(self._waiters),
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "endpoints": endpoints,
+        }
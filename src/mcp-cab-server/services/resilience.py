@@ -0,0 +1,235 @@
+"""Latency tracking, retries, hedging and circuit breaking for upstream HTTP calls"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from services.logging_config import get_logger
+
+logger = get_logger(__name__, service="resilience")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class RetryableError(Exception):
+    """Raised by a wrapped call for a transient upstream failure that isn't an HTTP error."""
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call through after reset_timeout.
+
+    While that trial call (the probe) is running, the circuit stays half-open
+    and every other call is rejected as if it were open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+        return self.state != self.OPEN
+
+    def release_probe(self):
+        """Let another call probe, when the probe ended without a success or failure (e.g. cancelled)."""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+def is_timeout(error: Exception) -> bool:
+    return isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError))
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, RetryableError) or is_timeout(error):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class ResilientEndpoint:
+    """Wraps idempotent calls to one upstream endpoint.
+
+    Each attempt gets an adaptive timeout derived from observed p95 latency
+    (cold_timeout until enough samples exist), retryable failures are retried
+    with jittered exponential backoff, an optional hedged duplicate is fired
+    once the first attempt outlives p95, and a circuit breaker fails calls
+    fast while the endpoint keeps failing. Retries share one deadline of
+    max_timeout for the whole call, so they never make a call slower than a
+    single attempt without them.
+    """
+
+    MIN_SAMPLES = 20
+    # Slack before an attempt that ignores its timeout is cancelled
+    TIMEOUT_GRACE = 0.05
+
+    def __init__(
+        self,
+        name: str,
+        max_timeout: float,
+        min_timeout: float = 1.0,
+        cold_timeout: float = 3.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        hedge: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.cold_timeout = min(cold_timeout, max_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.retried = 0
+        self.hedged = 0
+        self.rejected = 0
+
+    def timeout(self) -> float:
+        p95 = self.latency.percentile(95)
+        if p95 is None or len(self.latency) < self.MIN_SAMPLES:
+            return self.cold_timeout
+        return max(self.min_timeout, min(self.max_timeout, p95 * 3))
+
+    async def call(self, fn: Callable[[float], Awaitable]):
+        """Run fn(timeout) with retries; raises CircuitOpenError when the breaker is open."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        self.calls += 1
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            return await self._call(fn)
+        finally:
+            if probe and self.breaker.state == CircuitBreaker.HALF_OPEN:
+                self.breaker.release_probe()
+
+    async def _call(self, fn: Callable[[float], Awaitable]):
+        deadline = time.monotonic() + self.max_timeout
+        for attempt in range(self.retries + 1):
+            started = time.monotonic()
+            full_timeout = self.timeout() >= self.max_timeout
+            timeout = min(self.timeout(), deadline - started)
+            try:
+                result = await asyncio.wait_for(self._attempt(fn, timeout), timeout + self.TIMEOUT_GRACE)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.retries or not self.breaker.allow():
+                    raise
+                if is_timeout(e) and full_timeout:
+                    # A full-length timeout already used up the call's deadline
+                    raise
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if time.monotonic() + delay + min(self.min_timeout, timeout) > deadline:
+                    # Not enough of the deadline left for another useful attempt
+                    raise
+                self.retried += 1
+                logger.warning(
+                    "Retrying upstream call",
+                    extra={"endpoint": self.name, "attempt": attempt + 1, "delay": round(delay, 3), "error": str(e)}
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+
+    async def _attempt(self, fn: Callable[[float], Awaitable], timeout: float):
+        hedge_after = self.latency.percentile(95) if self.hedge and len(self.latency) >= self.MIN_SAMPLES else None
+        if hedge_after is None:
+            return await fn(timeout)
+
+        primary = asyncio.ensure_future(fn(timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            self.hedged += 1
+            tasks.add(asyncio.ensure_future(fn(timeout)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Both failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            "endpoint": self.name,
+            "circuit": self.breaker.state,
+            "calls": self.calls,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "rejected": self.rejected,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "timeout_s": round(self.timeout(), 3),
+        }
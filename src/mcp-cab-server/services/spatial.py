@@ -0,0 +1,107 @@
+"""Geohash bucketing and great-circle distance helpers for matching coordinates to catalog routes"""
+
+import bisect
+import math
+from typing import Iterable
+
+EARTH_RADIUS_KM = 6371.0088
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = bit_count = 0
+    even = True
+    while len(chars) < precision:
+        bounds, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            bounds[0] = mid
+        else:
+            bits = bits * 2
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> tuple:
+    """(height, width) of a geohash cell in degrees."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+class GeohashIndex:
+    """Points kept sorted by geohash so a radius query is a few bisect range scans.
+
+    A query picks the finest precision whose cells are at least radius_km on a
+    side, then scans the query's cell and its eight neighbours - the only cells
+    that can hold points within the radius.
+    """
+
+    PRECISION = 9
+
+    def __init__(self):
+        self._hashes: list = []
+        self._points: list = []
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def build(self, points: Iterable[tuple]):
+        """Replace the contents with (lat, lng, item) tuples."""
+        rows = [(geohash_encode(lat, lng, self.PRECISION), lat, lng, item) for lat, lng, item in points]
+        rows.sort(key=lambda row: row[0])
+        self._hashes = [row[0] for row in rows]
+        self._points = [row[1:] for row in rows]
+
+    def _query_precision(self, lat: float, radius_km: float) -> int:
+        km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+        lng_scale = max(math.cos(math.radians(lat)), 1e-6)
+        for precision in range(self.PRECISION, 0, -1):
+            height, width = geohash_cell_size(precision)
+            if height * km_per_degree >= radius_km and width * km_per_degree * lng_scale >= radius_km:
+                return precision
+        return 1
+
+    def within(self, lat: float, lng: float, radius_km: float) -> list:
+        """(distance_km, item) pairs within radius_km, nearest first."""
+        if not self._hashes:
+            return []
+        precision = self._query_precision(lat, radius_km)
+        height, width = geohash_cell_size(precision)
+        prefixes = {
+            geohash_encode(
+                max(-90.0, min(90.0, lat + dlat * height)),
+                (lng + dlng * width + 180.0) % 360.0 - 180.0,
+                precision,
+            )
+            for dlat in (-1, 0, 1)
+            for dlng in (-1, 0, 1)
+        }
+        found = []
+        for prefix in prefixes:
+            position = bisect.bisect_left(self._hashes, prefix)
+            while position < len(self._hashes) and self._hashes[position].startswith(prefix):
+                point_lat, point_lng, item = self._points[position]
+                distance = haversine_km(lat, lng, point_lat, point_lng)
+                if distance <= radius_km:
+                    found.append((distance, item))
+                position += 1
+        found.sort(key=lambda pair: pair[0])
+        return found
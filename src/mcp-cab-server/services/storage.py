@@ -1,18 +1,112 @@
 """File-based storage for sharing data between MCP server and FastAPI backend"""
 
+import asyncio
+import contextlib
+import functools
 import json
 import os
+import re
+import sqlite3
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Optional
 import threading
+import zlib
 
-STORAGE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '.storage')
+from services.logging_config import get_logger
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; locks then only coordinate threads within one process
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = get_logger(__name__, service="storage")
+
+STORAGE_DIR = os.getenv("CAB_STORAGE_DIR") or os.path.join(os.path.dirname(__file__), '..', '..', '..', '.storage')
 HOLDS_FILE = os.path.join(STORAGE_DIR, 'booking_holds.json')
 PAYMENTS_FILE = os.path.join(STORAGE_DIR, 'payment_sessions.json')
 PASSENGERS_FILE = os.path.join(STORAGE_DIR, 'passenger_data.json')
 
+SQLITE_FILE = os.path.join(STORAGE_DIR, 'cab_booking.db')
+
+# Storage engine: "json" rewrites the whole file on every save, "log" appends
+# per-record changes to a write-ahead log and compacts into the snapshot file,
+# "sqlite" keeps one row per record in an indexed WAL-mode database.
+STORAGE_BACKEND = os.getenv("CAB_STORAGE_BACKEND", "json").lower()
+LOG_COMPACT_EVERY = int(os.getenv("CAB_STORAGE_COMPACT_EVERY", "1000"))
+
+# Writes go to a temp file that is fsync'd and renamed over the original, so a
+# crash leaves either the old or the new file. Saves that arrive within
+# GROUP_COMMIT_MS of each other are written (and fsync'd) together.
+STORAGE_FSYNC = os.getenv("CAB_STORAGE_FSYNC", "true").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MS = float(os.getenv("CAB_STORAGE_GROUP_COMMIT_MS", "2"))
+
+# Serialization of stored records: "json" (indented JSON, the original format),
+# "orjson" (compact JSON, needs orjson) or "msgpack" (binary with native
+# datetimes, needs msgpack). Files in another format are converted on startup,
+# and renamed when the format uses another extension (.json vs .msgpack).
+STORAGE_SERIALIZER = os.getenv("CAB_STORAGE_SERIALIZER", "json").lower()
+
+# Holds can be split across N shards, each its own file/table with its own
+# lock and cache, so writers to different shards don't contend. 1 = unsharded.
+HOLD_SHARDS = max(1, int(os.getenv("CAB_HOLD_SHARDS", "1")))
+
+COLLECTION_FILES = {
+    'holds': HOLDS_FILE,
+    'payments': PAYMENTS_FILE,
+    'passengers': PASSENGERS_FILE,
+}
+
+DATETIME_FIELDS = {
+    'holds': ('created_at', 'expires_at', 'updated_at', 'confirmed_at'),
+    'payments': ('created_at', 'expires_at', 'completed_at'),
+    'passengers': ('added_at',),
+}
+
+# Table name and indexed columns per collection for the sqlite engine
+SQLITE_TABLES = {
+    'holds': ('booking_holds', ('status', 'expires_at')),
+    'payments': ('payment_sessions', ('hold_id', 'status', 'expires_at')),
+    'passengers': ('passenger_data', ()),
+}
+
+# Collection name per hold shard; with one shard it is the plain 'holds' collection
+HOLD_COLLECTIONS = ['holds'] if HOLD_SHARDS == 1 else [f'holds.{shard}' for shard in range(HOLD_SHARDS)]
+
+
+
+def _register_hold_shard(shard: int) -> str:
+    """Add the file/table settings of hold shard N; returns its collection name."""
+    collection = f'holds.{shard}'
+    COLLECTION_FILES[collection] = os.path.join(STORAGE_DIR, f'booking_holds.{shard}.json')
+    DATETIME_FIELDS[collection] = DATETIME_FIELDS['holds']
+    SQLITE_TABLES[collection] = (f'booking_holds_{shard}', SQLITE_TABLES['holds'][1])
+    return collection
+
+
+for _shard, _collection in enumerate(HOLD_COLLECTIONS):
+    if _collection != 'holds':
+        _register_hold_shard(_shard)
+
 _lock = threading.Lock()
 
+# Single worker: storage calls from async handlers run off the event loop but
+# still one at a time, in submission order.
+_io_executor: Optional[ThreadPoolExecutor] = None
+
 
 def ensure_storage_dir():
     os.makedirs(STORAGE_DIR, exist_ok=True)
@@ -36,95 +130,1145 @@ def datetime_deserializer(dct):
     return dct
 
 
-def save_holds(holds: Dict[str, Any]):
-    ensure_storage_dir()
+def decode_record(collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the ISO strings of a JSON-decoded record back into datetimes, in place."""
+    for field in DATETIME_FIELDS[collection]:
+        if field in record and isinstance(record[field], str):
+            record[field] = datetime.fromisoformat(record[field])
+    if collection.split('.')[0] == 'holds' and isinstance(record.get('departure_date'), str):
+        try:
+            record['departure_date'] = datetime.fromisoformat(record['departure_date']).date()
+        except ValueError:
+            pass
+    return record
+
+
+class JsonSerializer:
+    """Standard-library JSON. Snapshots are indented and written without a format header."""
+
+    name = 'json'
+    binary = False
+    # Whether datetimes survive a round trip, making decode_record unnecessary
+    native_datetimes = False
+    # File extensions of snapshots and (for the log engine) of logs
+    extension = '.json'
+    log_extension = '.log'
+    DecodeError = json.JSONDecodeError
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=datetime_serializer).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def dump_document(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, default=datetime_serializer, indent=2).encode()
+
+    def dump_entry(self, entry: Dict[str, Any]) -> bytes:
+        return self.dumps(entry) + b'\n'
+
+    def iter_entries(self, data: bytes):
+        """(entry, offset just past it) for each complete line of a log.
+
+        Lines that don't parse as an entry or lack their newline (a torn tail
+        left by a crash mid-append) are skipped.
+        """
+        start = 0
+        while True:
+            end = data.find(b'\n', start)
+            if end < 0:
+                return
+            line = data[start:end]
+            start = end + 1
+            try:
+                entry = self.loads(line)
+            except self.DecodeError:
+                continue
+            if not _is_log_entry(entry):
+                continue
+            yield entry, start
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Compact JSON via orjson, which also encodes datetimes natively."""
+
+    name = 'orjson'
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def dump_document(self, data: Dict[str, Any]) -> bytes:
+        return orjson.dumps(data)
+
+
+def _is_log_entry(entry: Any) -> bool:
+    if isinstance(entry, dict) and entry.get('op') == 'batch':
+        changes = entry.get('entries')
+        return isinstance(changes, list) and all(_is_log_entry(change) for change in changes)
+    if not isinstance(entry, dict) or 'key' not in entry:
+        return False
+    return entry.get('op') == 'del' or (entry.get('op') == 'put' and isinstance(entry.get('value'), dict))
+
+
+def _log_changes(entry: Dict[str, Any]) -> list:
+    """The put/del changes of a log entry; a 'batch' entry holds several."""
+    return entry['entries'] if entry['op'] == 'batch' else [entry]
+
+
+_MSGPACK_DATETIME = 1
+_MSGPACK_DATE = 2
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_MSGPACK_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_MSGPACK_DATE, obj.isoformat().encode())
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == _MSGPACK_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _MSGPACK_DATE:
+        return date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+# Header of each msgpack log entry: payload length and CRC32
+_MSGPACK_FRAME = struct.Struct('>II')
+
+
+class MsgpackSerializer:
+    """MessagePack with datetimes and dates as ext types, decoded while unpacking.
+
+    Log entries are framed with their length and CRC32. Format version 1
+    logs were unframed; those are still read, as the 'msgpack-v1' format.
+    """
+
+    name = 'msgpack'
+    binary = True
+    native_datetimes = True
+    extension = '.msgpack'
+    log_extension = '.msgpack.log'
+
+    def __init__(self, framed: bool = True):
+        self.framed = framed
+        if not framed:
+            self.name = 'msgpack-v1'
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False)
+
+    def dump_document(self, data: Dict[str, Any]) -> bytes:
+        return self.dumps(data)
+
+    def dump_entry(self, entry: Dict[str, Any]) -> bytes:
+        payload = self.dumps(entry)
+        return _MSGPACK_FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def iter_entries(self, data: bytes):
+        """(entry, offset just past it) for each entry of a log.
+
+        msgpack has no resync point, so the log ends at the first frame that
+        is incomplete, fails its checksum or doesn't hold an entry: a torn
+        tail is detected instead of being decoded as stray values.
+        """
+        if not self.framed:
+            yield from self._iter_unframed(data)
+            return
+        offset = 0
+        while offset + _MSGPACK_FRAME.size <= len(data):
+            length, checksum = _MSGPACK_FRAME.unpack_from(data, offset)
+            start = offset + _MSGPACK_FRAME.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            try:
+                entry = self.loads(payload)
+            except ValueError:
+                return
+            if not _is_log_entry(entry):
+                return
+            offset = start + length
+            yield entry, offset
+
+    def _iter_unframed(self, data: bytes):
+        unpacker = msgpack.Unpacker(ext_hook=_msgpack_ext_hook, raw=False)
+        unpacker.feed(data)
+        try:
+            # An incomplete trailing entry is simply not yielded; msgpack has no
+            # resync point, so anything that isn't an entry ends the log
+            for entry in unpacker:
+                if not _is_log_entry(entry):
+                    return
+                yield entry, unpacker.tell()
+        except ValueError:
+            return
+
+
+SERIALIZERS = {
+    JsonSerializer.name: (JsonSerializer, True),
+    OrjsonSerializer.name: (OrjsonSerializer, orjson is not None),
+    MsgpackSerializer.name: (MsgpackSerializer, msgpack is not None),
+}
+
+if STORAGE_SERIALIZER not in SERIALIZERS:
+    raise ValueError(
+        f"Unknown CAB_STORAGE_SERIALIZER '{STORAGE_SERIALIZER}'. Expected one of: {', '.join(SERIALIZERS)}"
+    )
+if not SERIALIZERS[STORAGE_SERIALIZER][1]:
+    raise ValueError(
+        f"CAB_STORAGE_SERIALIZER={STORAGE_SERIALIZER} needs the {STORAGE_SERIALIZER} package: pip install {STORAGE_SERIALIZER}"
+    )
+
+_serializer = SERIALIZERS[STORAGE_SERIALIZER][0]()
+# Reads JSON written by any serializer; orjson parses the same text faster
+_json_reader = OrjsonSerializer() if orjson is not None else JsonSerializer()
+
+# Files written by non-json serializers start with "#cabstore <serializer> <version>\n".
+# Files without it are plain JSON from before the header existed.
+FORMAT_MAGIC = b'#cabstore '
+# 2: msgpack log entries are framed with their length and CRC32
+FORMAT_VERSION = 2
+
+
+def format_header(serializer) -> bytes:
+    if serializer.name == JsonSerializer.name:
+        return b''
+    return FORMAT_MAGIC + f'{serializer.name} {FORMAT_VERSION}\n'.encode()
+
+
+@functools.lru_cache(maxsize=None)
+def _reader(name: str, version: int = FORMAT_VERSION):
+    if name == JsonSerializer.name:
+        return _json_reader
+    serializer_class, available = SERIALIZERS.get(name, (None, False))
+    if not available:
+        raise ValueError(f"Storage file written with '{name}', which is not installed or unknown")
+    if serializer_class is MsgpackSerializer and version < 2:
+        return MsgpackSerializer(framed=False)
+    return serializer_class()
+
+
+def split_header(raw: bytes) -> tuple:
+    """(format name, reader, payload) for the contents of a storage file.
+
+    The format name is the reader's, so it tells older layouts of a serializer apart.
+    """
+    if not raw.startswith(FORMAT_MAGIC):
+        return JsonSerializer.name, _json_reader, raw
+    header, _, payload = raw.partition(b'\n')
+    name, version = header[len(FORMAT_MAGIC):].decode().split()
+    if int(version) > FORMAT_VERSION:
+        raise ValueError(f"Storage file format version {version} is newer than supported ({FORMAT_VERSION})")
+    reader = _reader(name, int(version))
+    return reader.name, reader, payload
+
+
+def read_format(path: str) -> Optional[str]:
+    """Format name a storage file was written with, or None if it doesn't exist."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(64)
+    except FileNotFoundError:
+        return None
+    return split_header(head)[0] if head.startswith(FORMAT_MAGIC) else JsonSerializer.name
+
+
+def _fsync_dir(path: str):
+    """Persist a rename/create in path's directory (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes):
+    """Replace path with data so readers and crashes never see a partial file."""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if STORAGE_FSYNC:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if STORAGE_FSYNC:
+        _fsync_dir(path)
+
+
+def _format_paths(collection: str, attribute: str) -> list:
+    """Path of a collection's file under each serializer's extension, the configured one first."""
+    base = os.path.splitext(COLLECTION_FILES[collection])[0]
+    extensions = [getattr(_serializer, attribute)]
+    for serializer_class, _ in SERIALIZERS.values():
+        extension = getattr(serializer_class, attribute)
+        if extension not in extensions:
+            extensions.append(extension)
+    return [base + extension for extension in extensions]
+
+
+def _first_existing(paths: list) -> Optional[str]:
+    return next((path for path in paths if os.path.exists(path)), None)
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class JsonFileEngine:
+    """Keeps each collection as one JSON document that is rewritten on save.
+
+    The file's extension follows the serializer. Until a collection has been
+    rewritten in the configured format, it is read from the file of the
+    format it was last written in.
+    """
+
+    name = 'json'
+    # Whether get() reads one record without loading the whole collection
+    point_reads = False
+
+    def path(self, collection: str) -> str:
+        return self.snapshot_paths(collection)[0]
+
+    def snapshot_paths(self, collection: str) -> list:
+        return _format_paths(collection, 'extension')
+
+    def load(self, collection: str) -> Dict[str, Any]:
+        path = _first_existing(self.snapshot_paths(collection))
+        if path is None:
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return {}
+        _, reader, payload = split_header(raw)
+        try:
+            data = reader.loads(payload) if payload else {}
+        except ValueError:
+            # Unreadable snapshot (JSON and msgpack decode errors are ValueErrors)
+            return {}
+        if not reader.native_datetimes:
+            for record in data.values():
+                decode_record(collection, record)
+        return data
+
+    def save(self, collection: str, data: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+        atomic_write(self.path(collection), format_header(_serializer) + _serializer.dump_document(data))
+        # The new snapshot holds everything, so files of other formats are obsolete
+        for path in self.legacy_files(collection):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def needs_migration(self, collection: str) -> bool:
+        return (
+            read_format(self.path(collection)) not in (None, _serializer.name)
+            or _first_existing(self.legacy_files(collection)) is not None
+        )
+
+    def legacy_files(self, collection: str) -> list:
+        """Files the collection would have under other serializers' extensions."""
+        return self.snapshot_paths(collection)[1:]
+
+    def signature(self, collection: str) -> tuple:
+        """Cheap fingerprint that changes whenever the stored collection changes."""
+        return tuple(_file_signature(path) for path in self.files(collection))
+
+    def files(self, collection: str) -> list:
+        return self.snapshot_paths(collection)
+
+    def stored_hold_shards(self) -> set:
+        """Numbers of the hold shards that have files, whatever HOLD_SHARDS is now."""
+        try:
+            names = os.listdir(STORAGE_DIR)
+        except FileNotFoundError:
+            return set()
+        return {
+            int(match.group(1))
+            for match in map(re.compile(r'booking_holds\.(\d+)\.[\w.]+$').match, names)
+            if match
+        }
+
+
+class AppendLogEngine(JsonFileEngine):
+    """JSON snapshot plus an append-only log of per-record changes.
+
+    Saves that name the changed keys append one entry holding just those
+    records, so write cost is proportional to the change rather than to the
+    whole collection, and a save is replayed in full or not at all. The log
+    is folded back into the snapshot every LOG_COMPACT_EVERY records.
+    """
+
+    name = 'log'
+
+    def __init__(self):
+        self._log_entries: Dict[str, int] = {}
+        # Serializer the existing log was written with; appends must match it
+        self._log_formats: Dict[str, Optional[str]] = {}
+        # (file size, end of the last complete entry) as last read or written here
+        self._log_ends: Dict[str, tuple] = {}
+
+    def log_path(self, collection: str) -> str:
+        return self.log_paths(collection)[0]
+
+    def log_paths(self, collection: str) -> list:
+        return _format_paths(collection, 'log_extension')
+
+    def _read_log(self, collection: str) -> list:
+        """Entries of the log, recording its format and where its last complete entry ends."""
+        try:
+            with open(_first_existing(self.log_paths(collection)) or self.log_path(collection), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            self._log_formats[collection] = None
+            self._log_ends[collection] = (0, 0)
+            return []
+        if raw.startswith(FORMAT_MAGIC) and b'\n' not in raw:
+            # Crashed while writing the header itself
+            self._log_formats[collection] = None
+            self._log_ends[collection] = (len(raw), 0)
+            return []
+        log_format, reader, payload = split_header(raw)
+        offset = len(raw) - len(payload)
+        valid_end = offset
+        entries = []
+        for entry, end in reader.iter_entries(payload):
+            for change in _log_changes(entry):
+                if change['op'] == 'put' and not reader.native_datetimes:
+                    decode_record(collection, change['value'])
+                entries.append(change)
+            valid_end = offset + end
+        self._log_formats[collection] = log_format
+        self._log_ends[collection] = (len(raw), valid_end)
+        return entries
+
+    def _repair_tail(self, collection: str, log_path: str) -> int:
+        """Cut a torn tail off the log so new entries don't land behind it; returns the log size.
+
+        Only called from save, which runs under the collection lock, so a
+        partial entry here is left over from a crash rather than an append
+        still in progress.
+        """
+        try:
+            size = os.path.getsize(log_path)
+        except FileNotFoundError:
+            return 0
+        if self._log_ends.get(collection) != (size, size):
+            self._read_log(collection)
+            size, valid_end = self._log_ends[collection]
+            if valid_end < size:
+                with open(log_path, 'r+b') as f:
+                    f.truncate(valid_end)
+                    f.flush()
+                    if STORAGE_FSYNC:
+                        os.fsync(f.fileno())
+                logger.warning(
+                    "Truncated torn storage log tail",
+                    extra={"collection": collection, "dropped_bytes": size - valid_end}
+                )
+                size = valid_end
+                self._log_ends[collection] = (size, size)
+        return size
+
+    def load(self, collection: str) -> Dict[str, Any]:
+        data = super().load(collection)
+        entries = self._read_log(collection)
+        for entry in entries:
+            if entry['op'] == 'put':
+                data[entry['key']] = entry['value']
+            else:
+                data.pop(entry['key'], None)
+        self._log_entries[collection] = len(entries)
+        return data
+
+    def save(self, collection: str, data: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+        log_path = self.log_path(collection)
+        size = self._repair_tail(collection, log_path)
+        created = size == 0
+        # The log last read may be another format's (under its own extension
+        # until migrated); that is folded into a snapshot, never appended to
+        log_format = self._log_formats.get(collection)
+        if (
+            changed is None
+            or self._log_entries.get(collection, 0) >= LOG_COMPACT_EVERY
+            or (log_format != _serializer.name and not (created and log_format is None))
+        ):
+            self.compact(collection, data)
+            return
+        changes = [
+            {'op': 'put', 'key': key, 'value': data[key]} if key in data else {'op': 'del', 'key': key}
+            for key in changed
+        ]
+        if not changes:
+            return
+        # One entry per save, so a crash mid-append loses the whole save rather
+        # than keeping the records written before the tear
+        entry = changes[0] if len(changes) == 1 else {'op': 'batch', 'entries': changes}
+        chunk = (format_header(_serializer) if created else b'') + _serializer.dump_entry(entry)
+        with open(log_path, 'ab') as f:
+            f.write(chunk)
+            f.flush()
+            if STORAGE_FSYNC:
+                os.fsync(f.fileno())
+        if created and STORAGE_FSYNC:
+            _fsync_dir(log_path)
+        self._log_entries[collection] = self._log_entries.get(collection, 0) + len(changes)
+        self._log_formats[collection] = _serializer.name
+        self._log_ends[collection] = (size + len(chunk), size + len(chunk))
+
+    def compact(self, collection: str, data: Dict[str, Any]):
+        # Snapshot first: if we crash before the log is removed, replaying it
+        # over the new snapshot is harmless
+        super().save(collection, data)
+        log_path = self.log_path(collection)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+            if STORAGE_FSYNC:
+                _fsync_dir(log_path)
+        self._log_entries[collection] = 0
+        self._log_formats[collection] = None
+        self._log_ends[collection] = (0, 0)
+
+    def needs_migration(self, collection: str) -> bool:
+        formats = (read_format(self.path(collection)), read_format(self.log_path(collection)))
+        return (
+            any(name not in (None, _serializer.name) for name in formats)
+            or _first_existing(self.legacy_files(collection)) is not None
+        )
+
+    def legacy_files(self, collection: str) -> list:
+        return self.snapshot_paths(collection)[1:] + self.log_paths(collection)[1:]
+
+    def files(self, collection: str) -> list:
+        return self.snapshot_paths(collection) + self.log_paths(collection)
+
+
+class SqliteEngine:
+    """One row per record in SQLite (WAL mode), indexed for point lookups.
+
+    Unlike the file engines the database can be opened by the MCP server and
+    payment_backend at the same time, and saves that name the changed keys
+    only touch those rows.
+    """
+
+    name = 'sqlite'
+    point_reads = True
+
+    def __init__(self, path: str = SQLITE_FILE):
+        self.path = path
+        self._conn = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            ensure_storage_dir()
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL' if STORAGE_FSYNC else 'PRAGMA synchronous=NORMAL')
+            for table, columns in SQLITE_TABLES.values():
+                column_defs = ''.join(f', {column} TEXT' for column in columns)
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY{column_defs}, data TEXT NOT NULL)'
+                )
+                for column in columns:
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS collection_versions (collection TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _row(self, collection: str, key: str, record: Dict[str, Any]) -> tuple:
+        _, columns = SQLITE_TABLES[collection]
+        values = []
+        for column in columns:
+            value = record.get(column)
+            values.append(value.isoformat() if isinstance(value, (datetime, date)) else value)
+        data = _serializer.dumps(record)
+        # JSON goes in as TEXT, msgpack as a BLOB, so each row says how to read it
+        return (key, *values, data if _serializer.binary else data.decode())
+
+    def _decode(self, collection: str, data) -> Dict[str, Any]:
+        if isinstance(data, bytes):
+            return _reader(MsgpackSerializer.name).loads(data)
+        return decode_record(collection, _json_reader.loads(data))
+
+    def load(self, collection: str) -> Dict[str, Any]:
+        table, _ = SQLITE_TABLES[collection]
+        rows = self.connection().execute(f'SELECT key, data FROM {table}')
+        return {key: self._decode(collection, data) for key, data in rows}
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        table, _ = SQLITE_TABLES[collection]
+        row = self.connection().execute(f'SELECT data FROM {table} WHERE key = ?', (key,)).fetchone()
+        return self._decode(collection, row[0]) if row else None
+
+    def needs_migration(self, collection: str) -> bool:
+        # orjson and json rows are both JSON text; only the TEXT/BLOB split needs rewriting
+        table, _ = SQLITE_TABLES[collection]
+        other_type = 'text' if _serializer.binary else 'blob'
+        row = self.connection().execute(
+            f'SELECT 1 FROM {table} WHERE typeof(data) = ? LIMIT 1', (other_type,)
+        ).fetchone()
+        return row is not None
+
+    def save(self, collection: str, data: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+        table, columns = SQLITE_TABLES[collection]
+        column_list = ''.join(f'{column}, ' for column in columns)
+        placeholders = ', '.join('?' * (len(columns) + 2))
+        upsert = f'INSERT OR REPLACE INTO {table} (key, {column_list}data) VALUES ({placeholders})'
+        conn = self.connection()
+        with conn:
+            if changed is None:
+                conn.execute(f'DELETE FROM {table}')
+                keys = list(data)
+            else:
+                keys = list(changed)
+                conn.executemany(
+                    f'DELETE FROM {table} WHERE key = ?',
+                    [(key,) for key in keys if key not in data]
+                )
+            conn.executemany(upsert, [self._row(collection, key, data[key]) for key in keys if key in data])
+            conn.execute(
+                'INSERT INTO collection_versions (collection, version) VALUES (?, 1) '
+                'ON CONFLICT (collection) DO UPDATE SET version = version + 1',
+                (collection,)
+            )
+
+    def signature(self, collection: str) -> tuple:
+        # Bumped in the same transaction as every save of the collection, so
+        # writes to other collections (or by other processes to them) don't
+        # invalidate its cache the way the database-wide data_version would
+        row = self.connection().execute(
+            'SELECT version FROM collection_versions WHERE collection = ?', (collection,)
+        ).fetchone()
+        return (row[0] if row else 0,)
+
+    def files(self, collection: str) -> list:
+        return [self.path, self.path + '-wal', self.path + '-shm']
+
+    def stored_hold_shards(self) -> set:
+        rows = self.connection().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'booking_holds_[0-9]*'"
+        )
+        return {int(name.rsplit('_', 1)[1]) for (name,) in rows}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+ENGINES = {
+    JsonFileEngine.name: JsonFileEngine,
+    AppendLogEngine.name: AppendLogEngine,
+    SqliteEngine.name: SqliteEngine,
+}
+
+if STORAGE_BACKEND not in ENGINES:
+    raise ValueError(
+        f"Unknown CAB_STORAGE_BACKEND '{STORAGE_BACKEND}'. Expected one of: {', '.join(ENGINES)}"
+    )
+
+_engine = ENGINES[STORAGE_BACKEND]()
+
+
+def get_engine():
+    return _engine
+
+
+# collection -> (engine signature, decoded data). Loads return the cached dict
+# until the signature changes, i.e. until another process writes the store.
+_cache: Dict[str, tuple] = {}
+
+
+def _cached(collection: str) -> Optional[Dict[str, Any]]:
+    entry = _cache.get(collection)
+    if entry is not None and entry[0] == _engine.signature(collection):
+        return entry[1]
+    return None
+
+
+def invalidate_cache():
     with _lock:
-        with open(HOLDS_FILE, 'w') as f:
-            json.dump(holds, f, default=datetime_serializer, indent=2)
+        _cache.clear()
 
 
-def load_holds() -> Dict[str, Any]:
-    ensure_storage_dir()
-    if not os.path.exists(HOLDS_FILE):
-        return {}
-    
+class _CollectionLock:
+    """Re-entrant per-thread lock plus an advisory flock shared with other processes.
+
+    flock locks belong to an open file, so each process keeps one descriptor
+    per collection. The flock is taken when the first holder in this process
+    pins it and released when the last one unpins it: a thread holding the
+    lock counts as one, and so does each of its saves still waiting to be
+    committed, so no other process can read the collection before they are.
+    """
+
+    def __init__(self, collection: str):
+        self.path = os.path.join(STORAGE_DIR, f'{collection}.lock')
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._owner: Optional[int] = None
+        self._mutex = threading.Lock()
+        self._pins = 0
+        self._fd: Optional[int] = None
+
+    def acquire(self):
+        self._rlock.acquire()
+        self._depth += 1
+        if self._depth > 1:
+            return
+        try:
+            self.pin()
+        except BaseException:
+            self._depth -= 1
+            self._rlock.release()
+            raise
+        self._owner = threading.get_ident()
+
+    def release(self):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                self._owner = None
+                self.unpin()
+        finally:
+            self._rlock.release()
+
+    def owned(self) -> bool:
+        return self._owner == threading.get_ident()
+
+    def pin(self):
+        with self._mutex:
+            if self._pins == 0 and fcntl is not None:
+                if self._fd is None:
+                    ensure_storage_dir()
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._pins += 1
+
+    def unpin(self):
+        with self._mutex:
+            self._pins -= 1
+            if self._pins == 0 and fcntl is not None and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+_collection_locks = {collection: _CollectionLock(collection) for collection in COLLECTION_FILES}
+
+# Per thread: nesting depth of locked() and the saves queued inside it
+_thread_state = threading.local()
+
+
+@contextlib.contextmanager
+def locked(*collections: str):
+    """Hold the cross-process write lock for the given collections.
+
+    Read-modify-write sequences (load, change, save) must run inside it so
+    that the MCP server and payment_backend can't overwrite each other's
+    updates. Loads inside the lock are still served from the cache unless
+    another process has written since. Locks are taken in a fixed order,
+    and can be nested. Also usable as a decorator.
+
+    Saves made inside the lock are queued and only waited for once the
+    outermost locked() has released it, so that other threads can queue
+    theirs into the same group commit meanwhile. The first commit error is
+    raised from there.
+    """
+    depth = getattr(_thread_state, 'depth', 0)
+    if depth == 0:
+        _thread_state.queued = []
+    _thread_state.depth = depth + 1
+    acquired = []
+    error = None
+    try:
+        for collection in sorted(set(collections)):
+            _collection_locks[collection].acquire()
+            acquired.append(collection)
+        yield
+    finally:
+        for collection in reversed(acquired):
+            _collection_locks[collection].release()
+        _thread_state.depth = depth
+        if depth == 0:
+            queued, _thread_state.queued = _thread_state.queued, []
+            error = _wait_queued(queued)
+    if error is not None:
+        raise error
+
+
+def _wait_queued(queued: list) -> Optional[BaseException]:
+    """Wait for saves queued inside locked(), in order; returns the first error.
+
+    Saves after a failed one are withdrawn unless a batch already took them.
+    """
+    error = None
+    for collection, request in queued:
+        try:
+            if error is not None and _committer.withdraw(collection, request):
+                # Don't write what was meant to follow a failed write
+                with _lock:
+                    _cache.pop(collection, None)
+                continue
+            _committer.wait(collection, request)
+        except BaseException as e:
+            if error is None:
+                error = e
+        finally:
+            _collection_locks[collection].unpin()
+    return error
+
+
+class _CommitRequest:
+    __slots__ = ('data', 'changed', 'done', 'error')
+
+    def __init__(self, data: Dict[str, Any], changed: Optional[Iterable[str]]):
+        self.data = data
+        self.changed = None if changed is None else list(changed)
+        self.done = False
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitter:
+    """Coalesces saves from concurrent threads into fewer durable writes.
+
+    Saves are queued per collection. The first thread to wait on a queued
+    save becomes the leader: it waits window seconds, then commits every
+    request queued for that collection in one go (under lock(collection),
+    if given), and keeps going while more arrive. Other threads just wait
+    for the batch holding their request. Each caller returns only once its
+    data is written, and gets the write's exception if it failed.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[str, list], None],
+        window: float,
+        lock: Optional[Callable[[str], Any]] = None,
+    ):
+        self._commit = commit
+        self.window = window
+        self._lock = lock
+        self._condition = threading.Condition()
+        self._pending: Dict[str, list] = {}
+        self._leaders: set = set()
+        self.requests = 0
+        self.commits = 0
+
+    def enqueue(self, collection: str, data: Dict[str, Any], changed: Optional[Iterable[str]] = None) -> _CommitRequest:
+        request = _CommitRequest(data, changed)
+        with self._condition:
+            self.requests += 1
+            self._pending.setdefault(collection, []).append(request)
+        return request
+
+    def wait(self, collection: str, request: _CommitRequest):
+        with self._condition:
+            while not request.done and collection in self._leaders:
+                self._condition.wait()
+            leader = not request.done
+            if leader:
+                self._leaders.add(collection)
+        if leader:
+            self._lead(collection)
+        if request.error is not None:
+            raise request.error
+
+    def withdraw(self, collection: str, request: _CommitRequest) -> bool:
+        """Drop a request no batch has taken yet; False if it is being or was committed."""
+        with self._condition:
+            pending = self._pending.get(collection, [])
+            if request not in pending:
+                return False
+            pending.remove(request)
+            return True
+
+    def submit(self, collection: str, data: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+        self.wait(collection, self.enqueue(collection, data, changed))
+
+    def _lead(self, collection: str):
+        if self.window > 0:
+            time.sleep(self.window)
+        while True:
+            with self._condition:
+                if not self._pending.get(collection):
+                    self._leaders.discard(collection)
+                    self._condition.notify_all()
+                    return
+            batch, error = self._commit_pending(collection)
+            with self._condition:
+                self.commits += 1
+                for request in batch:
+                    request.done = True
+                    request.error = error
+                self._condition.notify_all()
+
+    def _commit_pending(self, collection: str) -> tuple:
+        batch = []
+        try:
+            with self._lock(collection) if self._lock else contextlib.nullcontext():
+                # Taken under the lock, so no save can be queued from inside it meanwhile
+                with self._condition:
+                    batch = self._pending.pop(collection)
+                self._commit(collection, batch)
+        except BaseException as e:
+            if not batch:
+                with self._condition:
+                    batch = self._pending.pop(collection, [])
+            return batch, e
+        return batch, None
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "commits": self.commits}
+
+
+def _coalesce(batch: list) -> list:
+    """Merge consecutive requests that save the same dict into (data, changed) writes."""
+    writes = []
+    for request in batch:
+        if writes and writes[-1][0] is request.data:
+            previous = writes[-1][1]
+            if previous is None or request.changed is None:
+                merged = None
+            else:
+                merged = list(dict.fromkeys(previous + request.changed))
+            writes[-1] = (request.data, merged)
+        else:
+            writes.append((request.data, request.changed))
+    return writes
+
+
+def _commit_batch(collection: str, batch: list):
     with _lock:
         try:
-            with open(HOLDS_FILE, 'r') as f:
-                data = json.load(f)
-                for hold_id, hold in data.items():
-                    if 'created_at' in hold and isinstance(hold['created_at'], str):
-                        hold['created_at'] = datetime.fromisoformat(hold['created_at'])
-                    if 'expires_at' in hold and isinstance(hold['expires_at'], str):
-                        hold['expires_at'] = datetime.fromisoformat(hold['expires_at'])
-                    if 'updated_at' in hold and isinstance(hold['updated_at'], str):
-                        hold['updated_at'] = datetime.fromisoformat(hold['updated_at'])
-                    if 'confirmed_at' in hold and isinstance(hold['confirmed_at'], str):
-                        hold['confirmed_at'] = datetime.fromisoformat(hold['confirmed_at'])
-                    if 'departure_date' in hold and isinstance(hold['departure_date'], str):
-                        try:
-                            hold['departure_date'] = datetime.fromisoformat(hold['departure_date']).date()
-                        except:
-                            pass
-                return data
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
+            for data, changed in _coalesce(batch):
+                _engine.save(collection, data, changed)
+        except BaseException:
+            # The cache may hold the unsaved changes; reload from disk next time
+            _cache.pop(collection, None)
+            raise
+        _cache[collection] = (_engine.signature(collection), batch[-1].data)
+
 
+_committer = GroupCommitter(_commit_batch, GROUP_COMMIT_MS / 1000, lock=locked)
 
-def save_payments(payments: Dict[str, Any]):
+
+def get_commit_stats() -> dict:
+    return _committer.stats()
+
+
+def _save(collection: str, data: Dict[str, Any], changed: Optional[Iterable[str]] = None):
     ensure_storage_dir()
+    lock = _collection_locks[collection]
+    if not lock.owned():
+        _committer.submit(collection, data, changed)
+        return
+    # Inside locked(): queue the write, keep the flock until it is committed
+    # and serve the queued data from the cache in the meantime
+    lock.pin()
+    request = _committer.enqueue(collection, data, changed)
     with _lock:
-        with open(PAYMENTS_FILE, 'w') as f:
-            json.dump(payments, f, default=datetime_serializer, indent=2)
+        _cache[collection] = (_engine.signature(collection), data)
+    _thread_state.queued.append((collection, request))
 
 
-def load_payments() -> Dict[str, Any]:
+def _load_locked(collection: str) -> Dict[str, Any]:
+    data = _cached(collection)
+    if data is None:
+        signature = _engine.signature(collection)
+        data = _engine.load(collection)
+        _cache[collection] = (signature, data)
+    return data
+
+
+def _load(collection: str) -> Dict[str, Any]:
     ensure_storage_dir()
-    if not os.path.exists(PAYMENTS_FILE):
-        return {}
-    
     with _lock:
-        try:
-            with open(PAYMENTS_FILE, 'r') as f:
-                data = json.load(f)
-                for session_id, session in data.items():
-                    if 'created_at' in session and isinstance(session['created_at'], str):
-                        session['created_at'] = datetime.fromisoformat(session['created_at'])
-                    if 'expires_at' in session and isinstance(session['expires_at'], str):
-                        session['expires_at'] = datetime.fromisoformat(session['expires_at'])
-                    if 'completed_at' in session and isinstance(session['completed_at'], str):
-                        session['completed_at'] = datetime.fromisoformat(session['completed_at'])
-                return data
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
+        return _load_locked(collection)
 
 
-def save_passengers(passengers: Dict[str, Any]):
+def _get(collection: str, key: str) -> Optional[Dict[str, Any]]:
     ensure_storage_dir()
     with _lock:
-        with open(PASSENGERS_FILE, 'w') as f:
-            json.dump(passengers, f, default=datetime_serializer, indent=2)
+        data = _cached(collection)
+        if data is not None:
+            return data.get(key)
+        if _engine.point_reads:
+            # Another process wrote since; read just this record rather than the whole table
+            return _engine.get(collection, key)
+        # File engines can only read everything, so refresh the cache for the lookups that follow
+        return _load_locked(collection).get(key)
+
+
+def hold_shard(hold_id: str) -> int:
+    """Shard holding hold_id: the numeric part modulo HOLD_SHARDS, else a stable hash."""
+    _, _, number = hold_id.partition('_')
+    if number.isdigit():
+        return int(number) % HOLD_SHARDS
+    return zlib.crc32(hold_id.encode()) % HOLD_SHARDS
+
+
+def hold_collection(hold_id: str) -> str:
+    return HOLD_COLLECTIONS[hold_shard(hold_id)]
+
+
+def save_holds(holds: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+    """Persist holds. With changed, only those keys are written, each to its shard,
+    and holds may be any mapping that contains them (or lacks them, for deletes)."""
+    if changed is None:
+        shards = [{} for _ in HOLD_COLLECTIONS]
+        for hold_id, hold in holds.items():
+            shards[hold_shard(hold_id)][hold_id] = hold
+        for collection, data in zip(HOLD_COLLECTIONS, shards):
+            _save(collection, data)
+        return
+    by_shard: Dict[int, list] = {}
+    for hold_id in changed:
+        by_shard.setdefault(hold_shard(hold_id), []).append(hold_id)
+    for shard, hold_ids in by_shard.items():
+        collection = HOLD_COLLECTIONS[shard]
+        with locked(collection):
+            data = _load(collection)
+            if data is not holds:
+                for hold_id in hold_ids:
+                    if hold_id in holds:
+                        data[hold_id] = holds[hold_id]
+                    else:
+                        data.pop(hold_id, None)
+            _save(collection, data, hold_ids)
+
+
+def load_holds() -> Dict[str, Any]:
+    """All holds. Sharded stores return a merged copy; use load_hold_shard to mutate in place."""
+    if HOLD_SHARDS == 1:
+        return _load('holds')
+    merged = {}
+    for collection in HOLD_COLLECTIONS:
+        merged.update(_load(collection))
+    return merged
+
+
+def load_hold_shard(shard: int) -> Dict[str, Any]:
+    return _load(HOLD_COLLECTIONS[shard])
+
+
+def load_hold(hold_id: str) -> Optional[Dict[str, Any]]:
+    return _get(hold_collection(hold_id), hold_id)
+
+
+def migrate_serialization():
+    """Rewrite collections stored in another serializer's format with STORAGE_SERIALIZER."""
+    for collection in COLLECTION_FILES:
+        with locked(collection):
+            if _engine.needs_migration(collection):
+                _save(collection, _load(collection))
+
+
+def migrate_hold_shards():
+    """Move holds into the shard their id maps to under the current CAB_HOLD_SHARDS.
+
+    Changing the shard count strands holds: in the unsharded 'holds'
+    collection once sharding is enabled, in shards at or above HOLD_SHARDS
+    after it was lowered (all of them when it is back to 1), and in the
+    wrong shard when it was raised. Lookups would miss all of those.
+    """
+    sources = [] if HOLD_SHARDS == 1 else ['holds']
+    for shard in sorted(_engine.stored_hold_shards()):
+        collection = f'holds.{shard}'
+        if collection not in HOLD_COLLECTIONS:
+            _register_hold_shard(shard)
+            _collection_locks.setdefault(collection, _CollectionLock(collection))
+        sources.append(collection)
+    for source in sources:
+        with locked(source, *HOLD_COLLECTIONS):
+            stranded = {
+                hold_id: hold for hold_id, hold in _load(source).items()
+                if hold_collection(hold_id) != source
+            }
+            if not stranded:
+                continue
+            save_holds(stranded, changed=list(stranded))
+        # Only removed from the source once the shards have them on disk
+        with locked(source):
+            data = _load(source)
+            for hold_id in stranded:
+                data.pop(hold_id, None)
+            _save(source, data, list(stranded))
+        logger.warning(
+            "Moved holds to the shard their id maps to",
+            extra={"collection": source, "hold_count": len(stranded), "hold_shards": HOLD_SHARDS}
+        )
+
+
+def save_payments(payments: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+    _save('payments', payments, changed)
+
+
+def load_payments() -> Dict[str, Any]:
+    return _load('payments')
+
+
+def load_payment(session_id: str) -> Optional[Dict[str, Any]]:
+    return _get('payments', session_id)
+
+
+def save_passengers(passengers: Dict[str, Any], changed: Optional[Iterable[str]] = None):
+    _save('passengers', passengers, changed)
 
 
 def load_passengers() -> Dict[str, Any]:
-    ensure_storage_dir()
-    if not os.path.exists(PASSENGERS_FILE):
-        return {}
-    
-    with _lock:
-        try:
-            with open(PASSENGERS_FILE, 'r') as f:
-                data = json.load(f)
-                for hold_id, passenger in data.items():
-                    if 'added_at' in passenger and isinstance(passenger['added_at'], str):
-                        passenger['added_at'] = datetime.fromisoformat(passenger['added_at'])
-                return data
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
+    return _load('passengers')
 
 
 def clear_all_storage():
     ensure_storage_dir()
-    for file_path in [HOLDS_FILE, PAYMENTS_FILE, PASSENGERS_FILE]:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    invalidate_cache()
+    if hasattr(_engine, 'close'):
+        _engine.close()
+    for collection in COLLECTION_FILES:
+        for file_path in _engine.files(collection):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-io")
+    return _io_executor
+
+
+async def run_storage_io(fn: Callable, *args, **kwargs):
+    """Run a blocking storage/mock_db call on the storage I/O thread and await it."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_storage_io():
+    """Wait for queued storage work to finish; a later call starts a fresh worker."""
+    global _io_executor
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=True)
+        _io_executor = None
@@ -0,0 +1,66 @@
+"""Shared fixtures. Storage goes to a throwaway directory, never the default .storage."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+import pytest
+
+SERVER_DIR = Path(__file__).resolve().parents[1] / "src" / "mcp-cab-server"
+
+os.environ["CAB_STORAGE_DIR"] = tempfile.mkdtemp(prefix="cab-storage-")
+os.environ.setdefault("CAB_STORAGE_FSYNC", "false")
+sys.path.insert(0, str(SERVER_DIR))
+
+
+def _wipe(storage):
+    storage.clear_all_storage()
+    # Tests also drive engines other than the configured one directly
+    for name in os.listdir(storage.STORAGE_DIR):
+        path = os.path.join(storage.STORAGE_DIR, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+@pytest.fixture
+def storage():
+    from services import storage
+
+    _wipe(storage)
+    yield storage
+    _wipe(storage)
+
+
+@pytest.fixture
+def mock_db(storage):
+    from services import mock_db
+
+    mock_db.refresh_payment_index()
+    return mock_db
+
+
+@pytest.fixture
+def run_python(tmp_path):
+    """Run code in a fresh interpreter against tmp_path storage and return its stdout.
+
+    For settings that are read once at import, like the backend or shard count.
+    """
+
+    def run(code: str, **env) -> str:
+        result = subprocess.run(
+            [sys.executable, "-c", textwrap.dedent(code)],
+            env={**os.environ, "CAB_STORAGE_DIR": str(tmp_path), "PYTHONPATH": str(SERVER_DIR), **env},
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    return run
@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from models.models import HoldCabRequest
+
+
+@pytest.fixture
+def engine_saves(storage, monkeypatch):
+    engine = storage.get_engine()
+    save = engine.save
+    calls = []
+
+    def counting_save(collection, data, changed=None):
+        calls.append((collection, None if changed is None else sorted(changed)))
+        return save(collection, data, changed)
+
+    monkeypatch.setattr(engine, "save", counting_save)
+    return calls
+
+
+@pytest.fixture
+def scheduled(mock_db, monkeypatch):
+    timers = []
+    monkeypatch.setattr(mock_db, "EXPIRY_LISTENERS", [lambda kind, key, due: timers.append((kind, key))])
+    return timers
+
+
+def _request(cab_id="DEL_IGI_CP_1"):
+    return {"cab_id": cab_id, "pickup": "Delhi Airport", "drop": "Connaught Place", "departure_date": date(2030, 1, 1)}
+
+
+def test_batch_is_written_once_and_unknown_cabs_are_reported_in_place(mock_db, storage, engine_saves, scheduled):
+    holds = mock_db.create_booking_holds_bulk([_request(), _request("NO_SUCH_CAB"), _request(), _request()])
+
+    assert holds[1] is None
+    hold_ids = [hold["hold_id"] for hold in holds if hold]
+    assert len(set(hold_ids)) == 3
+    assert len(engine_saves) == 1
+    assert engine_saves[0][1] == sorted(hold_ids)
+    assert all(storage.load_hold(hold_id)["status"] == "held" for hold_id in hold_ids)
+    assert sorted(key for _, key in scheduled) == sorted(hold_ids)
+
+
+def test_failed_batch_write_creates_nothing(mock_db, storage, scheduled, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    engine = storage.get_engine()
+    save = engine.save
+    monkeypatch.setattr(engine, "save", fail)
+    with pytest.raises(OSError):
+        mock_db.create_booking_holds_bulk([_request(), _request()])
+
+    monkeypatch.setattr(engine, "save", save)
+    assert storage.load_holds() == {}
+    assert scheduled == []
+
+
+def test_bulk_hold_tool_results_follow_request_order(mock_db):
+    from services.helper import hold_cabs_bulk
+
+    results = hold_cabs_bulk([
+        HoldCabRequest(**_request("NO_SUCH_CAB")),
+        HoldCabRequest(**_request()),
+    ])
+
+    assert [(result.index, result.success) for result in results] == [(0, False), (1, True)]
+    assert "NO_SUCH_CAB" in results[0].error
+    assert results[1].hold.hold_id
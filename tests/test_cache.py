@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from services.cache import MISSING, SingleFlight, TTLCache
+from services.rate_limit import RateLimiter
+
+
+def test_ttl_cache_expires_entries_but_keeps_them_for_stale_reads(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.cache.time.time", lambda: now[0])
+    cache = TTLCache("test", maxsize=10, ttl=60, negative_ttl=5)
+    cache.set("delhi", ["Connaught Place"])
+    cache.set("nowhere", [])
+
+    now[0] += 10
+    assert cache.get("delhi") == ["Connaught Place"]
+    assert cache.get("nowhere") is MISSING
+
+    now[0] += 60
+    assert cache.get("delhi") is MISSING
+    assert cache.get("delhi", allow_stale=True) == ["Connaught Place"]
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flights.stats()["coalesced"] == 4
+
+
+def test_single_flight_keeps_call_while_someone_waits():
+    flights = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def run():
+        leaving = asyncio.ensure_future(flights.do("key", fetch))
+        staying = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(run()) == "result"
+    assert flights.stats()["abandoned"] == 0
+
+
+def test_single_flight_cancels_call_when_every_caller_leaves():
+    flights = SingleFlight("test")
+
+    async def run():
+        upstream_cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flights.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+
+        # A later caller starts a fresh call instead of joining the cancelled one
+        async def fetch_again():
+            return "fresh"
+
+        return await flights.do("key", fetch_again)
+
+    assert asyncio.run(run()) == "fresh"
+    assert flights.stats()["abandoned"] == 1
+
+
+def test_abandoned_call_gives_back_its_rate_limit_slot():
+    limiter = RateLimiter("test", 5.0, {"details": 5.0}, {"details": 0}, {"details": 0})
+    flights = SingleFlight("test")
+
+    async def fetch():
+        await limiter.acquire("details")
+        return "result"
+
+    async def run():
+        while limiter.shared.delay() == 0:
+            limiter.shared.take()
+        waiter = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0.01)
+        assert limiter.usage()["queued"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert limiter.usage()["queued"] == 0
+    assert limiter.used_today["details"] == 0
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from models.models import LocationOption, ResolvedLocation
+
+PLACE_IDS = ["place-a", "place-b", "place-c"]
+
+
+def _options():
+    return [
+        LocationOption(place_id=place_id, formatted_address=place_id, name=place_id, lat=28.6, lng=77.2)
+        for place_id in PLACE_IDS
+    ]
+
+
+class Context:
+    def __init__(self, answer):
+        self.answer = answer
+
+    async def info(self, message):
+        pass
+
+    async def elicit(self, message, response_type):
+        # The user takes a moment to choose; the prefetches start meanwhile
+        await asyncio.sleep(0.02)
+        if isinstance(self.answer, BaseException):
+            raise self.answer
+        return type("Response", (), {"data": self.answer})()
+
+
+@pytest.fixture
+def details(storage, monkeypatch):
+    """Stubbed place-details lookups; records calls and which ones were cancelled."""
+    import server
+
+    calls = []
+    cancelled = []
+
+    async def resolve(place_id):
+        calls.append(place_id)
+        try:
+            if place_id != "place-b":
+                await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(place_id)
+            raise
+        return ResolvedLocation(
+            original_query="", place_id=place_id, formatted_address=place_id, name=place_id, lat=28.6, lng=77.2
+        )
+
+    monkeypatch.setattr(server, "resolve_location_by_place_id", resolve)
+    return server, calls, cancelled
+
+
+def _disambiguate(server, context, cancelled):
+    """Run the disambiguation; returns its result (or error) and the prefetches cancelled by it.
+
+    Cancellations are read before asyncio.run() tears the loop down, since
+    that would cancel any prefetch left running as well.
+    """
+
+    async def main():
+        try:
+            result = await server.get_location_with_disambiguation(context, "market", "pickup", (_options(), None))
+        except Exception as e:
+            result = e
+        # Let the cancelled prefetches unwind
+        await asyncio.sleep(0.01)
+        return result, sorted(cancelled)
+
+    return asyncio.run(main())
+
+
+def test_selected_place_reuses_its_prefetch_and_the_rest_are_cancelled(details):
+    server, calls, cancelled = details
+
+    (location, error), cancelled_by_it = _disambiguate(server, Context("place-b"), cancelled)
+
+    assert (location.place_id, error) == ("place-b", None)
+    assert sorted(calls) == PLACE_IDS
+    assert cancelled_by_it == ["place-a", "place-c"]
+
+
+def test_declined_elicitation_cancels_every_prefetch(details):
+    server, calls, cancelled = details
+
+    (location, error), cancelled_by_it = _disambiguate(server, Context(None), cancelled)
+
+    assert location is None and error
+    assert sorted(calls) == PLACE_IDS
+    assert cancelled_by_it == ["place-a", "place-c"]
+
+
+def test_failed_elicitation_cancels_every_prefetch(details):
+    server, calls, cancelled = details
+
+    error, cancelled_by_it = _disambiguate(server, Context(RuntimeError("client went away")), cancelled)
+
+    assert isinstance(error, RuntimeError)
+    assert cancelled_by_it == ["place-a", "place-c"]
+
+
+def test_prefetches_are_capped(details, monkeypatch):
+    server, calls, cancelled = details
+    monkeypatch.setattr(server, "PLACE_PREFETCH_LIMIT", 1)
+
+    (location, _), cancelled_by_it = _disambiguate(server, Context("place-b"), cancelled)
+
+    # Only the first option was prefetched; the selection is looked up on demand
+    assert calls == ["place-a", "place-b"]
+    assert cancelled_by_it == ["place-a"]
+    assert location.place_id == "place-b"
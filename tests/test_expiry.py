@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from services.expiry import ExpiryScheduler
+
+
+def _run_until(scheduler, condition, timeout=2.0):
+    async def main():
+        task = asyncio.create_task(scheduler.run())
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition() and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(main())
+
+
+def test_timers_fire_in_due_order_and_rescheduling_replaces_them():
+    fired = []
+    scheduler = ExpiryScheduler({"hold": lambda key, now: fired.append(key)})
+    now = datetime.now()
+    scheduler.schedule("hold", "HOLD_2", now + timedelta(milliseconds=60))
+    scheduler.schedule("hold", "HOLD_1", now + timedelta(milliseconds=30))
+    scheduler.schedule("hold", "HOLD_3", now + timedelta(milliseconds=10))
+    # Pushed back past the others: its earlier heap entry must be skipped
+    scheduler.schedule("hold", "HOLD_3", now + timedelta(milliseconds=90))
+    assert len(scheduler) == 3
+
+    _run_until(scheduler, lambda: len(fired) == 3)
+
+    assert fired == ["HOLD_1", "HOLD_2", "HOLD_3"]
+    assert scheduler.stats()["scheduled"] == 0
+
+
+def test_timer_scheduled_from_another_thread_wakes_the_loop():
+    fired = []
+    scheduler = ExpiryScheduler({"payment": lambda key, now: fired.append(key)})
+    scheduler.schedule("payment", "PAY_1", datetime.now() + timedelta(hours=1))
+
+    def schedule_soon():
+        scheduler.schedule("payment", "PAY_2", datetime.now() + timedelta(milliseconds=20))
+
+    threading.Timer(0.05, schedule_soon).start()
+    _run_until(scheduler, lambda: fired)
+
+    assert fired == ["PAY_2"]
+
+
+def test_failing_handler_is_counted_and_the_loop_goes_on():
+    fired = []
+
+    def handler(key, now):
+        if key == "HOLD_1":
+            raise ValueError("boom")
+        fired.append(key)
+
+    scheduler = ExpiryScheduler({"hold": handler})
+    now = datetime.now()
+    scheduler.schedule("hold", "HOLD_1", now)
+    scheduler.schedule("hold", "HOLD_2", now + timedelta(milliseconds=20))
+
+    _run_until(scheduler, lambda: fired)
+
+    assert fired == ["HOLD_2"]
+    assert (scheduler.fired, scheduler.failed) == (2, 1)
+
+
+@pytest.fixture
+def timers(mock_db, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(mock_db, "EXPIRY_LISTENERS", [lambda kind, key, due: scheduled.append((kind, key, due))])
+    return scheduled
+
+
+def _hold(mock_db):
+    return mock_db.create_booking_hold("DEL_IGI_CP_1", "Delhi Airport", "Connaught Place", date(2030, 1, 1))
+
+
+def test_hold_expires_once_due_and_is_purged_after_the_grace_period(mock_db, storage, timers):
+    hold = _hold(mock_db)
+    hold_id = hold["hold_id"]
+    mock_db.add_passenger_to_hold(hold_id, {"passenger_name": "Asha Rao", "passenger_phone": "9876543210"})
+    assert ("hold", hold_id, hold["expires_at"]) in timers
+
+    assert not mock_db.expire_hold(hold_id, hold["expires_at"] - timedelta(seconds=1))
+    assert mock_db.expire_hold(hold_id, hold["expires_at"])
+    assert storage.load_hold(hold_id)["status"] == "expired"
+    purge_at = hold["expires_at"] + mock_db.HOLD_PURGE_GRACE
+    assert timers[-1] == ("purge", hold_id, purge_at)
+
+    assert not mock_db.purge_hold(hold_id, purge_at - timedelta(seconds=1))
+    assert mock_db.purge_hold(hold_id, purge_at)
+    assert storage.load_hold(hold_id) is None
+    assert hold_id not in storage.load_passengers()
+
+
+def test_hold_with_a_pending_payment_waits_for_the_session(mock_db, storage, timers):
+    hold_id = _hold(mock_db)["hold_id"]
+    mock_db.add_passenger_to_hold(hold_id, {"passenger_name": "Asha Rao", "passenger_phone": "9876543210"})
+    session = mock_db.create_payment_session(hold_id, 450)
+    hold = storage.load_hold(hold_id)
+
+    assert not mock_db.expire_hold(hold_id, hold["expires_at"])
+    assert timers[-1] == ("hold", hold_id, session["expires_at"])
+
+    assert mock_db.expire_payment_session(session["session_id"], session["expires_at"])
+    assert storage.load_hold(hold_id)["status"] == "passenger_added"
+    assert mock_db.expire_hold(hold_id, session["expires_at"])
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from services import fares, helper, mock_db
+
+SHILLONG = (25.5788, 91.8933)
+CHERRAPUNJI = (25.2702, 91.7323)
+
+
+def test_every_cab_type_is_priced_and_rounded():
+    quotes = fares.quote_fares(SHILLONG, CHERRAPUNJI)
+    assert [quote["cab_type"] for quote in quotes] == [row["cab_type"] for row in fares.FARE_TABLE]
+    assert all(quote["price"] % fares.FARE_ROUNDING == 0 for quote in quotes)
+    prices = {quote["cab_type"]: quote["price"] for quote in quotes}
+    assert prices["mini"] < prices["sedan"] < prices["suv"]
+
+
+def test_short_trip_is_charged_the_minimum_fare():
+    quotes = fares.quote_fares(SHILLONG, SHILLONG)
+    assert [quote["price"] for quote in quotes] == [row["min_fare"] for row in fares.FARE_TABLE]
+
+
+def test_repeated_searches_get_distinct_quote_ids():
+    first = fares.quote_fares(SHILLONG, CHERRAPUNJI)
+    second = fares.quote_fares(SHILLONG, CHERRAPUNJI)
+    assert all(fares.is_quote_cab_id(quote["cab_id"]) for quote in first)
+    assert {quote["cab_id"] for quote in first}.isdisjoint(quote["cab_id"] for quote in second)
+
+
+def test_quoted_cab_can_be_held(storage):
+    response = helper.get_available_cabs("Police Bazar", "Nohkalikai Falls", SHILLONG, CHERRAPUNJI)
+    cab = response.cabs[0]
+
+    hold = helper.hold_cab(cab.cab_id, "Police Bazar", "Nohkalikai Falls", date(2030, 1, 1))
+    assert (hold.cab_id, hold.price) == (cab.cab_id, cab.price)
+
+
+def test_unknown_quote_is_rejected_with_search_again_error(storage, monkeypatch):
+    response = helper.get_available_cabs("Police Bazar", "Nohkalikai Falls", SHILLONG, CHERRAPUNJI)
+    # As after a restart: quotes only live in memory
+    monkeypatch.setattr(mock_db, "QUOTED_CABS", type(mock_db.QUOTED_CABS)())
+
+    with pytest.raises(ValueError, match="search again"):
+        helper.hold_cab(response.cabs[0].cab_id, "Police Bazar", "Nohkalikai Falls", date(2030, 1, 1))
+    with pytest.raises(ValueError, match="Invalid cab_id"):
+        helper.hold_cab("NOPE_1", "Police Bazar", "Nohkalikai Falls", date(2030, 1, 1))
+
+
+def test_quote_registry_keeps_the_newest(monkeypatch):
+    monkeypatch.setattr(mock_db, "QUOTED_CABS", type(mock_db.QUOTED_CABS)())
+    monkeypatch.setattr(mock_db, "QUOTED_CABS_MAX", len(fares.FARE_TABLE))
+    old = fares.quote_fares(SHILLONG, CHERRAPUNJI)
+    new = fares.quote_fares(CHERRAPUNJI, SHILLONG)
+    mock_db.register_quoted_cabs(old, "a", "b")
+    mock_db.register_quoted_cabs(new, "b", "a")
+
+    assert mock_db.get_cab_by_id(old[0]["cab_id"]) is None
+    assert mock_db.get_cab_by_id(new[0]["cab_id"])["route"] == "b → a"
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+from services import gazetteer
+
+
+@pytest.fixture
+def extra_places(tmp_path):
+    path = tmp_path / "places.json"
+    yield path
+    gazetteer.load_gazetteer()
+
+
+def test_exact_alias_matches_one_place_regardless_of_case_and_punctuation():
+    matches = gazetteer.match_places("  IGI Terminal-3 ")
+
+    assert [place["name"] for place in matches] == ["IGI Airport"]
+    assert gazetteer.get_place(matches[0]["place_id"]) is matches[0]
+
+
+def test_only_exact_names_are_found_outright():
+    assert gazetteer.find_place("Connaught Place")["name"] == "Connaught Place"
+    assert gazetteer.find_place("Park") is None
+    assert [place["name"] for place in gazetteer.match_places("Park")] == ["Park Street"]
+
+
+def test_prefix_matches_several_places_but_short_prefixes_none():
+    matches = gazetteer.match_places("kolkata")
+    assert len(matches) == 1
+
+    assert len(gazetteer.match_places("kolk")) > 1
+    assert gazetteer.match_places("kol") == []
+
+
+def test_disabled_gazetteer_matches_nothing(monkeypatch):
+    monkeypatch.setattr(gazetteer, "GAZETTEER_ENABLED", False)
+
+    assert gazetteer.match_places("igi") == []
+    assert gazetteer.lookup_place("igi")["name"] == "IGI Airport"
+
+
+def test_extra_places_file_is_added(extra_places):
+    extra_places.write_text(json.dumps([
+        {"name": "Pune Airport", "lat": 18.58, "lng": 73.92, "formatted_address": "Pune Airport, Pune", "aliases": ["pnq"]}
+    ]))
+    gazetteer.load_gazetteer(str(extra_places))
+
+    assert gazetteer.match_places("PNQ")[0]["place_id"] == "local:pune_airport"
+    assert gazetteer.match_places("igi")
+
+
+def test_unreadable_places_file_keeps_built_in_places(extra_places):
+    extra_places.write_text("[{not json")
+    gazetteer.load_gazetteer(str(extra_places))
+
+    assert gazetteer.match_places("igi")
+
+
+def test_known_place_resolves_without_calling_google(storage, monkeypatch):
+    import server
+
+    async def geocode(query):
+        raise AssertionError("Google Places was called")
+
+    monkeypatch.setattr(server, "geocode_location", geocode)
+    results, resolved = asyncio.run(server.prefetch_location("Connaught Place"))
+
+    assert [option.name for option in results] == ["Connaught Place"]
+    assert (resolved.name, resolved.original_query) == ("Connaught Place", "Connaught Place")
+
+
+class ElicitingContext:
+    def __init__(self, answer):
+        self.answer = answer
+        self.elicited = []
+
+    async def info(self, message):
+        pass
+
+    async def elicit(self, message, response_type):
+        self.elicited.append(response_type)
+        return type("Response", (), {"data": self.answer})()
+
+
+@pytest.fixture
+def google(storage, monkeypatch):
+    """Google Places stand-in; set results[0] to the autocomplete answer, or an exception."""
+    import server
+
+    results = [[]]
+    calls = []
+
+    async def geocode(query):
+        calls.append(query)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        return results[0]
+
+    monkeypatch.setattr(server, "geocode_location", geocode)
+    return server, results, calls
+
+
+@pytest.mark.parametrize("query, guess", [("Park", "Park Street"), ("Noida Sector 6", "Noida Sector 62")])
+def test_partial_match_is_offered_not_resolved(google, query, guess):
+    server, results, calls = google
+    options, resolved = asyncio.run(server.prefetch_location(query))
+
+    assert calls == [query]
+    assert [option.name for option in options] == [guess]
+    assert resolved is None
+
+    declined = ElicitingContext(None)
+    location, error = asyncio.run(server.get_location_with_disambiguation(declined, query, "pickup", (options, None)))
+    assert location is None and error
+    assert len(declined.elicited) == 1
+
+    confirmed = ElicitingContext(options[0].place_id)
+    location, error = asyncio.run(server.get_location_with_disambiguation(confirmed, query, "pickup", (options, None)))
+    assert location.name == guess
+
+
+def test_partial_match_is_offered_when_google_is_not_configured(google):
+    server, results, calls = google
+    results[0] = ValueError("GOOGLE_PLACES_API_KEY not configured")
+    context = ElicitingContext(None)
+
+    location, error = asyncio.run(server.get_location_with_disambiguation(context, "Howrah", "drop"))
+
+    assert location is None
+    assert len(context.elicited) == 1
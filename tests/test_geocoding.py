@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from models.models import ResolvedLocation
+from services import geocoding
+from services.rate_limit import RateLimiter
+from services.resilience import CircuitBreaker
+
+
+def _details(place_id="place-1"):
+    return {
+        "status": "OK",
+        "result": {
+            "place_id": place_id,
+            "formatted_address": "Connaught Place, New Delhi",
+            "name": "Connaught Place",
+            "geometry": {"location": {"lat": 28.6315, "lng": 77.2167}},
+        },
+    }
+
+
+@pytest.fixture
+def places(monkeypatch):
+    """Serve Places API calls from a queue of canned JSON bodies; returns the request log."""
+    responses = []
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=responses.pop(0) if len(responses) > 1 else responses[0])
+
+    monkeypatch.setattr(geocoding, "GOOGLE_PLACES_API_KEY", "test-key")
+    monkeypatch.setattr(geocoding, "OVER_QUERY_LIMIT_PAUSE", 0.05)
+    monkeypatch.setattr(geocoding, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    # The limiter's condition is bound to the event loop it first ran on
+    limiter = geocoding.PLACES_RATE_LIMITER
+    monkeypatch.setattr(geocoding, "PLACES_RATE_LIMITER", RateLimiter(
+        "places", limiter.shared.rate, {name: bucket.rate for name, bucket in limiter.buckets.items()},
+        limiter.daily_budgets, limiter.priorities,
+    ))
+    monkeypatch.setattr(geocoding.DETAILS_ENDPOINT, "breaker", CircuitBreaker())
+    monkeypatch.setattr(geocoding.DETAILS_ENDPOINT, "backoff", 0.01)
+    geocoding.DETAILS_CACHE.clear()
+    yield responses, requests
+    geocoding.DETAILS_CACHE.clear()
+
+
+def test_over_query_limit_is_retried_after_the_pause(places):
+    responses, requests = places
+    responses.extend([{"status": "OVER_QUERY_LIMIT"}, _details()])
+
+    started = time.monotonic()
+    location = asyncio.run(geocoding.resolve_location_by_place_id("place-1"))
+
+    assert location.name == "Connaught Place"
+    assert len(requests) == 2
+    assert time.monotonic() - started >= 0.04
+    # The throttled response was not cached as a miss
+    assert geocoding.DETAILS_CACHE.get("place-1") is location
+
+
+def test_over_query_limit_falls_back_to_stale_cache(places):
+    responses, requests = places
+    responses.append({"status": "OVER_QUERY_LIMIT"})
+    stale = ResolvedLocation(
+        original_query="", place_id="place-1", formatted_address="Old address", name="Old", lat=1.0, lng=2.0
+    )
+    geocoding.DETAILS_CACHE.set("place-1", stale)
+    geocoding.DETAILS_CACHE._entries["place-1"] = (time.time() - 1, stale)
+
+    location = asyncio.run(geocoding.resolve_location_by_place_id("place-1"))
+
+    assert location == stale
+    assert len(requests) == geocoding.DETAILS_ENDPOINT.retries + 1
+
+
+def test_http_client_is_shared_and_recreated_after_close(monkeypatch):
+    monkeypatch.setattr(geocoding, "_http_client", None)
+
+    client = geocoding.get_http_client()
+    assert geocoding.get_http_client() is client
+
+    asyncio.run(geocoding.close_http_client())
+    assert client.is_closed
+
+    reopened = geocoding.get_http_client()
+    assert reopened is not client and not reopened.is_closed
+    asyncio.run(geocoding.close_http_client())
+
+
+def test_lookups_reuse_the_shared_client(places):
+    responses, requests = places
+    responses.extend([_details("place-1"), _details("place-2")])
+    client = geocoding._http_client
+
+    async def resolve_both():
+        return await asyncio.gather(
+            geocoding.resolve_location_by_place_id("place-1"),
+            geocoding.resolve_location_by_place_id("place-2"),
+        )
+
+    asyncio.run(resolve_both())
+
+    assert len(requests) == 2
+    assert geocoding._http_client is client and not client.is_closed
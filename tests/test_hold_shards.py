@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+CREATE_HOLDS = """
+    import json
+    from datetime import date
+    from services import mock_db
+    holds = [
+        mock_db.create_booking_hold("DEL_IGI_CP_1", "IGI Airport", "Connaught Place", date(2030, 1, 1))
+        for _ in range(8)
+    ]
+    print(json.dumps([hold["hold_id"] for hold in holds]))
+"""
+
+READ_HOLDS = """
+    import json
+    from services import storage, mock_db
+    print(json.dumps({
+        "all": sorted(storage.load_holds()),
+        "found": sorted(hold_id for hold_id in storage.load_holds() if storage.load_hold(hold_id)),
+        "per_shard": [len(storage._load(collection)) for collection in storage.HOLD_COLLECTIONS],
+        "stored_shards": sorted(storage.get_engine().stored_hold_shards()),
+    }))
+"""
+
+
+def test_holds_are_routed_to_shards_by_id(storage):
+    assert storage.hold_shard("HOLD_1001") == 1001 % storage.HOLD_SHARDS
+    assert storage.hold_collection("HOLD_1001") in storage.HOLD_COLLECTIONS
+
+
+@pytest.mark.parametrize("backend", ["json", "log", "sqlite"])
+@pytest.mark.parametrize("before, after", [(4, 2), (4, 1), (1, 3), (2, 5)])
+def test_changing_shard_count_keeps_every_hold(run_python, backend, before, after):
+    created = json.loads(run_python(CREATE_HOLDS, CAB_STORAGE_BACKEND=backend, CAB_HOLD_SHARDS=str(before)))
+
+    result = json.loads(run_python(READ_HOLDS, CAB_STORAGE_BACKEND=backend, CAB_HOLD_SHARDS=str(after)))
+
+    assert result["all"] == sorted(created)
+    assert result["found"] == sorted(created)
+    assert sum(result["per_shard"]) == len(created)
+
+
+def test_holds_survive_sharding_down_and_back_up(run_python):
+    created = json.loads(run_python(CREATE_HOLDS, CAB_HOLD_SHARDS="4"))
+    for shards in ("3", "1", "2"):
+        created += json.loads(run_python(CREATE_HOLDS, CAB_HOLD_SHARDS=shards))
+
+    result = json.loads(run_python(READ_HOLDS, CAB_HOLD_SHARDS="2"))
+    assert len(set(created)) == len(created)
+    assert result["all"] == sorted(created)
@@ -0,0 +1,90 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def fail_saves(storage, monkeypatch):
+    """Call to make every storage write from then on fail."""
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    return lambda: monkeypatch.setattr(storage.get_engine(), "save", fail)
+
+
+def _hold(mock_db):
+    return mock_db.create_booking_hold("DEL_IGI_CP_1", "Delhi Airport", "Connaught Place", date(2030, 1, 1))
+
+
+def _passenger():
+    return {"passenger_name": "Asha Rao", "passenger_phone": "9876543210"}
+
+
+def test_hold_update_with_stale_version_is_rejected(mock_db):
+    hold = _hold(mock_db)
+    updated = mock_db.compare_and_set_hold(hold["hold_id"], hold["version"], {"status": "passenger_added"})
+    assert updated["version"] == hold["version"] + 1
+
+    with pytest.raises(mock_db.ConcurrentUpdateError):
+        mock_db.compare_and_set_hold(hold["hold_id"], hold["version"], {"status": "expired"})
+    assert mock_db.get_booking_hold(hold["hold_id"])["status"] == "passenger_added"
+
+
+def test_payment_update_with_stale_version_is_rejected(mock_db):
+    hold = _hold(mock_db)
+    mock_db.add_passenger_to_hold(hold["hold_id"], _passenger())
+    session = mock_db.create_payment_session(hold["hold_id"], 450)
+
+    mock_db.update_payment_status(session["session_id"], "completed", "4242")
+    with pytest.raises(mock_db.ConcurrentUpdateError):
+        mock_db.compare_and_set_payment(session["session_id"], session["version"], {"status": "failed"})
+    assert mock_db.get_payment_session(session["session_id"])["status"] == "completed"
+
+
+def test_failed_hold_update_leaves_cached_hold_unchanged(mock_db, fail_saves):
+    hold = _hold(mock_db)
+    fail_saves()
+
+    with pytest.raises(OSError):
+        mock_db.compare_and_set_hold(hold["hold_id"], hold["version"], {"status": "passenger_added"})
+
+    current = mock_db.get_booking_hold(hold["hold_id"])
+    assert (current["status"], current["version"]) == ("held", hold["version"])
+
+
+def test_failed_passenger_save_is_not_served_from_memory(mock_db, fail_saves):
+    hold = _hold(mock_db)
+    fail_saves()
+
+    with pytest.raises(OSError):
+        mock_db.add_passenger_to_hold(hold["hold_id"], _passenger())
+
+    assert mock_db.get_passenger_details(hold["hold_id"]) is None
+    assert not mock_db.has_passenger_details(hold["hold_id"])
+
+
+def test_failed_payment_session_is_not_served_from_memory(mock_db, fail_saves):
+    hold = _hold(mock_db)
+    mock_db.add_passenger_to_hold(hold["hold_id"], _passenger())
+    fail_saves()
+
+    with pytest.raises(OSError):
+        mock_db.create_payment_session(hold["hold_id"], 450)
+
+    assert mock_db.find_payments_for_hold(hold["hold_id"], "pending") == []
+    assert mock_db.get_booking_hold(hold["hold_id"])["status"] == "passenger_added"
+
+
+def test_failed_payment_update_leaves_session_unchanged(mock_db, fail_saves):
+    hold = _hold(mock_db)
+    mock_db.add_passenger_to_hold(hold["hold_id"], _passenger())
+    session = mock_db.create_payment_session(hold["hold_id"], 450)
+    fail_saves()
+
+    with pytest.raises(OSError):
+        mock_db.compare_and_set_payment(session["session_id"], session["version"], {"status": "failed"})
+
+    current = mock_db.get_payment_session(session["session_id"])
+    assert (current["status"], current["version"]) == ("pending", session["version"])
+    assert [s["session_id"] for s in mock_db.find_payments_for_hold(hold["hold_id"], "pending")] == [session["session_id"]]
@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta
+
+
+def _payable_hold(mock_db):
+    hold = mock_db.create_booking_hold("DEL_IGI_CP_1", "Delhi Airport", "Connaught Place", date(2030, 1, 1))
+    mock_db.add_passenger_to_hold(hold["hold_id"], {"passenger_name": "Asha Rao", "passenger_phone": "9876543210"})
+    return hold["hold_id"]
+
+
+def _session_ids(sessions):
+    return [session["session_id"] for session in sessions]
+
+
+def test_sessions_are_found_by_hold_and_status(mock_db):
+    hold_id = _payable_hold(mock_db)
+    other_hold_id = _payable_hold(mock_db)
+    session = mock_db.create_payment_session(hold_id, 450)
+    mock_db.create_payment_session(other_hold_id, 450)
+
+    assert _session_ids(mock_db.find_payments_for_hold(hold_id, "pending")) == [session["session_id"]]
+    assert mock_db.get_payment_by_hold(hold_id) is None
+
+    mock_db.update_payment_status(session["session_id"], "completed", "4242")
+
+    assert mock_db.find_payments_for_hold(hold_id, "pending") == []
+    assert mock_db.get_payment_by_hold(hold_id)["session_id"] == session["session_id"]
+    assert session["session_id"] not in mock_db.PAYMENTS_BY_STATUS["pending"]
+
+
+def test_pending_session_is_reused(mock_db):
+    hold_id = _payable_hold(mock_db)
+    session = mock_db.create_payment_session(hold_id, 450)
+
+    assert mock_db.create_payment_session(hold_id, 450)["session_id"] == session["session_id"]
+
+
+def test_index_picks_up_sessions_written_by_the_other_process(mock_db, storage):
+    hold_id = _payable_hold(mock_db)
+    now = datetime.now()
+    payments = dict(storage.load_payments())
+    payments["PAY_90001"] = {
+        "session_id": "PAY_90001", "hold_id": hold_id, "amount": 450, "status": "completed",
+        "created_at": now, "expires_at": now + timedelta(minutes=30), "completed_at": now,
+        "card_last4": "4242", "version": 2,
+    }
+    # As payment_backend would: straight to the store, behind this process's cache
+    storage.get_engine().save("payments", payments)
+
+    assert mock_db.get_payment_by_hold(hold_id)["session_id"] == "PAY_90001"
+    assert mock_db.generate_payment_session_id() == "PAY_90002"
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from services.rate_limit import QuotaExceededError, RateLimiter, TokenBucket
+
+
+def _limiter(qps=1000.0, budget=0):
+    return RateLimiter(
+        "test",
+        qps=qps,
+        endpoint_qps={"autocomplete": qps, "details": qps},
+        daily_budgets={"autocomplete": budget, "details": budget},
+        priorities={"details": 0, "autocomplete": 1},
+    )
+
+
+def test_token_bucket_delay_after_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.take()
+    bucket.take()
+    assert 0 < bucket.delay() <= 0.1
+
+
+def test_budget_rejects_before_queuing():
+    limiter = _limiter(budget=1)
+
+    async def run():
+        await limiter.acquire("autocomplete")
+        with pytest.raises(QuotaExceededError):
+            await limiter.acquire("autocomplete")
+
+    asyncio.run(run())
+    assert limiter.usage()["endpoints"]["autocomplete"]["rejected"] == 1
+
+
+def _drain(bucket):
+    while bucket.delay() == 0:
+        bucket.take()
+
+
+def test_budget_rechecked_for_queued_requests():
+    limiter = _limiter(qps=50.0, budget=3)
+
+    async def run():
+        # All five get past the budget check and queue behind the empty bucket
+        _drain(limiter.shared)
+        return await asyncio.gather(
+            *(limiter.acquire("autocomplete") for _ in range(5)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert results.count(None) == 3
+    assert sum(isinstance(result, QuotaExceededError) for result in results) == 2
+    assert limiter.used_today["autocomplete"] == 3
+    assert limiter.usage()["queued"] == 0
+
+
+def test_higher_priority_waiters_go_first():
+    limiter = _limiter(qps=20.0)
+    order = []
+
+    async def call(endpoint):
+        await limiter.acquire(endpoint)
+        order.append(endpoint)
+
+    async def run():
+        _drain(limiter.shared)
+        await asyncio.gather(call("autocomplete"), call("autocomplete"), call("details"))
+
+    asyncio.run(run())
+    assert order[0] == "details"
+
+
+def test_pause_delays_requests():
+    limiter = _limiter()
+
+    async def run():
+        limiter.pause(0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await limiter.acquire("details")
+        return loop.time() - started
+
+    assert asyncio.run(run()) >= 0.04
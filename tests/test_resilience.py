@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services.resilience import CircuitBreaker, CircuitOpenError, ResilientEndpoint
+
+
+def _warmed_up(endpoint, latency=0.01):
+    for _ in range(endpoint.MIN_SAMPLES):
+        endpoint.latency.record(latency)
+    return endpoint
+
+
+def test_hedge_returns_first_answer_and_cancels_the_loser():
+    endpoint = _warmed_up(ResilientEndpoint("test", max_timeout=5.0, hedge=True))
+    attempts = []
+    loser_cancelled = []
+
+    async def fetch(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                loser_cancelled.append(True)
+                raise
+        return "hedged"
+
+    async def run():
+        result = await endpoint.call(fetch)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "hedged"
+    assert len(attempts) == 2
+    assert loser_cancelled == [True]
+    assert endpoint.stats()["hedged"] == 1
+
+
+def _open_breaker():
+    """A breaker that opened reset_timeout ago, so the next call may probe."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.opened_at -= breaker.reset_timeout
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_allows_a_single_probe():
+    breaker = _open_breaker()
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = _open_breaker()
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_endpoint_sends_one_probe_upstream():
+    endpoint = ResilientEndpoint("test", max_timeout=5.0, breaker=_open_breaker())
+    upstream = []
+
+    async def fetch(timeout):
+        upstream.append(timeout)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(endpoint.call(fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results.count("ok") == 1
+    assert sum(isinstance(result, CircuitOpenError) for result in results) == 2
+    assert len(upstream) == 1
+    assert endpoint.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_ending_without_an_outcome_frees_the_slot():
+    endpoint = ResilientEndpoint("test", max_timeout=5.0, breaker=_open_breaker())
+
+    async def bad_request(timeout):
+        request = httpx.Request("GET", "https://example.test")
+        raise httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(endpoint.call(bad_request))
+    assert endpoint.breaker.state == CircuitBreaker.HALF_OPEN
+    assert endpoint.breaker.allow()
+
+
+def test_retryable_errors_are_retried_then_raised():
+    endpoint = ResilientEndpoint("test", max_timeout=5.0, retries=2, backoff=0.001)
+    attempts = []
+
+    async def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("refused")
+        return "ok"
+
+    assert asyncio.run(endpoint.call(flaky)) == "ok"
+    assert endpoint.stats()["retried"] == 2
+
+
+def _hung(attempts):
+    async def fetch(timeout):
+        attempts.append(timeout)
+        await asyncio.sleep(timeout)
+        raise httpx.ReadTimeout("timed out")
+
+    return fetch
+
+
+def test_retries_against_a_hung_upstream_share_one_deadline():
+    endpoint = ResilientEndpoint("test", max_timeout=0.5, cold_timeout=0.15, retries=5, backoff=0.001)
+    attempts = []
+
+    started = time.monotonic()
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(endpoint.call(_hung(attempts)))
+
+    assert time.monotonic() - started < 0.7
+    assert attempts[0] == pytest.approx(0.15, abs=0.01)
+    assert sum(attempts) <= 0.5 + 1e-6
+
+
+def test_attempt_that_used_the_full_timeout_is_not_retried():
+    endpoint = _warmed_up(ResilientEndpoint("test", max_timeout=0.2, retries=2), latency=1.0)
+    attempts = []
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(endpoint.call(_hung(attempts)))
+
+    assert attempts == [pytest.approx(0.2, abs=0.01)]
+    assert endpoint.stats()["retried"] == 0
+
+
+def test_upstream_ignoring_its_timeout_is_still_cut_off():
+    endpoint = ResilientEndpoint("test", max_timeout=0.3, cold_timeout=0.1, retries=1, backoff=0.001)
+
+    async def stuck(timeout):
+        await asyncio.sleep(10)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(endpoint.call(stuck))
+    assert time.monotonic() - started < 0.5
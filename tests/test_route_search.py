@@ -0,0 +1,72 @@
+import pytest
+
+from services import helper, mock_db
+
+# Far from every catalog route
+SHILLONG = (25.5788, 91.8933)
+CHERRAPUNJI = (25.2702, 91.7323)
+IGI_AIRPORT = (28.5562, 77.1)
+CONNAUGHT_PLACE = (28.6315, 77.2167)
+
+
+def _ids(response):
+    return [cab.cab_id for cab in response.cabs]
+
+
+def test_exact_route_match():
+    response = helper.get_available_cabs("IGI Airport", "Connaught Place")
+    assert _ids(response) == ["DEL_IGI_CP_1", "DEL_IGI_CP_2", "DEL_IGI_CP_3"]
+
+
+def test_fuzzy_match_ranks_by_shared_keywords():
+    route = helper.find_fuzzy_route("delhi airport terminal 3", "noida")
+    assert route == ("delhi airport", "noida sector 62")
+    assert _ids(helper.get_available_cabs("Delhi Airport Terminal 3", "Noida")) == [
+        cab["cab_id"] for cab in mock_db.MOCK_CAB_DB[route]
+    ]
+
+
+def test_nearby_route_matched_by_coordinates():
+    near_igi = (IGI_AIRPORT[0] + 0.01, IGI_AIRPORT[1])
+    response = helper.get_available_cabs("Terminal 3 arrivals", "Janpath", near_igi, CONNAUGHT_PLACE)
+    assert _ids(response)[0] == "DEL_IGI_CP_1"
+
+
+def test_fuzzy_match_is_tried_before_distance_pricing():
+    route = helper.find_fuzzy_route("delhi airport terminal 3", "noida")
+    # Geocoder coordinates that are off (or far from the catalog) must not skip the name match
+    response = helper.get_available_cabs("Delhi Airport Terminal 3", "Noida", SHILLONG, CHERRAPUNJI)
+    assert _ids(response) == [cab["cab_id"] for cab in mock_db.MOCK_CAB_DB[route]]
+
+
+def test_city_trip_is_served_from_the_catalog_before_distance_pricing():
+    response = helper.get_available_cabs("Banjara Hills Hyderabad", "Gachibowli Hyderabad", SHILLONG, CHERRAPUNJI)
+    assert response.cabs
+    assert not any(cab_id.startswith("FARE_") for cab_id in _ids(response))
+
+
+def test_unmatched_trip_with_coordinates_is_priced_by_distance():
+    response = helper.get_available_cabs("Police Bazar", "Nohkalikai Falls", SHILLONG, CHERRAPUNJI)
+    assert response.cabs
+    assert all(cab_id.startswith("FARE_") for cab_id in _ids(response))
+
+
+def test_unmatched_trip_without_coordinates_gets_default_cabs():
+    response = helper.get_available_cabs("Police Bazar", "Nohkalikai Falls")
+    assert _ids(response) == [cab["cab_id"] for cab in mock_db.DEFAULT_CABS]
+
+
+
+@pytest.mark.parametrize("pickup_coords", [(0.0, 0.0), None])
+def test_unmatched_trip_with_missing_geometry_gets_default_cabs(pickup_coords):
+    # A details response without geometry comes back as (0.0, 0.0)
+    response = helper.get_available_cabs("Police Bazar", "Nohkalikai Falls", pickup_coords, CHERRAPUNJI)
+    assert _ids(response) == [cab["cab_id"] for cab in mock_db.DEFAULT_CABS]
+
+@pytest.mark.parametrize("cab_id", ["DEL_IGI_CP_2", mock_db.DEFAULT_CABS[0]["cab_id"]])
+def test_cab_lookup_by_id(cab_id):
+    cab = mock_db.get_cab_by_id(cab_id)
+    assert cab["cab_id"] == cab_id
+    # Callers get a copy, not the index entry
+    cab["price"] = 0
+    assert mock_db.get_cab_by_id(cab_id)["price"] != 0
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from models.models import BatchSearchRequest, IndividualCabResponse, ResolvedLocation, SearchResponse
+
+
+class FakeContext:
+    def __init__(self):
+        self.messages = []
+
+    async def info(self, message):
+        self.messages.append(message)
+
+
+def _place(name):
+    return ResolvedLocation(original_query=name, place_id=name, formatted_address=name, name=name, lat=12.9, lng=77.6)
+
+
+# Different names for one place
+ALIASES = {"IGI": "Airport"}
+
+
+@pytest.fixture
+def calls():
+    return {"prefetch": [], "resolve": [], "price": []}
+
+
+@pytest.fixture
+def server(storage, monkeypatch, calls):
+    import server
+
+    async def prefetch(query):
+        calls["prefetch"].append(query)
+        if query == "Broken":
+            raise RuntimeError("places API returned garbage")
+        return ()
+
+    async def resolve(ctx, query, location_type, prefetched=None):
+        calls["resolve"].append(query)
+        return _place(ALIASES.get(query.strip(), query)), None
+
+    def cabs(pickup, drop, **coords):
+        calls["price"].append((pickup, drop))
+        if pickup == "unpriced":
+            raise KeyError("no fare table")
+        return SearchResponse(cabs=[IndividualCabResponse(cab_id="CAB_1", cab_type="sedan", price=500)])
+
+    monkeypatch.setattr(server, "prefetch_location", prefetch)
+    monkeypatch.setattr(server, "get_location_with_disambiguation", resolve)
+    monkeypatch.setattr(server, "get_available_cabs", cabs)
+    return server
+
+
+def _search(server, pairs):
+    routes = [
+        {"pickup": pickup, "drop": drop, "trip_type": "one way", "departure_date": date.today()}
+        for pickup, drop in pairs
+    ]
+    return asyncio.run(server.search_cabs_batch(FakeContext(), BatchSearchRequest(routes=routes)))
+
+
+def test_each_place_is_resolved_and_each_route_priced_once(server, calls):
+    responses = _search(server, [
+        ("Airport", "Station"),
+        ("airport", "STATION"),
+        ("  Airport ", "Station"),
+        ("Station", "Airport"),
+        ("IGI", "Station"),
+    ])
+
+    assert len(responses) == 5 and all(response.cabs for response in responses)
+    # Case and spacing variants are one lookup; IGI is a separate query for the same place
+    assert sorted(calls["prefetch"]) == ["Airport", "IGI", "Station"]
+    assert sorted(calls["resolve"]) == ["Airport", "IGI", "Station"]
+    assert sorted(calls["price"]) == [("airport", "station"), ("station", "airport")]
+
+
+def test_one_failing_route_does_not_fail_the_batch(server):
+    responses = _search(server, [("Airport", "Station"), ("Airport", "Broken"), ("Unpriced", "Station")])
+
+    assert [len(response.cabs) for response in responses] == [1, 0, 0]
+    assert responses[0].error is None
+    assert "places API returned garbage" in responses[1].error
+    assert "no fare table" in responses[2].error
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from models.models import LocationOption, ResolvedLocation, SearchRequest
+
+
+class FakeContext:
+    def __init__(self):
+        self.messages = []
+
+    async def info(self, message):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def places(storage, monkeypatch):
+    """Places lookups that take a while; returns the peak number running at once."""
+    import server
+
+    running = []
+    peak = [0]
+
+    async def geocode(query):
+        running.append(query)
+        peak[0] = max(peak[0], len(running))
+        await asyncio.sleep(0.05)
+        running.remove(query)
+        return [LocationOption(place_id=query, formatted_address=query, name=query, lat=28.6, lng=77.2)]
+
+    async def details(place_id):
+        return ResolvedLocation(
+            original_query=place_id, place_id=place_id, formatted_address=place_id, name=place_id, lat=28.6, lng=77.2
+        )
+
+    monkeypatch.setattr(server, "geocode_location", geocode)
+    monkeypatch.setattr(server, "resolve_location_by_place_id", details)
+    return server, peak
+
+
+def test_pickup_and_drop_are_looked_up_concurrently(places):
+    server, peak = places
+    request = SearchRequest(pickup="Xyzzy Lane", drop="Plugh Road", trip_type="one way", departure_date=date.today())
+
+    response = asyncio.run(server.search_cabs(FakeContext(), request))
+
+    assert peak[0] == 2
+    assert response.cabs
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from services.spatial import GeohashIndex, geohash_encode, haversine_km
+
+
+def test_geohash_encode_matches_the_reference_encoding():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash_encode(28.6315, 77.2167, 5) == geohash_encode(28.6315, 77.2167, 9)[:5]
+
+
+def test_haversine_distance():
+    assert haversine_km(28.6, 77.2, 28.6, 77.2) == 0
+    # Connaught Place to Mumbai CST is about 1150 km as the crow flies
+    assert haversine_km(28.6315, 77.2167, 18.9398, 72.8355) == pytest.approx(1150, rel=0.02)
+
+
+@pytest.mark.parametrize("centre, radius_km", [
+    ((28.6315, 77.2167), 5),
+    ((28.6315, 77.2167), 40),
+    # Queries on a cell edge and across the antimeridian still see every neighbour
+    ((0.0, 0.0), 10),
+    ((-16.5, 179.99), 20),
+])
+def test_radius_query_matches_a_brute_force_scan(centre, radius_km):
+    rng = random.Random(7)
+    lat, lng = centre
+    points = [
+        (lat + rng.uniform(-0.6, 0.6), (lng + rng.uniform(-0.6, 0.6) + 180) % 360 - 180, number)
+        for number in range(2000)
+    ]
+    index = GeohashIndex()
+    index.build(points)
+
+    found = index.within(lat, lng, radius_km)
+
+    expected = sorted(
+        (haversine_km(lat, lng, point_lat, point_lng), item)
+        for point_lat, point_lng, item in points
+        if haversine_km(lat, lng, point_lat, point_lng) <= radius_km
+    )
+    assert expected
+    assert sorted(item for _, item in found) == sorted(item for _, item in expected)
+    assert [distance for distance, _ in found] == sorted(distance for distance, _ in found)
+
+
+def test_empty_index_finds_nothing():
+    assert GeohashIndex().within(28.6, 77.2, 10) == []
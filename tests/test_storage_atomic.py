@@ -0,0 +1,65 @@
+import os
+import threading
+
+import pytest
+
+
+def test_failed_replace_keeps_the_old_file_and_no_temp_file(storage, tmp_path, monkeypatch):
+    path = tmp_path / "booking_holds.json"
+    storage.atomic_write(str(path), b'{"old": 1}')
+
+    def crash(*args):
+        raise OSError("power cut")
+
+    monkeypatch.setattr(storage.os, "replace", crash)
+    with pytest.raises(OSError):
+        storage.atomic_write(str(path), b'{"new": 2}')
+
+    assert path.read_bytes() == b'{"old": 1}'
+    assert os.listdir(tmp_path) == ["booking_holds.json"]
+
+
+def test_write_is_fsynced_before_and_after_the_rename(storage, tmp_path, monkeypatch):
+    events = []
+    fsync, replace = os.fsync, os.replace
+    monkeypatch.setattr(storage, "STORAGE_FSYNC", True)
+    monkeypatch.setattr(storage.os, "fsync", lambda fd: (events.append("fsync"), fsync(fd)))
+    monkeypatch.setattr(storage.os, "replace", lambda *args: (events.append("replace"), replace(*args)))
+
+    storage.atomic_write(str(tmp_path / "payment_sessions.json"), b"{}")
+
+    # File contents first, then the directory entry
+    assert events == ["fsync", "replace", "fsync"]
+
+
+def test_group_committer_batches_concurrent_submits_and_reports_errors(storage):
+    batches = []
+
+    def commit(collection, batch):
+        numbers = {request.data["number"] for request in batch}
+        batches.append(numbers)
+        if 7 in numbers:
+            raise OSError("disk full")
+
+    committer = storage.GroupCommitter(commit, window=0.02)
+    start = threading.Barrier(20)
+    errors = set()
+
+    def save(number):
+        start.wait()
+        try:
+            committer.submit("holds", {"number": number})
+        except OSError:
+            errors.add(number)
+
+    threads = [threading.Thread(target=save, args=(number,)) for number in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(number for batch in batches for number in batch) == list(range(20))
+    assert len(batches) < 20
+    # Exactly the saves that shared a batch with the failing write get its error
+    assert errors == next(batch for batch in batches if 7 in batch)
+    assert committer.stats() == {"requests": 20, "commits": len(batches)}
@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.fixture
+def counted_loads(storage, monkeypatch):
+    engine = storage.get_engine()
+    load = engine.load
+    calls = []
+
+    def counting_load(collection):
+        calls.append(collection)
+        return load(collection)
+
+    monkeypatch.setattr(engine, "load", counting_load)
+    return calls
+
+
+def _write_behind_the_cache(storage, payments):
+    # As if the other process had written the store
+    storage.get_engine().save('payments', payments)
+
+
+def test_loads_are_served_from_the_cache_until_the_store_changes(storage, counted_loads):
+    storage.save_payments({"PAY_1": {"session_id": "PAY_1"}})
+    assert storage.load_payments() is storage.load_payments()
+    assert counted_loads == []
+
+    _write_behind_the_cache(storage, {"PAY_2": {"session_id": "PAY_2"}})
+    assert list(storage.load_payments()) == ["PAY_2"]
+    assert counted_loads == ["payments"]
+
+
+def test_point_lookup_after_a_change_refreshes_the_cache(storage, counted_loads):
+    storage.save_payments({"PAY_1": {"session_id": "PAY_1"}})
+    _write_behind_the_cache(storage, {"PAY_1": {"session_id": "PAY_1"}, "PAY_2": {"session_id": "PAY_2"}})
+
+    assert storage.load_payment("PAY_2") == {"session_id": "PAY_2"}
+    assert storage.load_payment("PAY_1") == {"session_id": "PAY_1"}
+    assert storage.load_payment("PAY_3") is None
+    assert counted_loads == ["payments"]
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+
+def test_storage_calls_run_off_the_event_loop_in_submission_order(storage):
+    order = []
+
+    def blocking(number):
+        time.sleep(0.02)
+        order.append((number, threading.current_thread().name))
+        return number
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        results = await asyncio.gather(*(storage.run_storage_io(blocking, number) for number in range(5)))
+        ticker.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+
+    assert results == list(range(5))
+    assert [number for number, _ in order] == list(range(5))
+    assert all(name.startswith("storage-io") for _, name in order)
+    # The loop kept running while the calls blocked
+    assert ticks >= 5
+
+
+def test_errors_are_raised_in_the_awaiting_handler(storage):
+    def failing():
+        raise ValueError("Hold not found")
+
+    async def main():
+        try:
+            await storage.run_storage_io(failing)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(main()) == "Hold not found"
+
+
+def test_shutdown_waits_for_queued_work_and_a_later_call_restarts(storage):
+    done = []
+
+    async def submit():
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(storage._get_io_executor(), lambda: (time.sleep(0.05), done.append(1)))
+
+    asyncio.run(submit())
+    storage.shutdown_storage_io()
+    assert done == [1]
+
+    assert asyncio.run(storage.run_storage_io(lambda: "again")) == "again"
+    storage.shutdown_storage_io()
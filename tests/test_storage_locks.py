@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def _locked_insert(storage, key):
+    with storage.locked('payments'):
+        data = storage.load_payments()
+        data[key] = {"session_id": key, "status": "pending"}
+        storage.save_payments(data, changed=[key])
+
+
+def test_concurrent_locked_saves_share_commits(storage, monkeypatch):
+    monkeypatch.setattr(storage._committer, "window", 0.02)
+    before = storage.get_commit_stats()
+    start = threading.Barrier(40)
+
+    def worker(number):
+        start.wait()
+        _locked_insert(storage, f"PAY_{number}")
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        list(pool.map(worker, range(40)))
+    elapsed = time.monotonic() - started
+
+    stats = storage.get_commit_stats()
+    assert stats["requests"] - before["requests"] == 40
+    assert stats["commits"] - before["commits"] <= 10
+    # The window is slept once per batch, not once per save behind the lock
+    assert elapsed < 40 * 0.02
+    storage.invalidate_cache()
+    assert len(storage.load_payments()) == 40
+
+
+def test_queued_save_is_visible_inside_the_lock(storage):
+    with storage.locked('payments'):
+        data = storage.load_payments()
+        data["PAY_1"] = {"session_id": "PAY_1", "status": "pending"}
+        storage.save_payments(data, changed=["PAY_1"])
+        assert storage.load_payment("PAY_1")["status"] == "pending"
+    storage.invalidate_cache()
+    assert storage.load_payment("PAY_1")["status"] == "pending"
+
+
+def test_commit_error_raised_when_lock_is_left(storage, monkeypatch):
+    engine = storage.get_engine()
+
+    def failing_save(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(engine, "save", failing_save)
+    with pytest.raises(OSError, match="disk full"):
+        _locked_insert(storage, "PAY_1")
+    monkeypatch.undo()
+
+    # The unsaved record is not served from the cache
+    assert storage.load_payment("PAY_1") is None
+    _locked_insert(storage, "PAY_2")
+    assert storage.load_payment("PAY_2") is not None
+
+
+def test_processes_do_not_lose_each_others_updates(run_python):
+    code = """
+        from services import storage
+        storage.ensure_storage_dir()
+        for _ in range(25):
+            with storage.locked('payments'):
+                data = storage.load_payments()
+                counter = data.setdefault('counter', {'value': 0})
+                counter['value'] += 1
+                storage.save_payments(data, changed=['counter'])
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda _: run_python(code), range(2)))
+    output = run_python("""
+        from services import storage
+        print(storage.load_payment('counter')['value'])
+    """)
+    assert output.strip() == "50"
+
+
+def test_concurrent_bookings_share_commits(storage, monkeypatch):
+    from datetime import date
+
+    from services import mock_db
+
+    monkeypatch.setattr(storage._committer, "window", 0.01)
+    before = storage.get_commit_stats()
+    start = threading.Barrier(20)
+
+    def book(_):
+        start.wait()
+        return mock_db.create_booking_hold("DEL_IGI_CP_1", "Delhi Airport", "Connaught Place", date(2030, 1, 1))
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        holds = list(pool.map(book, range(20)))
+
+    assert len({hold["hold_id"] for hold in holds}) == 20
+    assert storage.get_commit_stats()["commits"] - before["commits"] < 20
+    storage.invalidate_cache()
+    assert all(storage.load_hold(hold["hold_id"]) for hold in holds)
+
+
+def test_saves_queued_after_a_failed_one_are_withdrawn(storage, monkeypatch):
+    engine = storage.get_engine()
+    save = engine.save
+
+    def fail_payments(collection, *args, **kwargs):
+        if collection == 'payments':
+            raise OSError("disk full")
+        return save(collection, *args, **kwargs)
+
+    monkeypatch.setattr(engine, "save", fail_payments)
+    with pytest.raises(OSError):
+        with storage.locked('passengers', 'payments'):
+            storage.save_payments({"PAY_1": {"session_id": "PAY_1"}}, changed=["PAY_1"])
+            storage.save_passengers({"HOLD_1": {"passenger_name": "Asha"}}, changed=["HOLD_1"])
+
+    storage.invalidate_cache()
+    assert storage.load_passengers() == {}
+    assert storage.load_payments() == {}
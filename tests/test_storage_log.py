@@ -0,0 +1,99 @@
+from datetime import datetime
+
+
+def _hold(hold_id):
+    return {"hold_id": hold_id, "status": "held", "expires_at": datetime(2030, 1, 1, 12, 0)}
+
+
+def test_log_replays_puts_and_deletes(storage):
+    engine = storage.AppendLogEngine()
+    data = {"HOLD_1": _hold("HOLD_1"), "HOLD_2": _hold("HOLD_2")}
+    engine.save("holds", data, ["HOLD_1", "HOLD_2"])
+    del data["HOLD_1"]
+    engine.save("holds", data, ["HOLD_1"])
+
+    loaded = storage.AppendLogEngine().load("holds")
+    assert list(loaded) == ["HOLD_2"]
+    assert loaded["HOLD_2"]["expires_at"] == datetime(2030, 1, 1, 12, 0)
+
+
+def test_log_compacts_into_snapshot(storage, monkeypatch):
+    monkeypatch.setattr(storage, "LOG_COMPACT_EVERY", 2)
+    engine = storage.AppendLogEngine()
+    data = {}
+    for number in range(3):
+        data[f"HOLD_{number}"] = _hold(f"HOLD_{number}")
+        engine.save("holds", data, [f"HOLD_{number}"])
+
+    assert not (storage.os.path.exists(engine.log_path("holds")))
+    assert set(storage.AppendLogEngine().load("holds")) == {"HOLD_0", "HOLD_1", "HOLD_2"}
+
+
+def test_append_after_torn_tail_survives_restart(storage):
+    engine = storage.AppendLogEngine()
+    engine.save("holds", {"HOLD_1": _hold("HOLD_1")}, ["HOLD_1"])
+    # Crash in the middle of appending the next entry
+    with open(engine.log_path("holds"), "ab") as f:
+        f.write(b'{"op": "put", "key": "HOLD_2", "val')
+
+    restarted = storage.AppendLogEngine()
+    data = restarted.load("holds")
+    assert list(data) == ["HOLD_1"]
+    data["HOLD_3"] = _hold("HOLD_3")
+    restarted.save("holds", data, ["HOLD_3"])
+
+    assert set(storage.AppendLogEngine().load("holds")) == {"HOLD_1", "HOLD_3"}
+
+
+def test_torn_tail_written_by_another_process_is_repaired(storage):
+    writer = storage.AppendLogEngine()
+    writer.save("holds", {"HOLD_1": _hold("HOLD_1")}, ["HOLD_1"])
+    with open(writer.log_path("holds"), "ab") as f:
+        f.write(b'{"op": "put"')
+
+    # This engine never loaded the log before appending
+    other = storage.AppendLogEngine()
+    other.save("holds", {"HOLD_2": _hold("HOLD_2")}, ["HOLD_2"])
+
+    assert set(storage.AppendLogEngine().load("holds")) == {"HOLD_1", "HOLD_2"}
+
+
+def test_batch_torn_midway_is_dropped_as_a_whole(storage):
+    engine = storage.AppendLogEngine()
+    engine.save("holds", {"HOLD_1": _hold("HOLD_1")}, ["HOLD_1"])
+    size = storage.os.path.getsize(engine.log_path("holds"))
+    batch = {f"HOLD_{number}": _hold(f"HOLD_{number}") for number in range(2, 6)}
+    engine.save("holds", {"HOLD_1": _hold("HOLD_1"), **batch}, list(batch))
+    with open(engine.log_path("holds"), "rb") as f:
+        log = f.read()
+
+    for cut in range(size + 1, len(log), max(1, (len(log) - size) // 20)):
+        with open(engine.log_path("holds"), "wb") as f:
+            f.write(log[:cut])
+        assert list(storage.AppendLogEngine().load("holds")) == ["HOLD_1"]
+
+
+def test_bulk_holds_torn_mid_append_leave_no_partial_batch(run_python):
+    import json
+
+    code = """
+        import json, os
+        from datetime import date
+        from services import mock_db, storage
+        holds = mock_db.create_booking_holds_bulk([
+            {"cab_id": "DEL_IGI_CP_1", "pickup": "Delhi Airport", "drop": "Connaught Place", "departure_date": date(2030, 1, 1)}
+            for _ in range(5)
+        ])
+        path = storage.get_engine().log_path(storage.HOLD_COLLECTIONS[0])
+        # Crash partway through the batch's append
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) * 2 // 3)
+        print(json.dumps([hold["hold_id"] for hold in holds]))
+    """
+    run_python(code, CAB_STORAGE_BACKEND="log")
+
+    after = json.loads(run_python(
+        "import json; from services import storage; print(json.dumps(sorted(storage.load_holds())))",
+        CAB_STORAGE_BACKEND="log",
+    ))
+    assert after == []
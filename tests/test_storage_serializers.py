@@ -0,0 +1,93 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+CREATE_HOLDS = """
+    import json
+    from datetime import date
+    from services import mock_db
+    holds = [
+        mock_db.create_booking_hold("DEL_IGI_CP_1", "IGI Airport", "Connaught Place", date(2030, 1, 1))
+        for _ in range(3)
+    ]
+    print(json.dumps([hold["hold_id"] for hold in holds]))
+"""
+
+READ_HOLDS = """
+    import json
+    from datetime import datetime
+    from services import storage, mock_db
+    holds = storage.load_holds()
+    assert all(isinstance(hold["expires_at"], datetime) for hold in holds.values())
+    print(json.dumps(sorted(holds)))
+"""
+
+
+def _hold(hold_id):
+    return {"hold_id": hold_id, "status": "held", "expires_at": datetime(2030, 1, 1, 12, 0)}
+
+
+@pytest.mark.parametrize("backend", ["json", "log"])
+@pytest.mark.parametrize("before, after", [("json", "msgpack"), ("msgpack", "orjson"), ("json", "orjson")])
+def test_changing_serializer_migrates_and_renames_files(run_python, tmp_path, backend, before, after):
+    pytest.importorskip("msgpack")
+    created = json.loads(run_python(CREATE_HOLDS, CAB_STORAGE_BACKEND=backend, CAB_STORAGE_SERIALIZER=before))
+
+    read = json.loads(run_python(READ_HOLDS, CAB_STORAGE_BACKEND=backend, CAB_STORAGE_SERIALIZER=after))
+
+    assert read == sorted(created)
+    hold_files = [name for name in os.listdir(tmp_path) if name.startswith("booking_holds.")]
+    extension = ".msgpack" if after == "msgpack" else ".json"
+    assert hold_files == ["booking_holds" + extension]
+    with open(tmp_path / hold_files[0], "rb") as f:
+        assert f.read().startswith(b"#cabstore " + after.encode())
+
+
+@pytest.fixture
+def msgpack_storage(storage, monkeypatch):
+    pytest.importorskip("msgpack")
+    monkeypatch.setattr(storage, "_serializer", storage.MsgpackSerializer())
+    return storage
+
+
+def test_msgpack_log_uses_its_own_extension(msgpack_storage):
+    engine = msgpack_storage.AppendLogEngine()
+    engine.save("holds", {"HOLD_1": _hold("HOLD_1")}, ["HOLD_1"])
+
+    assert engine.log_path("holds").endswith("booking_holds.msgpack.log")
+    assert msgpack_storage.AppendLogEngine().load("holds") == {"HOLD_1": _hold("HOLD_1")}
+
+
+@pytest.mark.parametrize("tail", [
+    b"\x00\x00\x00\x30\x12\x34",
+    # A torn entry whose bytes happen to decode as a small map
+    b"\x00\x00\x00\x05\x00\x00\x00\x00\x81\xa1k\x01",
+    b"\x81\xa1k\x01",
+])
+def test_msgpack_log_torn_tail_is_cut_before_appending(msgpack_storage, tail):
+    engine = msgpack_storage.AppendLogEngine()
+    engine.save("holds", {"HOLD_1": _hold("HOLD_1")}, ["HOLD_1"])
+    with open(engine.log_path("holds"), "ab") as f:
+        f.write(tail)
+
+    restarted = msgpack_storage.AppendLogEngine()
+    data = restarted.load("holds")
+    assert list(data) == ["HOLD_1"]
+    data["HOLD_2"] = _hold("HOLD_2")
+    restarted.save("holds", data, ["HOLD_2"])
+
+    assert set(msgpack_storage.AppendLogEngine().load("holds")) == {"HOLD_1", "HOLD_2"}
+
+
+def test_unframed_version_1_msgpack_log_is_read_and_migrated(msgpack_storage):
+    import msgpack
+
+    engine = msgpack_storage.AppendLogEngine()
+    entry = {"op": "put", "key": "HOLD_1", "value": {"hold_id": "HOLD_1", "status": "held"}}
+    with open(engine.log_path("holds"), "wb") as f:
+        f.write(b"#cabstore msgpack 1\n" + msgpack.packb(entry))
+
+    assert engine.load("holds") == {"HOLD_1": {"hold_id": "HOLD_1", "status": "held"}}
+    assert engine.needs_migration("holds")
@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.fixture
+def engines(storage, tmp_path):
+    path = str(tmp_path / "cab.db")
+    # Two connections to one database, as the MCP server and payment_backend have
+    return storage.SqliteEngine(path), storage.SqliteEngine(path)
+
+
+def test_round_trip_and_point_lookup(engines):
+    engine, _ = engines
+    engine.save('holds', {"H1": {"hold_id": "H1", "status": "active"}})
+
+    assert engine.load('holds') == {"H1": {"hold_id": "H1", "status": "active"}}
+    assert engine.get('holds', "H1") == {"hold_id": "H1", "status": "active"}
+    assert engine.get('holds', "H2") is None
+
+
+def test_save_of_one_collection_keeps_the_others_signatures(engines):
+    engine, other = engines
+    engine.save('holds', {"H1": {"hold_id": "H1"}})
+    holds = engine.signature('holds')
+    payments = engine.signature('payments')
+
+    other.save('payments', {"PAY_1": {"session_id": "PAY_1"}})
+
+    assert engine.signature('holds') == holds
+    assert engine.signature('payments') != payments
+
+
+def test_save_from_another_connection_changes_the_signature(engines):
+    engine, other = engines
+    engine.save('holds', {"H1": {"hold_id": "H1"}})
+    before = engine.signature('holds')
+
+    other.save('holds', {"H1": {"hold_id": "H1"}, "H2": {"hold_id": "H2"}}, changed=["H2"])
+
+    assert engine.signature('holds') != before
+    assert set(engine.load('holds')) == {"H1", "H2"}
+
+
+@pytest.fixture
+def sqlite_storage(storage, engines, monkeypatch):
+    engine, other = engines
+    loads = []
+    load = engine.load
+    monkeypatch.setattr(engine, "load", lambda collection: (loads.append(collection), load(collection))[1])
+    monkeypatch.setattr(storage, "_engine", engine)
+    storage.invalidate_cache()
+    yield storage, other, loads
+    storage.invalidate_cache()
+
+
+def test_stale_point_lookup_reads_one_row_instead_of_the_table(sqlite_storage):
+    storage, other, loads = sqlite_storage
+    storage.save_payments({"PAY_1": {"session_id": "PAY_1", "hold_id": "H1", "status": "pending"}})
+    storage.load_payments()
+
+    other.save("payments", {"PAY_2": {"session_id": "PAY_2", "hold_id": "H2", "status": "pending"}}, changed=["PAY_2"])
+
+    assert storage.load_payment("PAY_2")["hold_id"] == "H2"
+    assert storage.load_payment("PAY_1")["hold_id"] == "H1"
+    assert storage.load_payment("PAY_3") is None
+    assert loads == []
+    # A full load still sees the other process's write
+    assert set(storage.load_payments()) == {"PAY_1", "PAY_2"}